@@ -5,16 +5,40 @@ Generate Copilot Session Dashboard from session logs.
 Reads from: sustainnet-observability/logs/copilot-sessions/
 Outputs: Dashboard metrics and visualizations
 
+Daily logs are pruned by the date in their file name, so only the files in
+the window are read, and sessions are streamed line by line (decoded with
+orjson when installed).
+
+Whole days inside the window are summarized once per log file and kept in
+a rollup cache (.cache/copilot-sessions/rollups.json), invalidated by the
+file's size and mtime, so repeated runs only parse new or growing logs.
+
 Usage:
     python generate_dashboard.py [--days 7] [--output dashboard.json]
+    python generate_dashboard.py --days 90 --verbose     # report rollup cache hits
+    python generate_dashboard.py --days 90 --workers 8   # parse logs in 8 processes
+    python generate_dashboard.py --follow --interval 30  # live view of appended sessions
 """
 
 import json
+import os
+import re
 import argparse
-from datetime import datetime, timezone, timedelta
+from datetime import date, datetime, timezone, timedelta
 from pathlib import Path
-from typing import Dict, Any, List
+from typing import Dict, Any, Iterable, Iterator, List, Optional, Tuple
+import heapq
+import sys
+import time
 from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+
+try:
+    # orjson decodes straight from bytes and is several times faster; its
+    # JSONDecodeError subclasses json.JSONDecodeError
+    from orjson import loads as json_loads
+except ImportError:
+    json_loads = json.loads
 
 # South African Standard Time
 SAST = timezone(timedelta(hours=2))
@@ -22,110 +46,518 @@ SAST = timezone(timedelta(hours=2))
 # Paths
 SCRIPT_DIR = Path(__file__).parent
 LOG_DIR = SCRIPT_DIR.parent.parent / "logs" / "copilot-sessions"
+# Daily logs: sessions-YYYY-MM-DD.jsonl
+LOG_NAME = re.compile(r"^sessions-(\d{4}-\d{2}-\d{2})\.jsonl$")
+ROLLUP_CACHE_PATH = SCRIPT_DIR.parent.parent / ".cache" / "copilot-sessions" / "rollups.json"
+# Large logs are split into byte ranges of this size for --workers
+RANGE_BYTES = 64 * 1024 * 1024
+# Session fields SessionAccumulator reads; follow mode keeps only these for eviction
+ACCUMULATED_FIELDS = ("duration_minutes", "metrics", "outcome", "agent", "model", "feedback_score")
+# Follow mode scans a file's tail backwards in blocks of this size for its last newline
+TAIL_BLOCK_BYTES = 64 * 1024
+# Bump when SessionAccumulator's fields change so stale rollups are rebuilt
+ROLLUP_CACHE_VERSION = 1
+
+
+def session_files(days: int = 7, log_dir: Path = LOG_DIR) -> Iterator[Tuple[Path, bool]]:
+    """Log files that can hold sessions from the last N days, oldest first.
+
+    Files are pruned by the date in their name, so old logs are never opened.
+    Yields (path, needs_time_check): only files dated around the cutoff can
+    mix sessions from inside and outside the window. File dates get a day of
+    slack either side, since a session's start_time may be in another zone.
+    """
+    cutoff = (datetime.now(SAST) - timedelta(days=days)).date()
+    for log_file in sorted(log_dir.glob("sessions-*.jsonl")):
+        match = LOG_NAME.match(log_file.name)
+        try:
+            file_date = date.fromisoformat(match.group(1)) if match else None
+        except ValueError:
+            file_date = None
+        if file_date is None:
+            # Unexpected name: read it and filter every line
+            yield log_file, True
+        elif file_date >= cutoff - timedelta(days=1):
+            yield log_file, file_date <= cutoff + timedelta(days=1)
+
+
+def read_sessions(
+    log_file: Path, cutoff: Optional[datetime] = None, start: int = 0, end: Optional[int] = None
+) -> Iterator[Dict[str, Any]]:
+    """Yield the sessions of one log file, those starting before `cutoff` excluded.
+
+    With a byte range, only the lines that start in [start, end) are read, so
+    consecutive ranges of a file cover each line exactly once.
+    """
+    with open(log_file, "rb") as f:
+        if start:
+            # Skip the rest of a line that began before the range
+            f.seek(start - 1)
+            f.readline()
+        pos = f.tell()
+        for line in f:
+            if end is not None and pos >= end:
+                break
+            pos += len(line)
+            if not line.strip():
+                continue
+            try:
+                session = json_loads(line)
+                if cutoff is not None and datetime.fromisoformat(session["start_time"]) < cutoff:
+                    continue
+            except (json.JSONDecodeError, KeyError) as e:
+                print(f"Warning: Skipping invalid log entry: {e}")
+                continue
+            yield session
+
+
+def iter_sessions(days: int = 7, log_dir: Path = LOG_DIR) -> Iterator[Dict[str, Any]]:
+    """Yield sessions from the last N days, one log line at a time."""
+    cutoff = datetime.now(SAST) - timedelta(days=days)
+
+    if not log_dir.exists():
+        print(f"Warning: Log directory not found at {log_dir}")
+        return
+
+    for log_file, needs_time_check in session_files(days, log_dir):
+        yield from read_sessions(log_file, cutoff if needs_time_check else None)
 
 
 def load_sessions(days: int = 7) -> List[Dict[str, Any]]:
     """Load sessions from the last N days."""
-    sessions = []
-    cutoff = datetime.now(SAST) - timedelta(days=days)
-    
-    if not LOG_DIR.exists():
-        print(f"Warning: Log directory not found at {LOG_DIR}")
-        return []
-    
-    for log_file in LOG_DIR.glob("sessions-*.jsonl"):
-        with open(log_file) as f:
-            for line in f:
-                try:
-                    session = json.loads(line)
-                    session_time = datetime.fromisoformat(session["start_time"])
-                    if session_time >= cutoff:
-                        sessions.append(session)
-                except (json.JSONDecodeError, KeyError) as e:
-                    print(f"Warning: Skipping invalid log entry: {e}")
-    
-    return sessions
+    return list(iter_sessions(days))
 
 
-def calculate_metrics(sessions: List[Dict[str, Any]]) -> Dict[str, Any]:
-    """Calculate dashboard metrics from sessions."""
-    if not sessions:
-        return {"error": "No sessions found", "sessions_count": 0}
-    
-    # Basic counts
-    total_sessions = len(sessions)
-    total_duration = sum(s.get("duration_minutes", 0) for s in sessions)
-    
-    # Decision metrics
-    total_decisions = sum(s["metrics"]["total_decisions"] for s in sessions)
-    total_escalations = sum(s["metrics"]["total_escalations"] for s in sessions)
-    total_overrides = sum(s["metrics"]["total_overrides"] for s in sessions)
-    
-    # Outcome distribution
-    outcomes = Counter(s.get("outcome", "unknown") for s in sessions)
-    
-    # Agent distribution
-    agents = Counter(s.get("agent", "unknown") for s in sessions)
-    
-    # Model distribution
-    models = Counter(s.get("model", "unknown") for s in sessions)
-    
-    # Feedback scores
-    feedback_scores = [s["feedback_score"] for s in sessions if s.get("feedback_score")]
-    avg_feedback = sum(feedback_scores) / len(feedback_scores) if feedback_scores else None
-    
-    # Calculate rates
-    escalation_rate = total_escalations / max(total_decisions, 1)
-    override_rate = total_overrides / max(total_decisions, 1)
-    accuracy_estimate = 1 - override_rate
-    
-    # Time saved estimate (assuming 30 min saved per successful session)
-    successful_sessions = outcomes.get("success", 0)
-    time_saved_hours = (successful_sessions * 30) / 60
-    
-    # Trust score calculation
-    trust_components = {
-        "accuracy": min(accuracy_estimate, 1.0) * 3,  # Max 3 points
-        "low_escalation": max(0, 1 - escalation_rate * 10) * 2,  # Max 2 points
-        "feedback": (avg_feedback / 5 * 2) if avg_feedback else 1,  # Max 2 points
-        "completion": (outcomes.get("success", 0) / max(total_sessions, 1)) * 2,  # Max 2 points
-        "predictability": 1  # Base point for having logging
-    }
-    trust_score = sum(trust_components.values())
-    
-    return {
-        "generated_at": datetime.now(SAST).isoformat(),
-        "period_days": 7,
-        "summary": {
-            "total_sessions": total_sessions,
-            "total_duration_minutes": round(total_duration, 1),
-            "avg_duration_minutes": round(total_duration / total_sessions, 1),
-            "total_decisions": total_decisions,
-            "decisions_per_session": round(total_decisions / total_sessions, 1),
-            "time_saved_hours": round(time_saved_hours, 1)
-        },
-        "quality": {
-            "accuracy_estimate": round(accuracy_estimate * 100, 1),
-            "escalation_rate": round(escalation_rate * 100, 1),
-            "override_rate": round(override_rate * 100, 1),
-            "avg_feedback_score": round(avg_feedback, 2) if avg_feedback else None
-        },
-        "trust": {
-            "score": round(trust_score, 1),
-            "max_score": 10,
-            "components": {k: round(v, 2) for k, v in trust_components.items()}
-        },
-        "distributions": {
-            "outcomes": dict(outcomes),
-            "agents": dict(agents),
-            "models": dict(models)
-        },
-        "counts": {
-            "escalations": total_escalations,
-            "overrides": total_overrides,
-            "feedback_responses": len(feedback_scores)
+class SessionAccumulator:
+    """Running totals for the dashboard, updated once per session.
+
+    Memory is bounded by the number of distinct outcomes, agents and models,
+    not by the number of sessions. Accumulators built over different files
+    (or by different workers) combine with merge().
+    """
+
+    def __init__(self):
+        self.total_sessions = 0
+        self.total_duration = 0
+        self.total_decisions = 0
+        self.total_escalations = 0
+        self.total_overrides = 0
+        self.outcomes: Counter = Counter()
+        self.agents: Counter = Counter()
+        self.models: Counter = Counter()
+        self.feedback_count = 0
+        self.feedback_sum = 0
+
+    def add(self, session: Dict[str, Any]) -> None:
+        decisions = session["metrics"]
+        self.total_sessions += 1
+        self.total_duration += session.get("duration_minutes", 0)
+        self.total_decisions += decisions["total_decisions"]
+        self.total_escalations += decisions["total_escalations"]
+        self.total_overrides += decisions["total_overrides"]
+        self.outcomes[session.get("outcome", "unknown")] += 1
+        self.agents[session.get("agent", "unknown")] += 1
+        self.models[session.get("model", "unknown")] += 1
+        if session.get("feedback_score"):
+            self.feedback_count += 1
+            self.feedback_sum += session["feedback_score"]
+
+    def remove(self, session: Dict[str, Any]) -> None:
+        """Take back a session added earlier, e.g. once it has left a sliding window."""
+        decisions = session["metrics"]
+        self.total_sessions -= 1
+        self.total_duration -= session.get("duration_minutes", 0)
+        self.total_decisions -= decisions["total_decisions"]
+        self.total_escalations -= decisions["total_escalations"]
+        self.total_overrides -= decisions["total_overrides"]
+        for counter, key in (
+            (self.outcomes, session.get("outcome", "unknown")),
+            (self.agents, session.get("agent", "unknown")),
+            (self.models, session.get("model", "unknown")),
+        ):
+            counter[key] -= 1
+            if counter[key] <= 0:
+                del counter[key]
+        if session.get("feedback_score"):
+            self.feedback_count -= 1
+            self.feedback_sum -= session["feedback_score"]
+
+    def add_all(self, sessions: Iterable[Dict[str, Any]]) -> "SessionAccumulator":
+        for session in sessions:
+            self.add(session)
+        return self
+
+    def merge(self, other: "SessionAccumulator") -> "SessionAccumulator":
+        """Fold another accumulator's totals into this one."""
+        self.total_sessions += other.total_sessions
+        self.total_duration += other.total_duration
+        self.total_decisions += other.total_decisions
+        self.total_escalations += other.total_escalations
+        self.total_overrides += other.total_overrides
+        self.outcomes.update(other.outcomes)
+        self.agents.update(other.agents)
+        self.models.update(other.models)
+        self.feedback_count += other.feedback_count
+        self.feedback_sum += other.feedback_sum
+        return self
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "total_sessions": self.total_sessions,
+            "total_duration": self.total_duration,
+            "total_decisions": self.total_decisions,
+            "total_escalations": self.total_escalations,
+            "total_overrides": self.total_overrides,
+            "outcomes": dict(self.outcomes),
+            "agents": dict(self.agents),
+            "models": dict(self.models),
+            "feedback_count": self.feedback_count,
+            "feedback_sum": self.feedback_sum,
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "SessionAccumulator":
+        accumulator = cls()
+        for name, value in data.items():
+            setattr(accumulator, name, Counter(value) if isinstance(value, dict) else value)
+        return accumulator
+
+    def metrics(self, days: int = 7) -> Dict[str, Any]:
+        """Dashboard metrics for the accumulated sessions."""
+        if not self.total_sessions:
+            return {"error": "No sessions found", "sessions_count": 0}
+
+        total_sessions = self.total_sessions
+        total_duration = self.total_duration
+        total_decisions = self.total_decisions
+        total_escalations = self.total_escalations
+        total_overrides = self.total_overrides
+        outcomes, agents, models = self.outcomes, self.agents, self.models
+        avg_feedback = self.feedback_sum / self.feedback_count if self.feedback_count else None
+
+        # Calculate rates
+        escalation_rate = total_escalations / max(total_decisions, 1)
+        override_rate = total_overrides / max(total_decisions, 1)
+        accuracy_estimate = 1 - override_rate
+
+        # Time saved estimate (assuming 30 min saved per successful session)
+        successful_sessions = outcomes.get("success", 0)
+        time_saved_hours = (successful_sessions * 30) / 60
+
+        # Trust score calculation
+        trust_components = {
+            "accuracy": min(accuracy_estimate, 1.0) * 3,  # Max 3 points
+            "low_escalation": max(0, 1 - escalation_rate * 10) * 2,  # Max 2 points
+            "feedback": (avg_feedback / 5 * 2) if avg_feedback else 1,  # Max 2 points
+            "completion": (outcomes.get("success", 0) / max(total_sessions, 1)) * 2,  # Max 2 points
+            "predictability": 1  # Base point for having logging
+        }
+        trust_score = sum(trust_components.values())
+
+        return {
+            "generated_at": datetime.now(SAST).isoformat(),
+            "period_days": days,
+            "summary": {
+                "total_sessions": total_sessions,
+                "total_duration_minutes": round(total_duration, 1),
+                "avg_duration_minutes": round(total_duration / total_sessions, 1),
+                "total_decisions": total_decisions,
+                "decisions_per_session": round(total_decisions / total_sessions, 1),
+                "time_saved_hours": round(time_saved_hours, 1)
+            },
+            "quality": {
+                "accuracy_estimate": round(accuracy_estimate * 100, 1),
+                "escalation_rate": round(escalation_rate * 100, 1),
+                "override_rate": round(override_rate * 100, 1),
+                "avg_feedback_score": round(avg_feedback, 2) if avg_feedback else None
+            },
+            "trust": {
+                "score": round(trust_score, 1),
+                "max_score": 10,
+                "components": {k: round(v, 2) for k, v in trust_components.items()}
+            },
+            "distributions": {
+                "outcomes": dict(outcomes),
+                "agents": dict(agents),
+                "models": dict(models)
+            },
+            "counts": {
+                "escalations": total_escalations,
+                "overrides": total_overrides,
+                "feedback_responses": self.feedback_count
+            }
         }
-    }
+
+
+class RollupCache:
+    """One SessionAccumulator per log file, reused while the file's size and mtime are unchanged.
+
+    Finished daily logs never change, so a dashboard run only parses the
+    files that are new or still growing and merges the cached rollups of
+    the rest. Only files wholly inside the window are cached; entries for
+    log files that no longer exist are dropped on save, so the cache stays
+    the size of the log directory.
+    """
+
+    def __init__(self, path: Path):
+        self.path = path
+        self.hits = 0
+        self.misses = 0
+        self._files: Dict[str, Dict[str, Any]] = {}
+        try:
+            with open(path) as f:
+                data = json.load(f)
+            if data.get("version") == ROLLUP_CACHE_VERSION:
+                self._files = data["files"]
+        except FileNotFoundError:
+            pass
+        except (ValueError, KeyError, AttributeError) as e:
+            print(f"Warning: Ignoring unreadable rollup cache {path}: {e}")
+        self._dirty = False
+
+    def get(self, log_file: Path, stat: os.stat_result) -> Optional[SessionAccumulator]:
+        entry = self._files.get(str(log_file.resolve()))
+        if entry is None or entry["size"] != stat.st_size or entry["mtime_ns"] != stat.st_mtime_ns:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return SessionAccumulator.from_dict(entry["rollup"])
+
+    def put(self, log_file: Path, stat: os.stat_result, rollup: SessionAccumulator) -> None:
+        self._files[str(log_file.resolve())] = {
+            "size": stat.st_size,
+            "mtime_ns": stat.st_mtime_ns,
+            "rollup": rollup.to_dict(),
+        }
+        self._dirty = True
+
+    def save(self, present: Iterable[Path]) -> None:
+        """Write the cache, dropping the rollups of log files that are no longer `present`."""
+        keep = {str(log_file.resolve()) for log_file in present}
+        stale = [key for key in self._files if key not in keep]
+        for key in stale:
+            del self._files[key]
+        if not (self._dirty or stale):
+            return
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_suffix(".tmp")
+        with open(tmp, "w") as f:
+            json.dump({"version": ROLLUP_CACHE_VERSION, "files": self._files}, f)
+        os.replace(tmp, self.path)
+        self._dirty = False
+
+
+def file_ranges(size: int, range_bytes: int = RANGE_BYTES) -> List[Tuple[int, Optional[int]]]:
+    """Byte ranges to split a file of `size` bytes into; the last one runs to the end of the file."""
+    starts = range(0, max(size, 1), range_bytes)
+    return [(start, start + range_bytes if start + range_bytes < size else None) for start in starts]
+
+
+def accumulate_range(job: Tuple[Path, Optional[datetime], int, Optional[int]]) -> SessionAccumulator:
+    """Process pool task: the partial aggregate of one byte range of a log file."""
+    log_file, cutoff, start, end = job
+    return SessionAccumulator().add_all(read_sessions(log_file, cutoff, start, end))
+
+
+def parse_files(
+    files: List[Tuple[Path, Optional[datetime]]], workers: int = 1
+) -> List[SessionAccumulator]:
+    """One accumulator per (log file, cutoff), parsed across `workers` processes.
+
+    Large files are split into line-aligned byte ranges so a few big logs
+    still spread over the pool. Workers return partial aggregates, never
+    sessions, and the parts of each file are merged in file order.
+    """
+    if workers <= 1:
+        return [SessionAccumulator().add_all(read_sessions(f, cutoff)) for f, cutoff in files]
+
+    jobs = []
+    owners = []
+    for index, (log_file, cutoff) in enumerate(files):
+        for start, end in file_ranges(log_file.stat().st_size):
+            jobs.append((log_file, cutoff, start, end))
+            owners.append(index)
+    rollups = [SessionAccumulator() for _ in files]
+    if len(jobs) <= 1:
+        for index, job in zip(owners, jobs):
+            rollups[index].merge(accumulate_range(job))
+        return rollups
+    with ProcessPoolExecutor(max_workers=min(workers, len(jobs))) as pool:
+        for index, part in zip(owners, pool.map(accumulate_range, jobs)):
+            rollups[index].merge(part)
+    return rollups
+
+
+def accumulate_sessions(
+    days: int = 7, log_dir: Path = LOG_DIR, cache: Optional[RollupCache] = None, workers: int = 1
+) -> SessionAccumulator:
+    """Accumulate sessions from the last N days, merging cached per-file rollups where valid."""
+    if cache is None and workers <= 1:
+        return SessionAccumulator().add_all(iter_sessions(days, log_dir))
+
+    accumulator = SessionAccumulator()
+    cutoff = datetime.now(SAST) - timedelta(days=days)
+    if not log_dir.exists():
+        print(f"Warning: Log directory not found at {log_dir}")
+        return accumulator
+
+    # (file, cutoff to filter by, stat to cache the rollup under)
+    pending: List[Tuple[Path, Optional[datetime], Optional[os.stat_result]]] = []
+    for log_file, needs_time_check in session_files(days, log_dir):
+        if needs_time_check:
+            # The window cuts through this file, so its rollup depends on the cutoff
+            pending.append((log_file, cutoff, None))
+            continue
+        if cache is None:
+            pending.append((log_file, None, None))
+            continue
+        # Stat before reading: lines appended meanwhile only make the entry stale
+        stat = log_file.stat()
+        rollup = cache.get(log_file, stat)
+        if rollup is None:
+            pending.append((log_file, None, stat))
+        else:
+            accumulator.merge(rollup)
+
+    rollups = parse_files([(log_file, file_cutoff) for log_file, file_cutoff, _ in pending], workers)
+    for (log_file, _, stat), rollup in zip(pending, rollups):
+        if cache is not None and stat is not None:
+            cache.put(log_file, stat, rollup)
+        accumulator.merge(rollup)
+    if cache is not None:
+        cache.save(log_dir.glob("sessions-*.jsonl"))
+    return accumulator
+
+
+def complete_end(log_file: Path, start: int, size: int) -> int:
+    """Offset just past the last complete line in [start, size), or `start` when there is none."""
+    with open(log_file, "rb") as f:
+        pos = size
+        while pos > start:
+            block = min(TAIL_BLOCK_BYTES, pos - start)
+            f.seek(pos - block)
+            newline = f.read(block).rfind(b"\n")
+            if newline >= 0:
+                return pos - block + newline + 1
+            pos -= block
+    return start
+
+
+class TailedFile:
+    """Follow mode state of one log file: how far it was read and what that held.
+
+    Files the window's cutoff cuts through (`timed`) also keep their
+    in-window sessions in a heap by start time, trimmed to the fields the
+    accumulator reads, so they can be evicted as the cutoff moves.
+    """
+
+    def __init__(self, inode: int, timed: bool):
+        self.inode = inode
+        self.timed = timed
+        self.offset = 0
+        self.rollup = SessionAccumulator()
+        self._by_start: List[Tuple[float, int, Dict[str, Any]]] = []
+        self._pushed = 0
+
+    def add(self, session: Dict[str, Any]) -> None:
+        self.rollup.add(session)
+        if self.timed:
+            start = datetime.fromisoformat(session["start_time"]).timestamp()
+            kept = {key: session[key] for key in ACCUMULATED_FIELDS if key in session}
+            # The push count breaks ties between equal start times
+            heapq.heappush(self._by_start, (start, self._pushed, kept))
+            self._pushed += 1
+
+    def evict(self, cutoff: datetime) -> bool:
+        """Remove the sessions that started before `cutoff`; True if there were any."""
+        cutoff_ts = cutoff.timestamp()
+        evicted = False
+        while self._by_start and self._by_start[0][0] < cutoff_ts:
+            self.rollup.remove(heapq.heappop(self._by_start)[2])
+            evicted = True
+        return evicted
+
+
+class SessionTail:
+    """Running aggregates for --follow, updated from the lines appended since the last poll.
+
+    Each log file in the window keeps a byte offset and its own rollup. A
+    poll stats the files and reads only the complete lines past each offset
+    (a partly written last line waits for the next poll), so its cost is
+    proportional to the new data. A file whose inode changes or that shrinks
+    was rotated or truncated and is read again from the start; files that
+    leave the window are dropped. The cutoff is recomputed on every poll and
+    sessions that have fallen behind it are evicted from the files it cuts
+    through, so the output matches a fresh run at any moment.
+    """
+
+    def __init__(self, days: int = 7, log_dir: Path = LOG_DIR, cache: Optional[RollupCache] = None):
+        self.days = days
+        self.log_dir = log_dir
+        self.cache = cache
+        self.cutoff = datetime.now(SAST) - timedelta(days=days)
+        self._files: Dict[Path, TailedFile] = {}
+
+    def poll(self) -> bool:
+        """Read what was appended since the last poll; True when the aggregates changed."""
+        self.cutoff = datetime.now(SAST) - timedelta(days=self.days)
+        changed = False
+        seen = set()
+        for log_file, needs_time_check in session_files(self.days, self.log_dir):
+            try:
+                stat = log_file.stat()
+            except FileNotFoundError:
+                continue
+            seen.add(log_file)
+            state = self._files.get(log_file)
+            fresh = (
+                state is None
+                or state.inode != stat.st_ino
+                or stat.st_size < state.offset
+                # A file the cutoff now reaches: read it again, keeping start times
+                or state.timed != needs_time_check
+            )
+            if fresh:
+                # New, rotated, truncated or newly cut by the window: start over
+                state = self._files[log_file] = TailedFile(stat.st_ino, needs_time_check)
+                changed = True
+                cached = None
+                if not needs_time_check and self.cache is not None:
+                    cached = self.cache.get(log_file, stat)
+                if cached is not None:
+                    state.rollup, state.offset = cached, stat.st_size
+                    continue
+            elif state.timed and state.evict(self.cutoff):
+                changed = True
+            if stat.st_size <= state.offset:
+                continue
+            end = complete_end(log_file, state.offset, stat.st_size)
+            if end > state.offset:
+                cutoff = self.cutoff if state.timed else None
+                for session in read_sessions(log_file, cutoff, state.offset, end):
+                    state.add(session)
+                state.offset = end
+                changed = True
+            if fresh and not needs_time_check and self.cache is not None and end == stat.st_size:
+                # Cache files read whole in one go; growing ones would rewrite the cache every poll
+                self.cache.put(log_file, stat, state.rollup)
+        for log_file in set(self._files) - seen:
+            del self._files[log_file]
+            changed = True
+        if self.cache is not None:
+            self.cache.save(self.log_dir.glob("sessions-*.jsonl"))
+        return changed
+
+    def totals(self) -> SessionAccumulator:
+        accumulator = SessionAccumulator()
+        for log_file in sorted(self._files):
+            accumulator.merge(self._files[log_file].rollup)
+        return accumulator
+
+
+def calculate_metrics(sessions: Iterable[Dict[str, Any]], days: int = 7) -> Dict[str, Any]:
+    """Calculate dashboard metrics from sessions in a single pass."""
+    return SessionAccumulator().add_all(sessions).metrics(days)
 
 
 def format_dashboard(metrics: Dict[str, Any]) -> str:
@@ -177,26 +609,70 @@ def main():
     parser.add_argument("--days", type=int, default=7, help="Days of data to include")
     parser.add_argument("--output", type=str, help="Output file for JSON metrics")
     parser.add_argument("--format", choices=["json", "text", "both"], default="both")
+    parser.add_argument("--cache", type=Path, default=ROLLUP_CACHE_PATH, help="Per-file rollup cache")
+    parser.add_argument("--no-cache", action="store_true", help="Parse every log file, ignoring the rollup cache")
+    parser.add_argument(
+        "--workers", type=int, default=1, help="Processes to parse log files with (0: one per CPU)"
+    )
+    parser.add_argument(
+        "--follow", action="store_true", help="Keep running, reading only newly appended log lines"
+    )
+    parser.add_argument("--interval", type=float, default=10, help="Seconds between --follow refreshes")
+    parser.add_argument("-v", "--verbose", action="store_true", help="Report rollup cache hits and misses")
     
     args = parser.parse_args()
     
-    print(f"Loading sessions from last {args.days} days...")
-    sessions = load_sessions(args.days)
-    print(f"Found {len(sessions)} sessions")
+    if args.follow:
+        follow(args)
+        return
     
-    metrics = calculate_metrics(sessions)
+    print(f"Loading sessions from last {args.days} days...")
+    cache = None if args.no_cache else RollupCache(args.cache)
+    workers = args.workers or os.cpu_count() or 1
+    accumulator = accumulate_sessions(args.days, cache=cache, workers=workers)
+    print(f"Found {accumulator.total_sessions} sessions")
+    if args.verbose and cache is not None:
+        print(f"Rollup cache: {cache.hits} hits, {cache.misses} misses ({cache.path})")
     
+    write_outputs(accumulator.metrics(args.days), args)
+
+
+def write_outputs(metrics: Dict[str, Any], args: argparse.Namespace) -> None:
     if args.format in ["text", "both"]:
         print(format_dashboard(metrics))
     
     if args.format in ["json", "both"]:
         if args.output:
-            with open(args.output, "w") as f:
+            # Replace the file whole so a reader never sees it half written
+            tmp = f"{args.output}.tmp"
+            with open(tmp, "w") as f:
                 json.dump(metrics, f, indent=2)
+            os.replace(tmp, args.output)
             print(f"Metrics written to {args.output}")
         elif args.format == "json":
             print(json.dumps(metrics, indent=2))
 
 
+def follow(args: argparse.Namespace) -> None:
+    """Refresh the dashboard every --interval seconds from newly appended log lines."""
+    cache = None if args.no_cache else RollupCache(args.cache)
+    tail = SessionTail(args.days, cache=cache)
+    print(f"Following sessions from last {args.days} days (Ctrl-C to stop)...")
+    first = True
+    try:
+        while True:
+            if tail.poll() or first:
+                if args.format != "json" and sys.stdout.isatty():
+                    # Redraw in place
+                    print("\033[2J\033[H", end="")
+                if args.verbose and cache is not None and first:
+                    print(f"Rollup cache: {cache.hits} hits, {cache.misses} misses ({cache.path})")
+                write_outputs(tail.totals().metrics(args.days), args)
+                first = False
+            time.sleep(args.interval)
+    except KeyboardInterrupt:
+        pass
+
+
 if __name__ == "__main__":
     main()
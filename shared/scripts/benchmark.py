@@ -0,0 +1,396 @@
+#!/usr/bin/env python3
+"""
+Benchmark the metrics collectors against a local stand-in GitHub API.
+
+Each collector runs as a subprocess with GITHUB_API_URL pointed at a
+gh_fixtures.StandInServer and a fresh METRICS_CACHE_DIR (a cold run). The
+server answers either from a recorded fixture archive or from a synthetic
+generator that lays out a given number of workflow runs across the testing
+repos, three workflows each, without materialising them up front.
+
+Reported per script and size: wall time, request count (total and per
+endpoint), peak RSS of the collector process and the per-phase timings the
+collector prints on its "Phases:" line. The collector's HTTP(S) proxy is the
+server itself, so a request that would bypass it (to api.github.com, say) is
+refused and fails the benchmark.
+
+Usage:
+  python3 shared/scripts/benchmark.py
+  python3 shared/scripts/benchmark.py --runs 10k 100k 1m --json bench.json
+  python3 shared/scripts/benchmark.py --archive fixtures/dora.jsonl.gz --scripts dora
+  python3 shared/scripts/benchmark.py --json bench.json --baseline previous.json --max-slowdown 0.25
+
+With --baseline the exit status is 1 when any result needs more requests than
+the baseline, or is slower by more than --max-slowdown.
+"""
+
+import argparse
+import base64
+import hashlib
+import io
+import json
+import os
+import re
+import subprocess
+import sys
+import tempfile
+import time
+import zipfile
+import zlib
+from datetime import datetime, timezone
+from typing import Dict, List, Mapping, Optional, Tuple
+
+from compute_testing import REPOS
+from gh_fixtures import DEFAULT_UPSTREAM, Fixture, FixtureArchive, ReplayBackend, StandInServer, json_fixture, relink
+
+UTC = timezone.utc
+SCRIPTS_DIR = os.path.dirname(os.path.abspath(__file__))
+WINDOW_DAYS = 30
+# Consecutive runs of a workflow deploy the same commit this many times (re-runs, multi-env)
+RUNS_PER_COMMIT = 20
+ISSUES_PER_REPO = 40
+# Runs per workflow, newest first, that upload a coverage artifact
+ARTIFACT_RUNS = 5
+# Classes in the synthetic Cobertura report (10 lines each, no root totals, so every line is parsed)
+COVERAGE_CLASSES = 2_000
+SIZE_SUFFIXES = {"k": 1_000, "m": 1_000_000}
+
+SYNTHETIC_WORKFLOWS = (
+    (101, "Production Deploy", ".github/workflows/production-deploy.yml", "./scripts/deploy.sh production"),
+    (102, "CI", ".github/workflows/ci.yml", "npm test"),
+    (103, "Nightly E2E", ".github/workflows/nightly-e2e.yml", "npx playwright test"),
+)
+
+DEFAULT_ARGS = {
+    "dora": ["--window-days", str(WINDOW_DAYS), "--concurrency", "8"],
+    "testing": [],
+}
+
+
+def parse_size(text: str) -> int:
+    text = text.strip().lower()
+    if text[-1:] in SIZE_SUFFIXES:
+        return int(float(text[:-1]) * SIZE_SUFFIXES[text[-1]])
+    return int(text)
+
+
+def iso(ts: float) -> str:
+    return datetime.fromtimestamp(ts, tz=UTC).isoformat().replace("+00:00", "Z")
+
+
+def workflow_yaml(name: str, command: str) -> str:
+    return (
+        f"name: {name}\n"
+        "on:\n  push:\n    branches: [main]\n"
+        "jobs:\n  build:\n    runs-on: ubuntu-latest\n    steps:\n"
+        "      - uses: actions/checkout@v4\n"
+        "      - run: npm ci\n"
+        f"      - run: {command}\n"
+    )
+
+
+class SyntheticGitHub:
+    """Deterministic GitHub API generator serving `total_runs` runs spread over every repo it is asked about.
+
+    Runs of a workflow are evenly spaced over the window, newest first, and
+    generated per page on request. Head SHAs encode the workflow and commit
+    group, so commit lookups need no state either.
+    """
+
+    def __init__(self, total_runs: int, repo_count: int, window_days: int = WINDOW_DAYS):
+        self.runs_per_workflow = max(1, total_runs // (repo_count * len(SYNTHETIC_WORKFLOWS)))
+        self.now = time.time()
+        self.step = window_days * 86400 / self.runs_per_workflow
+        self.workflows = {wf_id: (name, path, command) for wf_id, name, path, command in SYNTHETIC_WORKFLOWS}
+        # Workflow files by git blob SHA, shared by every repo
+        self.blobs: Dict[str, Tuple[str, bytes]] = {}
+        for name, path, command in self.workflows.values():
+            data = workflow_yaml(name, command).encode()
+            self.blobs[hashlib.sha1(b"blob %d\0" % len(data) + data).hexdigest()] = (path, data)
+        self._coverage_zip: Optional[bytes] = None
+        self.misses = 0
+
+    def created(self, i: int) -> float:
+        return self.now - (i + 0.5) * self.step
+
+    def run(self, full: str, wf_id: int, i: int) -> Dict:
+        name, path, _ = self.workflows[wf_id]
+        h = zlib.crc32(f"{full}/{wf_id}/{i}".encode())
+        conclusion = "failure" if h % 100 < 12 else "cancelled" if h % 100 < 15 else "success"
+        created = self.created(i)
+        run_id = (zlib.crc32(full.encode()) % 1000) * 10**10 + wf_id * 10**7 + i
+        return {
+            "id": run_id,
+            "name": name,
+            "display_title": f"Merge pull request #{i // RUNS_PER_COMMIT} from feature/change-{h % 997}",
+            "path": path,
+            "head_branch": "main",
+            "event": "push",
+            "status": "completed",
+            "conclusion": conclusion,
+            "workflow_id": wf_id,
+            "run_attempt": 1,
+            "head_sha": f"{wf_id:08x}{i // RUNS_PER_COMMIT:032x}",
+            "created_at": iso(created),
+            "updated_at": iso(created + 60 + h % 900),
+            "run_started_at": iso(created + 5),
+            "html_url": f"https://github.com/{full}/actions/runs/{run_id}",
+            "head_commit": {"message": "Merge pull request", "author": {"name": "dev", "email": "dev@example.com"}},
+        }
+
+    def respond(self, path: str, query: Dict[str, str], headers: Mapping[str, str], base_url: str) -> Fixture:
+        m = re.match(r"^/repos/([^/]+/[^/]+)/(.*)$", path)
+        if not m:
+            return self.not_found()
+        full, rest = m.groups()
+        page = int(query.get("page", "1"))
+        per_page = int(query.get("per_page", "30"))
+
+        if rest == "actions/workflows":
+            items = [{"id": wf_id, "name": name, "path": p, "state": "active"} for wf_id, (name, p, _) in self.workflows.items()]
+            return self.ok({"total_count": len(items), "workflows": items[(page - 1) * per_page : page * per_page]})
+
+        m = re.match(r"^actions/workflows/(\d+)/runs$", rest)
+        if m and int(m.group(1)) in self.workflows:
+            wf_id = int(m.group(1))
+            count = self.runs_per_workflow
+            created_filter = query.get("created", "")
+            if created_filter.startswith(">="):
+                since = datetime.fromisoformat(created_filter[2:].replace("Z", "+00:00")).timestamp()
+                count = max(0, min(count, int((self.now - since) / self.step - 0.5) + 1))
+            indices = range((page - 1) * per_page, min(count, page * per_page))
+            return self.ok({"total_count": count, "workflow_runs": [self.run(full, wf_id, i) for i in indices]})
+
+        m = re.match(r"^commits/([0-9a-f]{8})([0-9a-f]{32})$", rest)
+        if m and int(m.group(1), 16) in self.workflows:
+            group = int(m.group(2), 16)
+            oldest = min(self.runs_per_workflow - 1, group * RUNS_PER_COMMIT + RUNS_PER_COMMIT - 1)
+            date = iso(self.created(oldest) - 3600 * (1 + group % 72))
+            person = {"name": "dev", "email": "dev@example.com", "date": date}
+            return self.ok({"sha": m.group(1) + m.group(2), "commit": {"author": person, "committer": person, "message": "change"}})
+
+        m = re.match(r"^contents/(.+)$", rest)
+        if m:
+            for name, p, command in self.workflows.values():
+                if p == m.group(1):
+                    content = base64.encodebytes(workflow_yaml(name, command).encode()).decode()
+                    return self.ok({"type": "file", "path": p, "encoding": "base64", "content": content})
+
+        if rest == "git/trees/HEAD:.github/workflows":
+            entries = [
+                {"path": p.rsplit("/", 1)[-1], "mode": "100644", "type": "blob", "sha": sha}
+                for sha, (p, _) in self.blobs.items()
+            ]
+            return self.ok({"sha": "0" * 40, "tree": entries, "truncated": False})
+
+        m = re.match(r"^git/blobs/([0-9a-f]{40})$", rest)
+        if m and m.group(1) in self.blobs:
+            content = base64.encodebytes(self.blobs[m.group(1)][1]).decode()
+            return self.ok({"sha": m.group(1), "encoding": "base64", "content": content})
+
+        if rest == "actions/artifacts":
+            items = [
+                self.artifact(full, wf_id, i)
+                for i in range(min(ARTIFACT_RUNS, self.runs_per_workflow))
+                for wf_id in self.workflows
+            ]
+            # Archive URLs name the real API, as recorded bodies do, and are rewritten the same way
+            page_items = items[(page - 1) * per_page : page * per_page]
+            return relink(self.ok({"total_count": len(items), "artifacts": page_items}), DEFAULT_UPSTREAM, base_url)
+
+        m = re.match(r"^actions/artifacts/(\d+)/zip$", rest)
+        if m:
+            return Fixture(200, {"Content-Type": "application/zip"}, self.coverage_zip())
+
+        if rest == "issues":
+            issues = [self.issue(n) for n in range(ISSUES_PER_REPO)]
+            state = query.get("state", "open")
+            if state != "all":
+                issues = [i for i in issues if i["state"] == state]
+            if query.get("since"):
+                issues = [i for i in issues if i["updated_at"] >= query["since"]]
+            return self.ok(issues[(page - 1) * per_page : page * per_page])
+
+        return self.not_found()
+
+    def artifact(self, full: str, wf_id: int, i: int) -> Dict:
+        run = self.run(full, wf_id, i)
+        artifact_id = run["id"]
+        return {
+            "id": artifact_id,
+            "name": "coverage-report",
+            "expired": False,
+            "created_at": iso(self.created(i) + 600),
+            "archive_download_url": f"{DEFAULT_UPSTREAM}/repos/{full}/actions/artifacts/{artifact_id}/zip",
+            "workflow_run": {"id": run["id"], "head_sha": run["head_sha"]},
+        }
+
+    def coverage_zip(self) -> bytes:
+        """One Cobertura report without root totals, built once and shared by every artifact."""
+        if self._coverage_zip is None:
+            lines = "".join(f'<line number="{n}" hits="{n % 3}"/>' for n in range(10))
+            classes = "".join(f'<class name="c{c}"><lines>{lines}</lines></class>' for c in range(COVERAGE_CLASSES))
+            report = f"<coverage><packages><package><classes>{classes}</classes></package></packages></coverage>"
+            buf = io.BytesIO()
+            with zipfile.ZipFile(buf, "w", zipfile.ZIP_DEFLATED) as zf:
+                zf.writestr("unit/coverage.xml", report)
+            self._coverage_zip = buf.getvalue()
+        return self._coverage_zip
+
+    def issue(self, n: int) -> Dict:
+        updated = iso(self.now - n * 6 * 3600)
+        closed = n % 2 == 1
+        return {
+            "number": n + 1,
+            "title": f"Issue {n + 1}",
+            "state": "closed" if closed else "open",
+            "labels": [{"name": "bug"}] if n % 4 == 0 else [{"name": "enhancement"}],
+            "created_at": updated,
+            "updated_at": updated,
+            "closed_at": updated if closed else None,
+        }
+
+    def ok(self, data) -> Fixture:
+        body = json.dumps(data).encode()
+        return Fixture(200, {"Content-Type": "application/json; charset=utf-8", "ETag": f'"{hashlib.md5(body).hexdigest()}"'}, body)
+
+    def not_found(self) -> Fixture:
+        self.misses += 1
+        return json_fixture({"message": "Not Found"}, status=404)
+
+
+def parse_phases(output: str) -> Dict[str, float]:
+    for line in output.splitlines():
+        if line.startswith("Phases:"):
+            return {name: float(seconds) for name, seconds in re.findall(r"(\w+) ([\d.]+)s", line)}
+    return {}
+
+
+def run_collector(script: str, args: List[str], server: StandInServer, workdir: str) -> Dict:
+    """Run one collector cold against the server; return wall time, requests, peak RSS and phases."""
+    cache_dir = tempfile.mkdtemp(prefix="cache-", dir=workdir)
+    env = {k: v for k, v in os.environ.items() if k not in ("GITHUB_TOKEN", "GH_TOKEN", "GITHUB_TOKENS")}
+    env.update(
+        GITHUB_API_URL=server.base_url,
+        METRICS_CACHE_DIR=cache_dir,
+        # The stand-in has no rate limit; only measure the collector itself
+        GITHUB_MAX_RPS="1000000",
+        TESTING_OUTPUT_PATH=os.path.join(workdir, "testing.json"),
+        **server.proxy_env(),
+    )
+    argv = [sys.executable, os.path.join(SCRIPTS_DIR, f"compute_{script}.py"), *args]
+    if script == "dora":
+        argv += ["--output", os.path.join(workdir, "dora.json")]
+
+    server.reset_counts()
+    log_path = os.path.join(workdir, f"{script}.log")
+    start = time.perf_counter()
+    with open(log_path, "w") as log:
+        proc = subprocess.Popen(argv, stdout=log, stderr=subprocess.STDOUT, env=env)
+        # wait4 reports the resource usage of this child alone
+        _, status, usage = os.wait4(proc.pid, 0)
+    wall = time.perf_counter() - start
+    proc.returncode = os.waitstatus_to_exitcode(status)
+    with open(log_path) as log:
+        output = log.read()
+    if proc.returncode:
+        print(output[-2000:], file=sys.stderr)
+
+    # ru_maxrss is in KiB on Linux and bytes on macOS
+    peak_rss = usage.ru_maxrss / (1024 * 1024 if sys.platform == "darwin" else 1024)
+    return {
+        "exit_code": proc.returncode,
+        "wall_seconds": round(wall, 3),
+        "requests": sum(server.requests.values()),
+        "requests_by_endpoint": dict(server.requests.most_common()),
+        # Requests that tried to leave the stand-in (e.g. to api.github.com); any fail the benchmark
+        "escaped_requests": dict(server.escaped.most_common()),
+        "peak_rss_mb": round(peak_rss, 1),
+        "phases": parse_phases(output),
+    }
+
+
+def compare(results: List[Dict], baseline: List[Dict], max_slowdown: float) -> List[str]:
+    previous = {(r["script"], r["runs"]): r for r in baseline}
+    problems = []
+    for r in results:
+        before = previous.get((r["script"], r["runs"]))
+        if not before:
+            continue
+        label = f"{r['script']} @ {r['runs']} runs"
+        if r["requests"] > before["requests"]:
+            problems.append(f"{label}: {r['requests']} requests (baseline {before['requests']})")
+        if r["wall_seconds"] > before["wall_seconds"] * (1 + max_slowdown):
+            problems.append(f"{label}: {r['wall_seconds']}s (baseline {before['wall_seconds']}s)")
+    return problems
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark compute_dora.py / compute_testing.py offline")
+    parser.add_argument("--runs", nargs="+", default=["10k"], help="Synthetic workflow-run counts, e.g. 10k 100k 1m")
+    parser.add_argument("--archive", help="Serve a recorded gh_fixtures archive instead of synthetic data")
+    parser.add_argument("--scripts", nargs="+", choices=sorted(DEFAULT_ARGS), default=sorted(DEFAULT_ARGS))
+    parser.add_argument("--dora-args", default=None, help="Arguments for compute_dora.py (quoted string)")
+    parser.add_argument("--json", dest="json_path", help="Write the results to this file")
+    parser.add_argument("--baseline", help="Results file from a previous run to compare against")
+    parser.add_argument("--max-slowdown", type=float, default=0.25, help="Tolerated wall-time increase over the baseline")
+    args = parser.parse_args()
+
+    script_args = dict(DEFAULT_ARGS)
+    if args.dora_args is not None:
+        script_args["dora"] = args.dora_args.split()
+
+    results: List[Dict] = []
+    sizes: List[Optional[int]] = [None] if args.archive else [parse_size(s) for s in args.runs]
+    with tempfile.TemporaryDirectory(prefix="metrics-bench-") as workdir:
+        repos_file = os.path.join(workdir, "repos.txt")
+        with open(repos_file, "w") as f:
+            f.write("".join(f"{owner}/{repo}\n" for owner, repo in REPOS))
+
+        for size in sizes:
+            if size is None:
+                backend = ReplayBackend(FixtureArchive.load(args.archive))
+            else:
+                backend = SyntheticGitHub(size, len(REPOS))
+            server = StandInServer(backend).start()
+            try:
+                for script in args.scripts:
+                    argv = list(script_args[script])
+                    if script == "dora" and size is not None:
+                        argv += ["--repos-file", repos_file]
+                    result = {"script": script, "runs": size if size is not None else "archive"}
+                    result.update(run_collector(script, argv, server, workdir))
+                    result["unserved_requests"] = backend.misses
+                    backend.misses = 0
+                    results.append(result)
+                    phases = ", ".join(f"{k} {v:.2f}s" for k, v in result["phases"].items())
+                    print(
+                        f"{script:8} {str(result['runs']):>8} runs  {result['wall_seconds']:8.2f}s  "
+                        f"{result['requests']:7} requests  {result['peak_rss_mb']:7.1f} MB peak RSS  {phases}"
+                    )
+            finally:
+                server.shutdown()
+                server.server_close()
+
+    report = {"generated_at": datetime.now(UTC).isoformat(), "python": sys.version.split()[0], "results": results}
+    if args.json_path:
+        with open(args.json_path, "w") as f:
+            json.dump(report, f, indent=2)
+
+    failed = [r for r in results if r["exit_code"] or r["escaped_requests"]]
+    for r in failed:
+        if r["exit_code"]:
+            print(f"Error: {r['script']} exited with {r['exit_code']}", file=sys.stderr)
+        if r["escaped_requests"]:
+            print(f"Error: {r['script']} bypassed the stand-in server: {r['escaped_requests']}", file=sys.stderr)
+    problems: List[str] = []
+    if args.baseline and os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            problems = compare(results, json.load(f).get("results", []), args.max_slowdown)
+        for problem in problems:
+            print(f"Regression: {problem}", file=sys.stderr)
+    sys.exit(1 if failed or problems else 0)
+
+
+if __name__ == "__main__":
+    main()
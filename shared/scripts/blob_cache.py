@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+Persistent cache of workflow file blobs for the testing metrics.
+
+A git blob SHA names its content, so a workflow file that has not changed
+keeps its SHA and never needs to be downloaded or inspected again. Entries
+hold the decoded content and its analysis (whether its own steps execute
+tests, and the local reusable workflows it calls), keyed by blob SHA alone
+(the same template file in two repos is one entry). The analysis is stored
+with the version of the detector that produced it; one from another
+version is reported as missing so it is recomputed from the cached content.
+
+Usage:
+  cache = BlobCache(".cache/metrics/workflow_blobs.sqlite")
+  known = cache.get_many(shas, detector_version)
+  cache.put_many({sha: (content, (executes_tests, calls))}, detector_version)
+"""
+
+import os
+import sqlite3
+import threading
+from typing import Dict, Iterable, Optional, Tuple
+
+# SQLite's default limit on host parameters is 999 on older builds
+BATCH_SIZE = 500
+
+# (executes tests, local reusable workflow paths called)
+BlobAnalysis = Tuple[bool, Tuple[str, ...]]
+# (decoded content, analysis or None when it came from another detector version)
+CachedBlob = Tuple[Optional[str], Optional[BlobAnalysis]]
+
+
+class BlobCache:
+    def __init__(self, path: str):
+        self.path = path
+        self.hits = 0
+        self.misses = 0
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS blobs ("
+            " sha TEXT PRIMARY KEY,"
+            " content TEXT,"
+            " executes_tests INTEGER,"
+            " detector TEXT,"
+            " calls TEXT"
+            ") WITHOUT ROWID"
+        )
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(blobs)")}
+        if "calls" not in columns:
+            # Written before reusable workflows were followed; those rows carry an older detector version
+            self._conn.execute("ALTER TABLE blobs ADD COLUMN calls TEXT")
+        self._conn.commit()
+
+    def get_many(self, shas: Iterable[str], detector: str) -> Dict[str, CachedBlob]:
+        """Return cached (content, analysis) for every known sha, in batches."""
+        wanted = list(dict.fromkeys(shas))
+        found: Dict[str, CachedBlob] = {}
+        with self._lock:
+            for i in range(0, len(wanted), BATCH_SIZE):
+                batch = wanted[i : i + BATCH_SIZE]
+                placeholders = ",".join("?" * len(batch))
+                rows = self._conn.execute(
+                    f"SELECT sha, content, executes_tests, calls, detector FROM blobs WHERE sha IN ({placeholders})",
+                    batch,
+                )
+                for sha, content, executes_tests, calls, stored_detector in rows:
+                    analysis = None
+                    if stored_detector == detector and executes_tests is not None:
+                        analysis = (bool(executes_tests), tuple(calls.split("\n")) if calls else ())
+                    found[sha] = (content, analysis)
+            self.hits += len(found)
+            self.misses += len(wanted) - len(found)
+        return found
+
+    def put_many(self, entries: Dict[str, Tuple[Optional[str], BlobAnalysis]], detector: str) -> None:
+        if not entries:
+            return
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO blobs (sha, content, executes_tests, calls, detector) VALUES (?, ?, ?, ?, ?)",
+                [
+                    (sha, content, int(executes_tests), "\n".join(calls), detector)
+                    for sha, (content, (executes_tests, calls)) in entries.items()
+                ],
+            )
+            self._conn.commit()
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,450 @@
+#!/usr/bin/env python3
+"""
+Collect every metrics family from one pass over the GitHub API.
+
+compute_dora.py and compute_testing.py each list workflows and runs for the
+same repos. This pipeline fetches a repo's workflows, runs, workflow files
+and issues once into a RepoData and hands it to each metric calculator; the
+DORA and testing calculators write docs/data/dora.json and
+docs/data/testing.json from the same job. Requests go through compute_dora's
+HTTP stack (token pool, conditional-request cache, concurrency limit).
+
+A calculator declares which optional parts of RepoData it reads, over
+which window, and which workflows' runs it looks at; the pass fetches only
+what some calculator needs, over the widest window any of them asks for.
+DORA keeps compute_dora's workflow prefilter, so runs of workflows that
+cannot be production deployments are only fetched when the testing metrics
+need them, and both JSONs match the standalone scripts.
+
+With --incremental the runs of every fetched workflow go through
+compute_dora's run store: only runs newer than each workflow's watermark
+(minus the settle window) are requested, and the calculators read the
+window back from the store.
+
+Usage:
+  python3 shared/scripts/collect_metrics.py --concurrency 8
+  python3 shared/scripts/collect_metrics.py --window-days 30 7 90 --incremental --settle-hours 48
+  python3 shared/scripts/collect_metrics.py --window-days 30 7 90 --testing-window-days 30
+  python3 shared/scripts/collect_metrics.py --metrics dora --org Honey-Badger-Labs
+
+Environment:
+  GITHUB_TOKEN, GH_TOKEN, GITHUB_TOKENS   request token pool (see rate_limit.py)
+  GITHUB_API_URL            API base (default https://api.github.com)
+  METRICS_ORG               discover the org's active repos (same as --org)
+  TESTING_WINDOW_DAYS       default for --testing-window-days (default 30)
+"""
+
+import argparse
+import json
+import os
+from datetime import datetime, timedelta, timezone
+from typing import Dict, FrozenSet, List, Mapping, Optional, Sequence, Tuple
+
+import compute_dora as dora
+import compute_testing as testing
+from blob_cache import BlobCache
+from commit_cache import CommitCache
+from coverage_artifacts import CoverageCache, CoverageCollector
+from http_cache import ResponseCache
+from http_transport import DEFAULT_POOL_SIZE, Transport, TransportError
+from rate_limit import RequestScheduler, TokenPool, tokens_from_env
+from repo_discovery import DEFAULT_ACTIVE_DAYS, DEFAULT_TTL_SECONDS
+from run_history import RunHistory
+from run_store import RunStore
+from timing import PhaseTimer
+
+UTC = timezone.utc
+DOCS_DATA = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", "docs", "data"))
+
+_phases = PhaseTimer()
+
+
+class RepoData:
+    """Everything the pass fetched for one repo."""
+
+    def __init__(self, owner: str, repo: str):
+        self.owner = owner
+        self.repo = repo
+        self.full = f"{owner}/{repo}"
+        self.workflows: List[Dict] = []
+        # Runs per workflow id, created within the widest window
+        self.runs: Dict[int, List[Dict]] = {}
+        # Whether the runs were read back from the run store rather than listed
+        self.from_store = False
+        # Whether each workflow file executes tests, by path
+        self.executes_tests: Dict[str, bool] = {}
+        self.open_issues: List[Dict] = []
+        self.closed_issues: List[Dict] = []
+        # Coverage artifacts of the latest successful run of each test workflow
+        self.coverage_artifacts: List[Dict] = []
+
+    def runs_since(self, since: datetime) -> Dict[int, List[Dict]]:
+        return {
+            wf_id: [r for r in runs if r.get("created_at") and dora.parse_ts(r["created_at"]) >= since]
+            for wf_id, runs in self.runs.items()
+        }
+
+
+class Calculator:
+    """A metrics family computed from the shared per-repo data.
+
+    `needs` names the optional RepoData parts it reads ("workflow_tests",
+    "issues", "coverage_artifacts"); runs and workflows are always fetched. `repos`, when given,
+    limits it to those repos of the pass.
+    """
+
+    name = ""
+    needs: FrozenSet[str] = frozenset()
+
+    def __init__(self, output: str, window_days: int, repos: Optional[Sequence[str]] = None):
+        self.output = output
+        self.window_days = window_days
+        self.repos = set(repos) if repos is not None else None
+
+    def since(self) -> datetime:
+        return datetime.now(UTC) - timedelta(days=self.window_days)
+
+    def wants(self, full: str) -> bool:
+        return self.repos is None or full in self.repos
+
+    def wants_runs(self, data: RepoData, workflow: Dict) -> bool:
+        """Whether compute() reads the runs of this workflow."""
+        return True
+
+    def compute(self, data: RepoData) -> object:
+        raise NotImplementedError
+
+    def summarize(self, results: Dict[str, object]) -> Dict:
+        raise NotImplementedError
+
+    def write(self, results: Dict[str, object]) -> None:
+        out = self.summarize(results)
+        os.makedirs(os.path.dirname(os.path.abspath(self.output)), exist_ok=True)
+        with open(self.output, "w") as f:
+            json.dump(out, f, indent=2)
+        print(f"Wrote {self.name} metrics for {len(results)} repos to {self.output}")
+
+
+class DoraCalculator(Calculator):
+    name = "dora"
+
+    def __init__(
+        self,
+        output: str,
+        windows: Sequence[int],
+        token: Optional[str],
+        commit_cache: Optional[CommitCache] = None,
+        bucket: str = "day",
+        history: Optional[RunHistory] = None,
+        prefilter: bool = True,
+    ):
+        super().__init__(output, max(windows))
+        self.windows = list(windows)
+        self.token = token
+        self.commit_cache = commit_cache
+        self.bucket = bucket
+        self.history = history
+        self.prefilter = prefilter
+
+    def wants_runs(self, data: RepoData, workflow: Dict) -> bool:
+        # Same screen as compute_dora.compute_repo_windows
+        return not self.prefilter or dora.production_classifier(data.owner, data.repo).is_candidate_workflow(workflow)
+
+    def compute(self, data: RepoData) -> Tuple[Dict[int, Dict], dora.DoraSeries]:
+        workflows = [wf for wf in data.workflows if wf.get("id") and self.wants_runs(data, wf)]
+        runs = data.runs_since(self.since())
+        pairs = [(r, wf["id"]) for wf in workflows for r in runs.get(wf["id"], [])]
+        if data.from_store:
+            # The order compute_dora reads the store in, so ties resolve the same way
+            pairs.sort(key=lambda pair: (pair[0]["created_at"], pair[0]["id"]))
+        return dora.windows_from_runs(
+            data.owner,
+            data.repo,
+            self.token,
+            self.windows,
+            workflows,
+            pairs,
+            self.commit_cache,
+            self.bucket,
+            self.history,
+            presorted=data.from_store,
+        )
+
+    def summarize(self, results: Dict[str, object]) -> Dict:
+        per_window: Dict[int, Dict[str, Dict]] = {w: {} for w in self.windows}
+        repo_series: Dict[str, dora.DoraSeries] = {}
+        for full, (by_window, series) in results.items():
+            for w in self.windows:
+                per_window[w][full] = by_window[w]
+            repo_series[full] = series
+        return dora.build_aggregate(self.windows, per_window, repo_series, self.bucket)
+
+
+class TestingCalculator(Calculator):
+    name = "testing"
+    needs = frozenset({"workflow_tests", "issues", "coverage_artifacts"})
+
+    def __init__(
+        self,
+        output: str,
+        window_days: int,
+        repos: Optional[Sequence[str]] = None,
+        coverage: Optional[CoverageCollector] = None,
+    ):
+        super().__init__(output, window_days, repos)
+        self.coverage = coverage
+        # Coverage artifacts per repo, downloaded together when results are summarized
+        self.artifacts: Dict[str, List[Dict]] = {}
+
+    def compute(self, data: RepoData) -> Dict:
+        self.artifacts[data.full] = data.coverage_artifacts
+        return testing.testing_metrics(
+            data.full,
+            data.workflows,
+            data.runs_since(self.since()),
+            data.executes_tests,
+            data.open_issues,
+            data.closed_issues,
+            self.window_days,
+        )
+
+    def summarize(self, results: Dict[str, object]) -> Dict:
+        if self.coverage:
+            with _phases.phase("coverage"):
+                artifacts = {full: self.artifacts.get(full, []) for full in results}
+                for full, fields in self.coverage.collect(artifacts).items():
+                    results[full].update(fields)
+        return testing.summarize_testing(results, self.window_days)
+
+
+def fetch_repo(
+    owner: str,
+    repo: str,
+    token: Optional[str],
+    calculators: Sequence[Calculator],
+    run_store: Optional[RunStore] = None,
+    settle: timedelta = timedelta(hours=48),
+) -> RepoData:
+    """Fetch what the calculators that want this repo need, once.
+
+    With `run_store`, runs are synced into the store incrementally and read
+    back from it instead of being listed over the whole window.
+    """
+    data = RepoData(owner, repo)
+    wanted = [c for c in calculators if c.wants(data.full)]
+    issue_windows = [c.since() for c in wanted if "issues" in c.needs]
+
+    def get(url: str) -> object:
+        return dora.gh_get(url, token)
+
+    def get_response(url: str) -> Tuple[object, Mapping[str, str]]:
+        return dora.gh_get_response(url, token)
+
+    data.workflows = dora.list_workflows(owner, repo, token)
+    listed = [wf for wf in data.workflows if wf.get("id")]
+    # Each workflow's runs are fetched over the widest window of the calculators that read them
+    run_windows: List[Tuple[Dict, datetime]] = []
+    for wf in listed:
+        windows = [c.since() for c in wanted if c.wants_runs(data, wf)]
+        if windows:
+            run_windows.append((wf, min(windows)))
+    skipped = len(listed) - len(run_windows)
+    if skipped:
+        print(f"Prefilter: skipped run fetches for {skipped}/{len(listed)} workflows in {data.full}")
+    if run_store:
+        dora.map_ordered(
+            lambda item: dora.sync_workflow_runs(owner, repo, item[0]["id"], token, item[1], run_store, settle),
+            run_windows,
+        )
+        data.runs = {wf["id"]: run_store.runs(data.full, dora.iso(since), [wf["id"]]) for wf, since in run_windows}
+        data.from_store = True
+    else:
+        fetched = dora.map_ordered(
+            lambda item: dora.list_runs_for_workflow(owner, repo, item[0]["id"], token, item[1]), run_windows
+        )
+        data.runs = {wf["id"]: runs for (wf, _), runs in zip(run_windows, fetched)}
+
+    if any("workflow_tests" in c.needs for c in wanted):
+        paths = list(dict.fromkeys(wf["path"] for wf in listed if wf.get("path")))
+        with _phases.phase("workflow_files"):
+            data.executes_tests = testing.workflow_test_verdicts(owner, repo, paths, get)
+
+    if issue_windows:
+        with _phases.phase("issues"):
+            data.open_issues = testing.list_issues(owner, repo, "open", min(issue_windows), get_response)
+            data.closed_issues = testing.list_issues(owner, repo, "closed", min(issue_windows), get_response)
+
+    coverage_windows = [c.since() for c in wanted if "coverage_artifacts" in c.needs]
+    if coverage_windows:
+        with _phases.phase("artifacts"):
+            data.coverage_artifacts = testing.list_coverage_artifacts(
+                owner, repo, listed, data.runs_since(min(coverage_windows)), data.executes_tests, get_response
+            )
+    return data
+
+
+def collect(
+    repos: Sequence[str],
+    token: Optional[str],
+    calculators: Sequence[Calculator],
+    run_store: Optional[RunStore] = None,
+    settle: timedelta = timedelta(hours=48),
+) -> Dict[str, Dict[str, object]]:
+    """Per-calculator results keyed by repo, in repo order; a failing repo is reported and left out."""
+
+    def one(full: str) -> Optional[Dict[str, object]]:
+        try:
+            owner, repo = full.split("/", 1)
+        except ValueError:
+            return None
+        if not any(c.wants(full) for c in calculators):
+            return None
+        try:
+            data = fetch_repo(owner, repo, token, calculators, run_store, settle)
+            return {c.name: c.compute(data) for c in calculators if c.wants(full)}
+        except (TransportError, ValueError) as e:
+            print(f"Warning: Failed to collect metrics for {full}: {e}")
+            return None
+
+    results: Dict[str, Dict[str, object]] = {c.name: {} for c in calculators}
+    for full, computed in zip(repos, dora.map_ordered(one, list(repos))):
+        for name, value in (computed or {}).items():
+            results[name][full] = value
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Collect DORA and testing metrics in one pass")
+    parser.add_argument(
+        "--metrics", nargs="+", choices=["dora", "testing"], default=["dora", "testing"], help="Calculators to run"
+    )
+    parser.add_argument(
+        "--window-days",
+        type=int,
+        nargs="+",
+        default=[30],
+        help="DORA windows in days; the first fills the top-level fields of dora.json",
+    )
+    parser.add_argument("--testing-window-days", type=int, default=testing.WINDOW_DAYS_DEFAULT)
+    parser.add_argument("--bucket", choices=["day", "week"], default="day", help="DORA time-series bucket granularity")
+    parser.add_argument("--repos-file", type=str, default=None)
+    parser.add_argument(
+        "--org",
+        type=str,
+        default=os.getenv("METRICS_ORG") or None,
+        help="Discover the org's active repos instead of the built-in lists (ignored with --repos-file)",
+    )
+    parser.add_argument("--active-days", type=int, default=DEFAULT_ACTIVE_DAYS)
+    parser.add_argument("--repos-ttl-hours", type=float, default=DEFAULT_TTL_SECONDS / 3600)
+    parser.add_argument("--dora-output", type=str, default=os.path.join(DOCS_DATA, "dora.json"))
+    parser.add_argument("--testing-output", type=str, default=os.path.join(DOCS_DATA, "testing.json"))
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=int(os.getenv("DORA_CONCURRENCY", "1")),
+        help="Max parallel GitHub requests across repos, workflows, pages and commits (1 = sequential)",
+    )
+    parser.add_argument("--commit-cache", type=str, default=os.path.join(dora.CACHE_DIR, "commits.sqlite"))
+    parser.add_argument("--no-commit-cache", action="store_true")
+    parser.add_argument("--http-cache", type=str, default=os.path.join(dora.CACHE_DIR, "http.sqlite"))
+    parser.add_argument("--no-http-cache", action="store_true")
+    parser.add_argument("--blob-cache", type=str, default=testing.BLOB_CACHE_PATH or None)
+    parser.add_argument("--coverage-cache", type=str, default=testing.COVERAGE_CACHE_PATH or None)
+    parser.add_argument(
+        "--no-prefilter",
+        action="store_true",
+        help="Compute DORA from every workflow's runs instead of only those whose name/path can indicate production",
+    )
+    parser.add_argument(
+        "--incremental",
+        action="store_true",
+        help="Fetch only runs newer than the stored watermarks and compute from the local run store",
+    )
+    parser.add_argument("--run-store", type=str, default=os.path.join(dora.CACHE_DIR, "runs.sqlite"))
+    parser.add_argument(
+        "--settle-hours",
+        type=float,
+        default=48.0,
+        help="Re-fetch runs this close to the watermark, since re-runs can still change their conclusion",
+    )
+    parser.add_argument("--history", type=str, default=os.path.join(dora.CACHE_DIR, "history"))
+    parser.add_argument("--no-history", action="store_true")
+    args = parser.parse_args()
+
+    dora.configure_phases(_phases)
+    dora.configure_concurrency(args.concurrency)
+    http_cache = None if args.no_http_cache else ResponseCache(args.http_cache)
+    dora.configure_http_cache(http_cache)
+    transport = Transport(pool_size=max(DEFAULT_POOL_SIZE, args.concurrency))
+    dora.configure_transport(transport)
+    scheduler = RequestScheduler(TokenPool(tokens_from_env()), retry_on=(TransportError,))
+    dora.configure_scheduler(scheduler)
+    commit_cache = None if args.no_commit_cache else CommitCache(args.commit_cache)
+    history = None if args.no_history else RunHistory(args.history)
+    run_store = RunStore(args.run_store) if args.incremental else None
+    blob_cache = BlobCache(args.blob_cache) if args.blob_cache else None
+    testing.configure_blob_cache(blob_cache)
+    coverage_cache = CoverageCache(args.coverage_cache) if args.coverage_cache else None
+    token = os.getenv("GITHUB_TOKEN") or os.getenv("GH_TOKEN")
+
+    # With the built-in lists each calculator keeps its own repos; a file or org applies to all
+    testing_repos: Optional[List[str]] = None
+    if args.repos_file and os.path.exists(args.repos_file):
+        with open(args.repos_file) as f:
+            repos = [line.strip() for line in f if line.strip() and not line.startswith("#")]
+    elif args.org:
+        try:
+            repos = dora.discover_org_repos(args.org, token, args.active_days, args.repos_ttl_hours * 3600)
+        except TransportError as e:
+            print(f"Warning: Repo discovery for {args.org} failed ({e}); using the built-in repo lists")
+            repos = []
+    else:
+        repos = []
+    if not repos:
+        testing_repos = [f"{owner}/{repo}" for owner, repo in testing.REPOS]
+        repos = list(dict.fromkeys(dora.DEFAULT_REPOS + testing_repos))
+
+    calculators: List[Calculator] = []
+    if "dora" in args.metrics:
+        windows = list(dict.fromkeys(args.window_days))
+        calculators.append(
+            DoraCalculator(
+                args.dora_output, windows, token, commit_cache, args.bucket, history, not args.no_prefilter
+            )
+        )
+    if "testing" in args.metrics:
+        coverage = CoverageCollector(lambda url: dora.gh_download(url, token), coverage_cache)
+        calculators.append(TestingCalculator(args.testing_output, args.testing_window_days, testing_repos, coverage))
+
+    results = collect(repos, token, calculators, run_store, timedelta(hours=args.settle_hours))
+    with _phases.phase("output"):
+        for calculator in calculators:
+            calculator.write(results[calculator.name])
+
+    if commit_cache:
+        print(f"Commit cache: {commit_cache.hits} hits, {commit_cache.misses} misses")
+        commit_cache.close()
+    if run_store:
+        run_store.close()
+    if blob_cache:
+        print(f"Blob cache: {blob_cache.hits} hits, {blob_cache.misses} misses")
+        blob_cache.close()
+    if coverage_cache:
+        print(f"Coverage cache: {coverage_cache.hits} hits, {coverage_cache.misses} misses")
+        coverage_cache.close()
+    if http_cache:
+        stats = http_cache.stats()
+        print(f"HTTP cache: {stats['hits']} hits (304), {stats['misses']} misses, hit rate {stats['hit_rate']}")
+        http_cache.close()
+    pool_stats = scheduler.pool.stats()
+    print(
+        f"Scheduler: {scheduler.retries} retries, throttled {pool_stats['waited_seconds']}s (summed over threads) "
+        f"across {pool_stats['tokens']} token(s), requests per token {pool_stats['requests']}"
+    )
+    print(f"Transport: {transport.summary()}")
+    transport.close()
+    print(f"Phases: {_phases.summary()} (summed over threads)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""
+Persistent commit metadata cache for DORA lead-time calculation.
+
+A commit SHA is immutable, so once its author/committer timestamps are known
+they never need to be fetched again. Entries are keyed by (repo, sha) in a
+small SQLite database and hold only the two timestamps.
+
+Usage:
+  cache = CommitCache(".cache/metrics/commits.sqlite")
+  known = cache.get_many("owner/repo", shas)
+  cache.put_many("owner/repo", {sha: (author_date, committer_date)})
+"""
+
+import os
+import sqlite3
+import threading
+from typing import Dict, Iterable, Optional, Tuple
+
+# SQLite's default limit on host parameters is 999 on older builds
+BATCH_SIZE = 500
+
+CommitDates = Tuple[Optional[str], Optional[str]]
+
+
+class CommitCache:
+    def __init__(self, path: str):
+        self.path = path
+        self.hits = 0
+        self.misses = 0
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS commits ("
+            " repo TEXT NOT NULL,"
+            " sha TEXT NOT NULL,"
+            " author_date TEXT,"
+            " committer_date TEXT,"
+            " PRIMARY KEY (repo, sha)"
+            ") WITHOUT ROWID"
+        )
+        self._conn.commit()
+
+    def get_many(self, repo: str, shas: Iterable[str]) -> Dict[str, CommitDates]:
+        """Return cached (author_date, committer_date) for every known sha, in batches."""
+        wanted = list(dict.fromkeys(shas))
+        found: Dict[str, CommitDates] = {}
+        with self._lock:
+            for i in range(0, len(wanted), BATCH_SIZE):
+                batch = wanted[i : i + BATCH_SIZE]
+                placeholders = ",".join("?" * len(batch))
+                rows = self._conn.execute(
+                    f"SELECT sha, author_date, committer_date FROM commits WHERE repo = ? AND sha IN ({placeholders})",
+                    [repo, *batch],
+                )
+                for sha, author_date, committer_date in rows:
+                    found[sha] = (author_date, committer_date)
+            self.hits += len(found)
+            self.misses += len(wanted) - len(found)
+        return found
+
+    def put_many(self, repo: str, entries: Dict[str, CommitDates]) -> None:
+        if not entries:
+            return
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO commits (repo, sha, author_date, committer_date) VALUES (?, ?, ?, ?)",
+                [(repo, sha, dates[0], dates[1]) for sha, dates in entries.items()],
+            )
+            self._conn.commit()
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
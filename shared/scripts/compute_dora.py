@@ -10,23 +10,102 @@ Outputs JSON to docs/data/dora.json with:
 
 Environment:
   GITHUB_TOKEN (recommended; falls back to unauthenticated limited access)
+  GH_TOKEN, GITHUB_TOKENS (comma-separated) add more tokens to the request pool
+  GITHUB_API_URL (default https://api.github.com; point it at gh_fixtures.py to replay)
+  METRICS_ORG (discover the org's active repos; same as --org)
+
+Incremental mode (--incremental) keeps every fetched run in a local run store
+with per-workflow watermarks and only fetches runs created since the last
+watermark, minus a settle window for runs whose conclusion may still change.
 
 Usage:
   python3 shared/scripts/compute_dora.py --window-days 30 --repos-file shared/scripts/repos.txt
+  python3 shared/scripts/compute_dora.py --window-days 30 --concurrency 8
+  python3 shared/scripts/compute_dora.py --window-days 30 --incremental --settle-hours 48
+  python3 shared/scripts/compute_dora.py --window-days 30 7 90 --bucket week
+  python3 shared/scripts/compute_dora.py --window-days 90 --offline
+  python3 shared/scripts/compute_dora.py --org Honey-Badger-Labs --active-days 90
+
+Every fetched run is also kept in a columnar run history (run_history.py),
+partitioned by repo and month. --offline computes from that history and the
+commit cache alone, without calling the API.
+
+Several --window-days values are computed from a single collection pass over
+the largest window; the first one fills the top-level fields, and all of them
+are listed under "windows". A per-bucket time series of deployments, failures,
+restores and lead-time quantiles is written under "series".
 """
 
 import argparse
 import json
 import os
-import statistics
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
 from datetime import datetime, timedelta, timezone
-from typing import Dict, List, Optional
-
-import requests
-
-API = "https://api.github.com"
+from typing import IO, Callable, Dict, Iterable, Iterator, List, Mapping, Optional, Sequence, Tuple, TypeVar
+
+from commit_cache import CommitCache, CommitDates
+from dora_engine import (
+    DAY_SECONDS,
+    DoraAccumulator,
+    DoraSeries,
+    RunEvent,
+    distribution_fields,
+    epoch,
+    to_event,
+    with_commit_times,
+)
+from http_cache import ResponseCache, cache_key
+from http_transport import DEFAULT_POOL_SIZE, HTTPStatusError, Reply, Transport, TransportError, shared_transport
+from paginate import paginate
+from quantile_sketch import QuantileSketch
+from rate_limit import RequestScheduler, TokenPool, tokens_from_env
+from repo_discovery import DEFAULT_ACTIVE_DAYS, DEFAULT_TTL_SECONDS, discover_repos
+from run_history import HistoryRow, RunHistory, history_row
+from run_store import RunStore
+from timing import PhaseTimer
+
+API = os.getenv("GITHUB_API_URL", "https://api.github.com").rstrip("/")
 UTC = timezone.utc
 TZ_Z = "+00:00"
+PER_PAGE = 100
+CACHE_DIR = os.getenv(
+    "METRICS_CACHE_DIR",
+    os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", ".cache", "metrics")),
+)
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+# Concurrency limit for collection; 1 keeps the original sequential behaviour.
+_concurrency = 1
+# Bounds the number of in-flight GitHub requests across all worker threads.
+_request_slots: Optional[threading.BoundedSemaphore] = None
+# Pooled HTTP transport; None uses the process-wide default.
+_transport: Optional[Transport] = None
+# Conditional-request cache; None sends plain GETs.
+_http_cache: Optional[ResponseCache] = None
+# Paces requests across the token pool and retries rate limits; None sends once with the given token.
+_scheduler: Optional[RequestScheduler] = None
+# Wall time per collection phase, reported at the end of a run
+_phases = PhaseTimer()
+
+# Default SustainNet repos if no repos file or org is given
+DEFAULT_REPOS = [
+    "Honey-Badger-Labs/sustainnet-vision",
+    "Honey-Badger-Labs/Hello-World",
+    "Honey-Badger-Labs/Hello-World-Flow-Test",
+    "Honey-Badger-Labs/Family-Meal-Planner",
+    "Honey-Badger-Labs/Family-Meal-Planner-App",
+    "Honey-Badger-Labs/Family-Meal-Planner-Types",
+    "Honey-Badger-Labs/Family-Meal-Planner-IaC",
+    "Honey-Badger-Labs/sustainnet-website",
+    "Honey-Badger-Labs/sustainnet-monorepo",
+    "Honey-Badger-Labs/sustainnet-observability",
+    "Honey-Badger-Labs/GH1MA",
+]
 
 # Explicit production workflow hints per repo (filenames or tokens)
 PRODUCTION_HINTS = {
@@ -42,251 +121,655 @@ def iso(dt: datetime) -> str:
     return dt.astimezone(UTC).isoformat().replace(TZ_Z, "Z")
 
 
-def gh_get(url: str, token: Optional[str], params: Dict = None) -> Dict:
-    headers = {"Accept": "application/vnd.github+json"}
+def configure_concurrency(limit: int) -> None:
+    """Set the collection concurrency limit (max in-flight requests and worker threads)."""
+    global _concurrency, _request_slots
+    _concurrency = max(1, limit)
+    _request_slots = threading.BoundedSemaphore(_concurrency) if _concurrency > 1 else None
+
+
+def configure_transport(transport: Optional[Transport]) -> None:
+    """Send requests through `transport` (None uses the shared default)."""
+    global _transport
+    _transport = transport
+
+
+def configure_http_cache(cache: Optional[ResponseCache]) -> None:
+    """Route gh_get through a conditional-request cache (None disables it)."""
+    global _http_cache
+    _http_cache = cache
+
+
+def configure_scheduler(scheduler: Optional[RequestScheduler]) -> None:
+    """Send every request through a rate-limit-aware scheduler; its token pool replaces the token argument."""
+    global _scheduler
+    _scheduler = scheduler
+
+
+def configure_phases(timer: PhaseTimer) -> None:
+    """Charge collection phases to a caller's timer (e.g. a pipeline that reports one summary)."""
+    global _phases
+    _phases = timer
+
+
+def map_ordered(fn: Callable[[T], R], items: Sequence[T]) -> List[R]:
+    """Apply fn to items, fanning out across threads, and return results in input order."""
+    if _concurrency <= 1 or len(items) <= 1:
+        return [fn(item) for item in items]
+    with ThreadPoolExecutor(max_workers=min(_concurrency, len(items))) as pool:
+        return list(pool.map(fn, items))
+
+
+def _send(url: str, headers: Dict, params: Dict, token: Optional[str]) -> Reply:
     if token:
-        headers["Authorization"] = f"Bearer {token}"
-    r = requests.get(url, headers=headers, params=params or {})
+        headers = {**headers, "Authorization": f"Bearer {token}"}
+    transport = _transport or shared_transport()
+    if _request_slots is None:
+        return transport.get(url, headers, params)
+    with _request_slots:
+        return transport.get(url, headers, params)
+
+
+def _request(url: str, headers: Dict, params: Dict, token: Optional[str]) -> Reply:
+    if _scheduler is None:
+        return _send(url, headers, params, token)
+    return _scheduler.call(lambda tok: _send(url, headers, params, tok), lambda r: (r.status_code, r.headers))
+
+
+def gh_get_response(url: str, token: Optional[str], params: Dict = None) -> Tuple[object, Mapping[str, str]]:
+    """Decoded JSON body and response headers (those of the 304 when answered from the cache)."""
+    headers = {"Accept": "application/vnd.github+json"}
+    params = params or {}
+    if _http_cache is None:
+        r = _request(url, headers, params, token)
+        r.raise_for_status()
+        return r.json(), r.headers
+
+    key = cache_key(url, params)
+    r = _request(url, {**headers, **_http_cache.validators(key)}, params, token)
+    if r.status_code == 304:
+        body = _http_cache.revalidated(key)
+        if body is not None:
+            return json.loads(body), r.headers
+        r = _request(url, headers, params, token)
     r.raise_for_status()
-    return r.json()
+    return json.loads(_http_cache.store(key, r.headers, r.content)), r.headers
+
+
+def gh_get(url: str, token: Optional[str], params: Dict = None) -> Dict:
+    return gh_get_response(url, token, params)[0]
+
+
+def gh_download(url: str, token: Optional[str]) -> IO[bytes]:
+    """Stream a binary response (an artifact archive behind a redirect) into a spooled temporary file."""
+
+    def send(tok: Optional[str]) -> Tuple[Reply, IO[bytes]]:
+        headers = {"Authorization": f"Bearer {tok}"} if tok else {}
+        transport = _transport or shared_transport()
+        if _request_slots is None:
+            return transport.download(url, headers)
+        with _request_slots:
+            return transport.download(url, headers)
+
+    if _scheduler is None:
+        reply, body = send(token)
+    else:
+        reply, body = _scheduler.call(send, lambda result: (result[0].status_code, result[0].headers))
+    if reply.status_code >= 400:
+        body.close()
+        reply.raise_for_status()
+    return body
+
+
+def gh_get_pages(
+    url: str,
+    token: Optional[str],
+    key: str,
+    params: Dict = None,
+    outside: Optional[Callable[[Dict], bool]] = None,
+) -> List[Dict]:
+    """Collect the pages of a list endpoint via paginate.py.
+
+    Pages after the first are prefetched in parallel when concurrency is
+    enabled; items are concatenated in page order so the result matches a
+    sequential walk. `outside` ends the walk at the first page whose items
+    all fall outside the window.
+    """
+    params = dict(params or {})
+
+    def get_page(page: int) -> Tuple[object, Mapping[str, str]]:
+        return gh_get_response(url, token, {**params, "per_page": PER_PAGE, "page": page})
+
+    return paginate(get_page, key, outside, _concurrency, PER_PAGE)
+
+
+def discover_org_repos(org: str, token: Optional[str], active_days: int, ttl_seconds: float) -> List[str]:
+    """Active repos of an org via repo_discovery, listing pages concurrently when concurrency is enabled."""
+
+    def get_page(page: int):
+        return gh_get_response(f"{API}/orgs/{org}/repos", token, {"type": "all", "per_page": PER_PAGE, "page": page})
+
+    with _phases.phase("discovery"):
+        return discover_repos(org, get_page, CACHE_DIR, active_days, ttl_seconds, _concurrency)
 
 
 def list_workflows(owner: str, repo: str, token: Optional[str]) -> List[Dict]:
-    out = []
-    page = 1
-    while True:
-        data = gh_get(f"{API}/repos/{owner}/{repo}/actions/workflows", token, {"per_page": 100, "page": page})
-        out.extend(data.get("workflows", []))
-        if len(data.get("workflows", [])) < 100:
-            break
-        page += 1
-    return out
+    with _phases.phase("workflows"):
+        return gh_get_pages(f"{API}/repos/{owner}/{repo}/actions/workflows", token, "workflows")
 
 
 def list_runs_for_workflow(owner: str, repo: str, workflow_id: int, token: Optional[str], since: datetime) -> List[Dict]:
-    out = []
-    page = 1
-    while True:
-        data = gh_get(
+    with _phases.phase("runs"):
+        return gh_get_pages(
             f"{API}/repos/{owner}/{repo}/actions/workflows/{workflow_id}/runs",
             token,
-            {"per_page": 100, "page": page, "created": f">={iso(since)}"},
+            "workflow_runs",
+            {"created": f">={iso(since)}"},
+            lambda run: bool(run.get("created_at")) and parse_ts(run["created_at"]) < since,
         )
-        out.extend(data.get("workflow_runs", []))
-        if len(data.get("workflow_runs", [])) < 100:
-            break
-        page += 1
-    return out
 
 
-def get_commit(owner: str, repo: str, sha: str, token: Optional[str]) -> Optional[Dict]:
-    try:
-        return gh_get(f"{API}/repos/{owner}/{repo}/commits/{sha}", token)
-    except requests.HTTPError:
-        return None
+def parse_ts(ts: str) -> datetime:
+    return datetime.fromisoformat(ts.replace("Z", TZ_Z))
 
 
-def is_production_run(run: Dict, owner: str, repo: str) -> bool:
-    name = (run.get("name") or "").lower()
-    display_title = (run.get("display_title") or "").lower()
-    path = (run.get("path") or "").lower()
+def sync_workflow_runs(
+    owner: str, repo: str, workflow_id: int, token: Optional[str], since: datetime, store: RunStore, settle: timedelta
+) -> None:
+    """Bring the run store up to date for one workflow.
+
+    When the store already covers the window, only runs created after the
+    watermark minus the settle window are fetched, reaching further back for
+    any stored run that was still in progress. Otherwise the whole window is
+    fetched once.
+    """
     full = f"{owner}/{repo}"
-    tokens = PRODUCTION_HINTS.get(full, [])
-    # Exact token match first
-    for t in tokens:
-        if t.lower() in name or t.lower() in display_title or t.lower() in path:
-            return True
-    # Fallback heuristic: look for production+deployment patterns
-    text = " ".join([name, display_title, path])
-    has_prod = any(kw in text for kw in ("prod", "production"))
-    has_deploy = any(kw in text for kw in ("deploy", "release", "deployment"))
-    # Accept if both production and deployment indicators, OR if just production (tends to be explicit)
-    # Check for main/master branch but use word boundaries to avoid false matches
-    has_main_branch = any(branch in text.split() for branch in ("main", "master"))
-    return has_prod or (has_deploy and has_main_branch)
-
-
-def compute_repo_metrics(owner: str, repo: str, token: Optional[str], window_days: int) -> Dict:
-    since = datetime.now(UTC) - timedelta(days=window_days)
-    workflows = list_workflows(owner, repo, token)
-    prod_runs: List[Dict] = []
-
-    for wf in workflows:
-        runs = list_runs_for_workflow(owner, repo, wf["id"], token, since)
-        prod_runs.extend([r for r in runs if is_production_run(r, owner, repo)])
-
-    if not prod_runs:
-        return {
-            "deployments": 0,
-            "deployment_frequency_per_day": 0,
-            "lead_time_hours_median": None,
-            "change_failure_rate": None,
-            "time_to_restore_hours_avg": None,
-        }
+    wm = store.watermark(full, workflow_id)
+    fetch_from = since
+    covered_from = iso(since)
+    if wm and wm.covered_from and wm.covered_from <= covered_from:
+        covered_from = wm.covered_from
+        if wm.created_at:
+            fetch_from = max(since, parse_ts(wm.created_at) - settle)
+        if wm.open_from:
+            fetch_from = max(since, min(fetch_from, parse_ts(wm.open_from)))
+    runs = list_runs_for_workflow(owner, repo, workflow_id, token, fetch_from)
+    with _phases.phase("store"):
+        store.upsert_runs(full, workflow_id, runs, covered_from)
 
-    # Sort by created_at
-    prod_runs.sort(key=lambda r: r.get("created_at") or r.get("run_started_at") or "")
 
-    total = len(prod_runs)
-    failures = [r for r in prod_runs if (r.get("conclusion") or "").lower() in {"failure", "cancelled", "timed_out"}]
-    successes = [r for r in prod_runs if (r.get("conclusion") or "").lower() == "success"]
+def get_commit(owner: str, repo: str, sha: str, token: Optional[str]) -> Optional[Dict]:
+    try:
+        return gh_get(f"{API}/repos/{owner}/{repo}/commits/{sha}", token)
+    except HTTPStatusError:
+        return None
 
-    # Deployment frequency
-    dep_freq = round(total / float(window_days), 3)
 
-    # Lead time: from head commit author date to run updated_at
-    lead_times: List[float] = []
-    skipped_commits = 0
-    for r in successes:
-        head_sha = r.get("head_sha")
-        updated_at = r.get("updated_at") or r.get("created_at") or r.get("run_started_at")
-        if not head_sha or not updated_at:
-            continue
-        commit = get_commit(owner, repo, head_sha, token)
-        if not commit:
-            skipped_commits += 1
-            continue
-        commit_dt_s = (
-            commit.get("commit", {})
-            .get("author", {})
-            .get("date")
-        ) or commit.get("commit", {}).get("committer", {}).get("date")
-        if not commit_dt_s:
-            continue
-        try:
-            commit_dt = datetime.fromisoformat(commit_dt_s.replace("Z", TZ_Z))
-            done_dt = datetime.fromisoformat(updated_at.replace("Z", TZ_Z))
-            hours = (done_dt - commit_dt).total_seconds() / 3600.0
-            if hours >= 0:
-                lead_times.append(hours)
-        except Exception:
-            continue
-    
-    if skipped_commits > 0:
-        print(f"Warning: Skipped {skipped_commits} deployments due to missing commit data for {owner}/{repo}")
+def resolve_commit_dates(
+    owner: str, repo: str, shas: List[str], token: Optional[str], cache: Optional[CommitCache] = None
+) -> Dict[str, CommitDates]:
+    """Return (author_date, committer_date) per sha, fetching only what the cache lacks.
 
-    lead_median = round(statistics.median(lead_times), 2) if lead_times else None
+    Shas whose commit could not be fetched are absent from the result.
+    """
+    full = f"{owner}/{repo}"
+    with _phases.phase("commits"):
+        found = cache.get_many(full, shas) if cache else {}
+        missing = [sha for sha in dict.fromkeys(shas) if sha not in found]
+
+        fetched: Dict[str, CommitDates] = {}
+        for sha, commit in zip(missing, map_ordered(lambda sha: get_commit(owner, repo, sha, token), missing)):
+            if not commit:
+                continue
+            meta = commit.get("commit", {})
+            fetched[sha] = (meta.get("author", {}).get("date"), meta.get("committer", {}).get("date"))
+
+        if cache:
+            cache.put_many(full, fetched)
+        found.update(fetched)
+        return found
+
+
+class ProductionClassifier:
+    """Production-run matcher compiled once per repo from PRODUCTION_HINTS.
+
+    A run is production if its name, display title or path contains a repo
+    hint or "prod" (which also covers "production"), or if it mentions
+    deploy/release together with a main/master token.
+
+    Workflows are screened first from their own name and path: one that has
+    neither a production nor a deploy/release indicator can only match through
+    a run's display title (commit message), so its runs are never fetched.
+    """
+
+    def __init__(self, owner: str, repo: str):
+        hints = {t.lower() for t in PRODUCTION_HINTS.get(f"{owner}/{repo}", [])} | {"prod"}
+        self._prod = re.compile("|".join(re.escape(t) for t in sorted(hints, key=len, reverse=True)))
+        self._deploy = re.compile("deploy|release")
+        # Whitespace-delimited token match, so "maintenance" does not count as main
+        self._branch = re.compile(r"(?<!\S)(?:main|master)(?!\S)")
+
+    def is_candidate_workflow(self, workflow: Dict) -> bool:
+        text = f"{workflow.get('name') or ''} {workflow.get('path') or ''}".lower()
+        return bool(self._prod.search(text) or self._deploy.search(text))
+
+    def is_production_run(self, run: Dict) -> bool:
+        text = f"{run.get('name') or ''} {run.get('display_title') or ''} {run.get('path') or ''}".lower()
+        if self._prod.search(text):
+            return True
+        return bool(self._deploy.search(text) and self._branch.search(text))
 
-    # Change failure rate
-    cfr = round(len(failures) / total, 3) if total else None
 
-    # Time to restore: for each failed run, time until next success
-    ttrs: List[float] = []
-    for i, fr in enumerate(prod_runs):
-        concl = (fr.get("conclusion") or "").lower()
-        if concl not in {"failure", "cancelled", "timed_out"}:
-            continue
-        fail_time_s = fr.get("updated_at") or fr.get("created_at") or fr.get("run_started_at")
-        if not fail_time_s:
-            continue
-        fail_time = datetime.fromisoformat(fail_time_s.replace("Z", TZ_Z))
-        # Find next success after this index
-        for nr in prod_runs[i + 1 :]:
-            if (nr.get("conclusion") or "").lower() == "success":
-                succ_time_s = nr.get("updated_at") or nr.get("created_at") or nr.get("run_started_at")
-                if succ_time_s:
-                    succ_time = datetime.fromisoformat(succ_time_s.replace("Z", TZ_Z))
-                    delta_h = (succ_time - fail_time).total_seconds() / 3600.0
-                    if delta_h >= 0:
-                        ttrs.append(delta_h)
-                break
-
-    ttr_avg = round(sum(ttrs) / len(ttrs), 2) if len(ttrs) > 0 else None
+@lru_cache(maxsize=None)
+def production_classifier(owner: str, repo: str) -> ProductionClassifier:
+    return ProductionClassifier(owner, repo)
 
-    return {
-        "deployments": total,
-        "deployment_frequency_per_day": dep_freq,
-        "lead_time_hours_median": lead_median,
-        "change_failure_rate": cfr,
-        "time_to_restore_hours_avg": ttr_avg,
-    }
 
+def is_production_run(run: Dict, owner: str, repo: str) -> bool:
+    return production_classifier(owner, repo).is_production_run(run)
+
+
+def evaluate_windows(
+    full: str,
+    windows: Sequence[int],
+    events: Iterable[RunEvent],
+    resolve: Callable[[List[str]], Dict[str, Optional[float]]],
+    bucket: str = "day",
+) -> Tuple[Dict[int, Dict], DoraSeries]:
+    """Metrics for every window (in days) plus a bucketed series from time-ordered production events.
+
+    `resolve` maps head shas to commit timestamps; it is called in batches.
+    """
+    now_ts = datetime.now(UTC).timestamp()
+    # Windows are suffixes of the time-ordered stream, largest first
+    ordered = sorted(set(windows), reverse=True)
+    cutoffs = [(now_ts - w * DAY_SECONDS, DoraAccumulator()) for w in ordered]
+    widest = cutoffs[0][1]
+    series = DoraSeries(bucket)
+    # Commit lookups inside the loop are charged to their own phase
+    with _phases.phase("engine"):
+        for event, commit_times in with_commit_times(events, resolve):
+            lead_hours, restores = widest.add(event, commit_times)
+            series.add(event, lead_hours, restores)
+            for cutoff, acc in cutoffs[1:]:
+                if event.order_ts >= cutoff:
+                    acc.add(event, commit_times)
+
+    if widest.skipped_commits > 0:
+        print(f"Warning: Skipped {widest.skipped_commits} deployments due to missing commit data for {full}")
+
+    return {w: acc.result(w) for w, (_, acc) in zip(ordered, cutoffs)}, series
+
+
+def windows_from_runs(
+    owner: str,
+    repo: str,
+    token: Optional[str],
+    windows: Sequence[int],
+    workflows: List[Dict],
+    runs: Iterable[Tuple[Dict, int]],
+    commit_cache: Optional[CommitCache] = None,
+    bucket: str = "day",
+    history: Optional[RunHistory] = None,
+    presorted: bool = False,
+) -> Tuple[Dict[int, Dict], DoraSeries]:
+    """Metrics and series from already-fetched (run, workflow id) pairs covering the largest window.
+
+    Every run is merged into `history` when given. Runs are ordered by
+    creation time unless `presorted` says they already are.
+    """
+    classifier = production_classifier(owner, repo)
+    full = f"{owner}/{repo}"
+    rows: List[Optional[HistoryRow]] = []
+
+    def production_events() -> Iterator[RunEvent]:
+        """Engine events for production runs, recording every run (with its workflow id) for the history."""
+        for r, workflow_id in runs:
+            production = classifier.is_production_run(r)
+            if not (production or history):
+                continue
+            event = to_event(r)
+            if history:
+                rows.append(history_row(r, event, production, workflow_id))
+            if production:
+                yield event
+
+    events: Iterable[RunEvent] = production_events()
+    if not presorted:
+        events = sorted(events, key=lambda e: e.order_ts)
+
+    def resolve(shas: List[str]) -> Dict[str, Optional[float]]:
+        found = resolve_commit_dates(owner, repo, shas, token, commit_cache)
+        return {sha: epoch(author or committer) for sha, (author, committer) in found.items()}
+
+    result = evaluate_windows(full, windows, events, resolve, bucket)
+    if history:
+        with _phases.phase("history"):
+            history.merge(full, rows, {wf["id"]: wf.get("name") or wf.get("path") for wf in workflows})
+    return result
+
+
+def compute_repo_windows(
+    owner: str,
+    repo: str,
+    token: Optional[str],
+    windows: Sequence[int],
+    commit_cache: Optional[CommitCache] = None,
+    run_store: Optional[RunStore] = None,
+    settle: timedelta = timedelta(hours=48),
+    prefilter: bool = True,
+    bucket: str = "day",
+    history: Optional[RunHistory] = None,
+    offline: bool = False,
+) -> Tuple[Dict[int, Dict], DoraSeries]:
+    """Metrics for every window (in days) plus a bucketed series, from one fetch of the largest window.
+
+    Fetched runs are merged into `history` when given; with `offline` the
+    runs come from `history` and commit dates from `commit_cache` only.
+    """
+    since = datetime.now(UTC) - timedelta(days=max(windows))
+    full = f"{owner}/{repo}"
 
-def main():
-    parser = argparse.ArgumentParser()
-    parser.add_argument("--window-days", type=int, default=30)
-    parser.add_argument("--repos-file", type=str, default=None)
-    args = parser.parse_args()
+    if offline:
+        if history is None:
+            raise ValueError("offline mode needs a run history")
 
-    token = os.getenv("GITHUB_TOKEN") or os.getenv("GH_TOKEN")
+        def resolve_cached(shas: List[str]) -> Dict[str, Optional[float]]:
+            found = commit_cache.get_many(full, shas) if commit_cache else {}
+            return {sha: epoch(author or committer) for sha, (author, committer) in found.items()}
 
-    # Default SustainNet repos if no file provided
-    default_repos = [
-        "Honey-Badger-Labs/sustainnet-vision",
-        "Honey-Badger-Labs/Hello-World",
-        "Honey-Badger-Labs/Hello-World-Flow-Test",
-        "Honey-Badger-Labs/Family-Meal-Planner",
-        "Honey-Badger-Labs/Family-Meal-Planner-App",
-        "Honey-Badger-Labs/Family-Meal-Planner-Types",
-        "Honey-Badger-Labs/Family-Meal-Planner-IaC",
-        "Honey-Badger-Labs/sustainnet-website",
-        "Honey-Badger-Labs/sustainnet-monorepo",
-        "Honey-Badger-Labs/sustainnet-observability",
-        "Honey-Badger-Labs/GH1MA",
-    ]
+        return evaluate_windows(full, windows, history.events(full, since.timestamp()), resolve_cached, bucket)
 
-    repos: List[str] = []
-    if args.repos_file and os.path.exists(args.repos_file):
-        with open(args.repos_file) as f:
-            repos = [line.strip() for line in f if line.strip() and not line.startswith("#")]
+    classifier = production_classifier(owner, repo)
+    workflows = list_workflows(owner, repo, token)
+    if prefilter:
+        candidates = [wf for wf in workflows if classifier.is_candidate_workflow(wf)]
+        skipped = len(workflows) - len(candidates)
+        if skipped:
+            print(f"Prefilter: skipped run fetches for {skipped}/{len(workflows)} workflows in {owner}/{repo}")
+        workflows = candidates
+
+    if run_store:
+        map_ordered(lambda wf: sync_workflow_runs(owner, repo, wf["id"], token, since, run_store, settle), workflows)
+        # The store yields runs already ordered by created_at
+        stored = run_store.iter_runs(full, iso(since), [wf["id"] for wf in workflows])
+        runs: Iterable[Tuple[Dict, int]] = ((r, r["workflow_id"]) for r in stored)
     else:
-        repos = default_repos
-
-    aggregate = {
-        "window_days": args.window_days,
-        "generated_at": iso(datetime.now(UTC)),
-        "repos": {},
-    }
-
+        runs_per_workflow = map_ordered(lambda wf: list_runs_for_workflow(owner, repo, wf["id"], token, since), workflows)
+        runs = ((r, wf["id"]) for wf, wf_runs in zip(workflows, runs_per_workflow) for r in wf_runs)
+    return windows_from_runs(
+        owner, repo, token, windows, workflows, runs, commit_cache, bucket, history, presorted=run_store is not None
+    )
+
+
+def compute_repo_metrics(
+    owner: str,
+    repo: str,
+    token: Optional[str],
+    window_days: int,
+    commit_cache: Optional[CommitCache] = None,
+    run_store: Optional[RunStore] = None,
+    settle: timedelta = timedelta(hours=48),
+    prefilter: bool = True,
+    history: Optional[RunHistory] = None,
+    offline: bool = False,
+) -> Dict:
+    by_window, _ = compute_repo_windows(
+        owner, repo, token, [window_days], commit_cache, run_store, settle, prefilter, history=history, offline=offline
+    )
+    return by_window[window_days]
+
+
+def summarize_overall(repo_metrics: Dict[str, Dict]) -> Dict:
+    """Org-wide metrics for one window from the per-repo results."""
     totals = {
         "deployments": 0,
         "deployment_frequency_per_day": 0.0,
-        "lead_times": [],
         "failures": 0,
         "successes": 0,
-        "ttrs": [],
     }
+    # Org-wide distributions are merged from the per-repo sketches, not from per-repo medians
+    lead_time_sketch = QuantileSketch()
+    ttr_sketch = QuantileSketch()
 
-    for full in repos:
-        try:
-            owner, repo = full.split("/", 1)
-        except ValueError:
-            continue
-        metrics = compute_repo_metrics(owner, repo, token, args.window_days)
-        aggregate["repos"][full] = metrics
-
+    for metrics in repo_metrics.values():
         totals["deployments"] += metrics.get("deployments", 0) or 0
         totals["deployment_frequency_per_day"] += metrics.get("deployment_frequency_per_day", 0.0) or 0.0
-        if metrics.get("lead_time_hours_median") is not None:
-            totals["lead_times"].append(metrics["lead_time_hours_median"])  # aggregate medians for simplicity
+        sketches = metrics.get("sketches", {})
+        lead_time_sketch.merge(QuantileSketch.from_dict(sketches.get("lead_time_hours", {})))
+        ttr_sketch.merge(QuantileSketch.from_dict(sketches.get("time_to_restore_hours", {})))
         # We cannot count failures/successes directly without raw runs; approximate CFR by weighting
         if metrics.get("change_failure_rate") is not None and metrics.get("deployments"):
             fail_count = int(round(metrics["change_failure_rate"] * metrics["deployments"]))
             succ_count = metrics["deployments"] - fail_count
             totals["failures"] += fail_count
             totals["successes"] += succ_count
-        if metrics.get("time_to_restore_hours_avg") is not None:
-            totals["ttrs"].append(metrics["time_to_restore_hours_avg"])
 
-    overall = {
+    lead_median = lead_time_sketch.quantile(0.5)
+    ttr_avg = ttr_sketch.mean()
+    return {
         "deployment_frequency_per_day": round(totals["deployment_frequency_per_day"], 3),
-        "lead_time_hours_median": round(statistics.median(totals["lead_times"])) if totals["lead_times"] else None,
+        "lead_time_hours_median": round(lead_median, 2) if lead_median is not None else None,
         "change_failure_rate": round(
             totals["failures"] / (totals["failures"] + totals["successes"]), 3
         ) if (totals["failures"] + totals["successes"]) else None,
-        "time_to_restore_hours_avg": round(sum(totals["ttrs"]) / len(totals["ttrs"]), 2) if totals["ttrs"] else None,
+        "time_to_restore_hours_avg": round(ttr_avg, 2) if ttr_avg is not None else None,
+        **distribution_fields(lead_time_sketch, ttr_sketch),
     }
 
-    aggregate["overall"] = overall
 
-    out_path = os.path.join(os.path.dirname(__file__), "..", "..", "docs", "data", "dora.json")
-    out_path = os.path.abspath(out_path)
-    os.makedirs(os.path.dirname(out_path), exist_ok=True)
-    with open(out_path, "w") as f:
-        json.dump(aggregate, f, indent=2)
+def build_aggregate(
+    windows: Sequence[int], per_window: Dict[int, Dict[str, Dict]], repo_series: Dict[str, DoraSeries], bucket: str
+) -> Dict:
+    """Assemble dora.json from per-window repo metrics and per-repo series; windows[0] is the primary window."""
+    primary = windows[0]
+    aggregate = {
+        "window_days": primary,
+        "generated_at": iso(datetime.now(UTC)),
+        "repos": per_window[primary],
+        "overall": summarize_overall(per_window[primary]),
+    }
+    if len(windows) > 1:
+        aggregate["windows"] = {
+            str(w): {"overall": summarize_overall(per_window[w]), "repos": per_window[w]} for w in windows
+        }
 
-    print(json.dumps(aggregate, indent=2))
+    overall_series = DoraSeries(bucket)
+    for series in repo_series.values():
+        overall_series.merge(series)
+    now_ts = datetime.now(UTC).timestamp()
+    first, last = overall_series.index(now_ts - max(windows) * DAY_SECONDS), overall_series.index(now_ts)
+    aggregate["series"] = {
+        "bucket": bucket,
+        "buckets": overall_series.labels(first, last),
+        "overall": overall_series.to_dict(first, last),
+        "repos": {full: series.to_dict(first, last) for full, series in repo_series.items()},
+    }
+    return aggregate
 
 
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--window-days",
+        type=int,
+        nargs="+",
+        default=[30],
+        help="One or more windows in days, all computed from a single fetch; the first fills the top-level fields",
+    )
+    parser.add_argument("--bucket", choices=["day", "week"], default="day", help="Time-series bucket granularity")
+    parser.add_argument("--repos-file", type=str, default=None)
+    parser.add_argument(
+        "--org",
+        type=str,
+        default=os.getenv("METRICS_ORG") or None,
+        help="Discover the org's active repos instead of using the built-in list (ignored with --repos-file)",
+    )
+    parser.add_argument(
+        "--active-days",
+        type=int,
+        default=DEFAULT_ACTIVE_DAYS,
+        help="With --org, skip repos not pushed to within this many days",
+    )
+    parser.add_argument(
+        "--repos-ttl-hours",
+        type=float,
+        default=DEFAULT_TTL_SECONDS / 3600,
+        help="With --org, reuse a discovered repo list for this long (0 always re-lists)",
+    )
+    parser.add_argument(
+        "--output",
+        type=str,
+        default=os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", "docs", "data", "dora.json")),
+        help="Where to write the metrics JSON",
+    )
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=int(os.getenv("DORA_CONCURRENCY", "1")),
+        help="Max parallel GitHub requests across repos, workflows, pages and commits (1 = sequential)",
+    )
+    parser.add_argument(
+        "--commit-cache",
+        type=str,
+        default=os.path.join(CACHE_DIR, "commits.sqlite"),
+        help="SQLite file caching commit timestamps by (repo, sha)",
+    )
+    parser.add_argument("--no-commit-cache", action="store_true", help="Always fetch commits from the API")
+    parser.add_argument(
+        "--no-prefilter",
+        action="store_true",
+        help="Fetch runs for every workflow instead of only those whose name/path can indicate production",
+    )
+    parser.add_argument(
+        "--http-cache",
+        type=str,
+        default=os.path.join(CACHE_DIR, "http.sqlite"),
+        help="SQLite file holding ETag/Last-Modified validators and bodies for conditional requests",
+    )
+    parser.add_argument("--no-http-cache", action="store_true", help="Send plain GETs without validators")
+    parser.add_argument(
+        "--incremental",
+        action="store_true",
+        help="Fetch only runs newer than the stored watermarks and compute from the local run store",
+    )
+    parser.add_argument(
+        "--run-store",
+        type=str,
+        default=os.path.join(CACHE_DIR, "runs.sqlite"),
+        help="SQLite file holding fetched runs and watermarks for --incremental",
+    )
+    parser.add_argument(
+        "--settle-hours",
+        type=float,
+        default=48.0,
+        help="Re-fetch runs this close to the watermark, since re-runs can still change their conclusion",
+    )
+    parser.add_argument(
+        "--history",
+        type=str,
+        default=os.path.join(CACHE_DIR, "history"),
+        help="Directory of the columnar run history every fetched run is merged into",
+    )
+    parser.add_argument("--no-history", action="store_true", help="Do not keep fetched runs in the run history")
+    parser.add_argument(
+        "--offline",
+        action="store_true",
+        help="Compute from the run history and commit cache only, without calling the GitHub API",
+    )
+    args = parser.parse_args()
+    if args.offline and args.no_history:
+        parser.error("--offline reads the run history; it cannot be combined with --no-history")
+    configure_concurrency(args.concurrency)
+    http_cache = None if args.no_http_cache else ResponseCache(args.http_cache)
+    configure_http_cache(http_cache)
+    transport = Transport(pool_size=max(DEFAULT_POOL_SIZE, args.concurrency))
+    configure_transport(transport)
+    scheduler = RequestScheduler(TokenPool(tokens_from_env()), retry_on=(TransportError,))
+    configure_scheduler(scheduler)
+    commit_cache = None if args.no_commit_cache else CommitCache(args.commit_cache)
+    run_store = RunStore(args.run_store) if args.incremental else None
+    history = None if args.no_history else RunHistory(args.history)
+    settle = timedelta(hours=args.settle_hours)
+
+    token = os.getenv("GITHUB_TOKEN") or os.getenv("GH_TOKEN")
+
+    repos: List[str] = []
+    if args.repos_file and os.path.exists(args.repos_file):
+        with open(args.repos_file) as f:
+            repos = [line.strip() for line in f if line.strip() and not line.startswith("#")]
+    elif args.offline and history.repos():
+        repos = history.repos()
+    elif args.org and not args.offline:
+        try:
+            repos = discover_org_repos(args.org, token, args.active_days, args.repos_ttl_hours * 3600)
+        except TransportError as e:
+            print(f"Warning: Repo discovery for {args.org} failed ({e}); using the built-in repo list")
+            repos = DEFAULT_REPOS
+    else:
+        repos = DEFAULT_REPOS
+
+    windows = list(dict.fromkeys(args.window_days))
+
+    def collect(full: str) -> Optional[Tuple[Dict[int, Dict], DoraSeries]]:
+        try:
+            owner, repo = full.split("/", 1)
+        except ValueError:
+            return None
+        # A failing repo is reported and left out; it must not abort the others
+        try:
+            return compute_repo_windows(
+                owner,
+                repo,
+                token,
+                windows,
+                commit_cache,
+                run_store,
+                settle,
+                not args.no_prefilter,
+                args.bucket,
+                history,
+                args.offline,
+            )
+        except (TransportError, ValueError) as e:
+            print(f"Warning: Failed to collect DORA metrics for {full}: {e}")
+            return None
+
+    per_window: Dict[int, Dict[str, Dict]] = {w: {} for w in windows}
+    repo_series: Dict[str, DoraSeries] = {}
+    for full, collected in zip(repos, map_ordered(collect, repos)):
+        if collected is None:
+            continue
+        by_window, series = collected
+        for w in windows:
+            per_window[w][full] = by_window[w]
+        repo_series[full] = series
+
+    with _phases.phase("output"):
+        aggregate = build_aggregate(windows, per_window, repo_series, args.bucket)
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+        with open(args.output, "w") as f:
+            json.dump(aggregate, f, indent=2)
+
+    if commit_cache:
+        print(f"Commit cache: {commit_cache.hits} hits, {commit_cache.misses} misses")
+        commit_cache.close()
+    if run_store:
+        run_store.close()
+    if http_cache:
+        stats = http_cache.stats()
+        print(f"HTTP cache: {stats['hits']} hits (304), {stats['misses']} misses, hit rate {stats['hit_rate']}")
+        http_cache.close()
+    pool_stats = scheduler.pool.stats()
+    print(
+        f"Scheduler: {scheduler.retries} retries, throttled {pool_stats['waited_seconds']}s (summed over threads) "
+        f"across {pool_stats['tokens']} token(s), requests per token {pool_stats['requests']}"
+    )
+    print(f"Transport: {transport.summary()}")
+    transport.close()
+    print(f"Phases: {_phases.summary()} (summed over threads)")
+
+    print(json.dumps(aggregate, indent=2))
+
 if __name__ == "__main__":
     main()
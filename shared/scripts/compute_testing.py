@@ -7,23 +7,57 @@ Metrics:
 - automation_rate (0..1): fraction of workflow runs with testing
 - defect_leakage_rate (0..1): bugs opened in window / all issues closed in window
 
-This initial implementation focuses on automation_rate and defect_leakage_rate using
-GitHub API. Coverage values are left null until CI exposes standardized coverage artifacts.
+automation_rate and defect_leakage_rate come from the GitHub API. Coverage comes
+from the coverage artifacts (Cobertura XML, lcov, coverage.py JSON) of each test
+workflow's latest successful run, streamed and parsed by coverage_artifacts.py;
+the coverage_* fields stay null for repos that upload no coverage reports.
+
+Environment:
+  GITHUB_API_URL        API base (default https://api.github.com; point it at gh_fixtures.py to replay)
+  TESTING_OUTPUT_PATH   where to write the metrics JSON
+  METRICS_ORG           discover the org's active repos (see repo_discovery.py) instead of REPOS
+  METRICS_BLOB_CACHE    SQLite cache of workflow blobs and test verdicts by blob SHA ("" disables)
+  METRICS_COVERAGE_CACHE  SQLite cache of coverage report totals by artifact id ("" disables)
+
+Workflow files are listed with one git trees call per repo; only blobs whose
+SHA is not in the blob cache are downloaded and inspected, with the YAML-aware
+detector in test_detection.py. Runs and issues are
+filtered to the window server-side and paged by paginate.py, which stops at
+the first page outside the window.
 """
 import os
 import json
-import re
 import base64
 import binascii
 from datetime import datetime, timedelta, timezone
-from typing import Dict, List, Optional
-import urllib.request
-
-API = "https://api.github.com"
+from typing import IO, Callable, Dict, List, Mapping, Optional, Tuple
+
+from blob_cache import BlobCache
+from coverage_artifacts import CoverageCache, CoverageCollector, is_coverage_artifact
+from http_cache import ResponseCache, cache_key
+from http_transport import HTTPStatusError, Reply, TransportError, shared_transport
+from rate_limit import RequestScheduler, TokenPool, tokens_from_env
+from paginate import PER_PAGE, paginate
+from repo_discovery import discover_repos
+from test_detection import DETECTOR_VERSION, Analysis, analyze, workflow_runs_tests
+from timing import PhaseTimer
+
+API = os.environ.get("GITHUB_API_URL", "https://api.github.com").rstrip("/")
 UTC = timezone.utc
 TZ_Z = "+00:00"
 WINDOW_DAYS_DEFAULT = int(os.environ.get("TESTING_WINDOW_DAYS", "30"))
 GITHUB_TOKEN = os.environ.get("GITHUB_TOKEN") or os.environ.get("GH_TOKEN")
+CACHE_DIR = os.environ.get(
+    "METRICS_CACHE_DIR",
+    os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", ".cache", "metrics")),
+)
+# Conditional-request cache shared with compute_dora.py; set to an empty string to disable
+HTTP_CACHE_PATH = os.environ.get("METRICS_HTTP_CACHE", os.path.join(CACHE_DIR, "http.sqlite"))
+BLOB_CACHE_PATH = os.environ.get("METRICS_BLOB_CACHE", os.path.join(CACHE_DIR, "workflow_blobs.sqlite"))
+COVERAGE_CACHE_PATH = os.environ.get("METRICS_COVERAGE_CACHE", os.path.join(CACHE_DIR, "coverage.sqlite"))
+OUTPUT_PATH = os.environ.get(
+    "TESTING_OUTPUT_PATH", os.path.join(os.path.dirname(os.path.dirname(__file__)), "docs", "data", "testing.json")
+)
 
 REPOS = [
     ("Honey-Badger-Labs", "sustainnet-observability"),
@@ -33,41 +67,121 @@ REPOS = [
     ("Honey-Badger-Labs", "sustainnet-monorepo"),
 ]
 
+METRICS_ORG = os.environ.get("METRICS_ORG")
+
 HEADERS = {"Accept": "application/vnd.github+json"}
-if GITHUB_TOKEN:
-    HEADERS["Authorization"] = f"Bearer {GITHUB_TOKEN}"
+WORKFLOWS_DIR = ".github/workflows"
+COVERAGE_FIELDS = ("coverage_overall", "coverage_unit", "coverage_integration", "coverage_e2e")
+
+_http_cache: Optional[ResponseCache] = None
+# Spreads requests over GITHUB_TOKEN/GH_TOKEN/GITHUB_TOKENS and retries rate limits
+_scheduler: Optional[RequestScheduler] = None
+_phases = PhaseTimer()
+# Workflow blobs and their test detection by blob SHA; None keeps them for this process only
+_blob_cache: Optional[BlobCache] = None
+_analyses: Dict[str, Analysis] = {}
+
+
+def iso(dt: datetime) -> str:
+    return dt.astimezone(UTC).isoformat().replace(TZ_Z, "Z")
+
+
+def _open(url: str, headers: Dict[str, str], token: Optional[str]) -> Reply:
+    """Send one GET over the shared pooled transport; HTTP error statuses are returned so they can be retried."""
+    if token:
+        headers = {**headers, "Authorization": f"Bearer {token}"}
+    return shared_transport().get(url, headers)
 
 
 def api_get(url: str) -> Dict:
-    req = urllib.request.Request(url, headers=HEADERS)
+    return api_get_response(url)[0]
+
+
+def api_get_response(url: str) -> Tuple[object, Mapping[str, str]]:
+    """Decoded JSON body and response headers (those of the 304 when answered from the cache)."""
+    headers = dict(HEADERS)
+    key = cache_key(url)
+    if _http_cache:
+        headers.update(_http_cache.validators(key))
     try:
-        with urllib.request.urlopen(req, timeout=30) as resp:
-            return json.loads(resp.read().decode("utf-8"))
-    except urllib.error.HTTPError as e:
-        print(f"HTTP error {e.code} fetching {url}: {e.reason}")
-        raise
-    except urllib.error.URLError as e:
-        print(f"URL error fetching {url}: {e.reason}")
+        if _scheduler:
+            reply = _scheduler.call(
+                lambda token: _open(url, headers, token), lambda reply: (reply.status_code, reply.headers)
+            )
+        else:
+            reply = _open(url, headers, GITHUB_TOKEN)
+    except TransportError as e:
+        print(f"URL error fetching {url}: {e}")
         raise
+    if reply.status_code >= 300:
+        # Answer 304 Not Modified from the cache
+        if reply.status_code == 304 and _http_cache:
+            cached = _http_cache.revalidated(key)
+            if cached is not None:
+                return json.loads(cached.decode("utf-8")), reply.headers
+        print(f"HTTP error {reply.status_code} fetching {url}")
+        raise HTTPStatusError(reply.status_code, url, reply.headers)
+    body = reply.content
+    if _http_cache:
+        body = _http_cache.store(key, reply.headers, body)
+    return json.loads(body.decode("utf-8")), reply.headers
+
+
+def download(url: str) -> IO[bytes]:
+    """Stream a binary response (an artifact archive behind a redirect) into a spooled temporary file."""
+
+    def send(token: Optional[str]):
+        headers = {"Authorization": f"Bearer {token}"} if token else {}
+        return shared_transport().download(url, headers)
+
+    if _scheduler:
+        reply, body = _scheduler.call(send, lambda result: (result[0].status_code, result[0].headers))
+    else:
+        reply, body = send(GITHUB_TOKEN)
+    if reply.status_code >= 400:
+        body.close()
+        print(f"HTTP error {reply.status_code} downloading {url}")
+        reply.raise_for_status()
+    return body
+
+
+def list_repos() -> List[Tuple[str, str]]:
+    """REPOS, or the active repos of METRICS_ORG when it is set."""
+    if not METRICS_ORG:
+        return REPOS
+
+    def get_page(page: int):
+        return api_get_response(f"{API}/orgs/{METRICS_ORG}/repos?type=all&per_page={PER_PAGE}&page={page}")
+
+    try:
+        with _phases.phase("discovery"):
+            discovered = discover_repos(METRICS_ORG, get_page, CACHE_DIR)
+    except TransportError as e:
+        print(f"Repo discovery for {METRICS_ORG} failed ({e}); using the built-in repo list")
+        return REPOS
+    return [tuple(full.split("/", 1)) for full in discovered]
 
 
 def list_workflows(owner: str, repo: str) -> List[Dict]:
-    workflows: List[Dict] = []
-    page = 1
-    while True:
-        url = f"{API}/repos/{owner}/{repo}/actions/workflows?per_page=100&page={page}"
-        data = api_get(url)
-        page_workflows = data.get("workflows", [])
-        if not page_workflows:
-            break
-        workflows.extend(page_workflows)
-        if len(page_workflows) < 100:
-            break
-        page += 1
-    return workflows
-
-
-def get_workflow_content(owner: str, repo: str, workflow_path: str) -> Optional[str]:
+    url = f"{API}/repos/{owner}/{repo}/actions/workflows?per_page={PER_PAGE}"
+    return paginate(lambda page: api_get_response(f"{url}&page={page}"), "workflows")
+
+
+def decode_content(data: Dict) -> Optional[str]:
+    """Decode the base64 `content` of a contents or git blob API response."""
+    # The content is base64 encoded
+    content_b64 = data.get("content", "")
+    if not content_b64:
+        return None
+    # Remove whitespace that GitHub API may include
+    content_b64 = content_b64.replace("\n", "").replace(" ", "")
+    decoded_bytes = base64.b64decode(content_b64)
+    return decoded_bytes.decode("utf-8", errors="replace")
+
+
+def get_workflow_content(
+    owner: str, repo: str, workflow_path: str, get: Callable[[str], object] = api_get
+) -> Optional[str]:
     """Fetch the content of a workflow file from the repository."""
     try:
         # Remove leading slash if present
@@ -75,14 +189,7 @@ def get_workflow_content(owner: str, repo: str, workflow_path: str) -> Optional[
         while path.startswith("/"):
             path = path[1:]
         url = f"{API}/repos/{owner}/{repo}/contents/{path}"
-        data = api_get(url)
-        # The content is base64 encoded
-        content_b64 = data.get("content", "")
-        if content_b64:
-            # Remove whitespace that GitHub API may include
-            content_b64 = content_b64.replace("\n", "").replace(" ", "")
-            decoded_bytes = base64.b64decode(content_b64)
-            return decoded_bytes.decode("utf-8", errors="replace")
+        return decode_content(get(url))
     except (binascii.Error, UnicodeDecodeError) as e:
         print(f"Failed to decode workflow content for {workflow_path}: {e}")
     except Exception as e:
@@ -90,110 +197,210 @@ def get_workflow_content(owner: str, repo: str, workflow_path: str) -> Optional[
     return None
 
 
-def workflow_executes_tests(workflow_content: str) -> bool:
+def get_blob(owner: str, repo: str, sha: str, get: Callable[[str], object] = api_get) -> Optional[str]:
+    try:
+        return decode_content(get(f"{API}/repos/{owner}/{repo}/git/blobs/{sha}"))
+    except (binascii.Error, UnicodeDecodeError) as e:
+        print(f"Failed to decode blob {sha} in {owner}/{repo}: {e}")
+    except Exception as e:
+        print(f"Failed to fetch blob {sha} in {owner}/{repo}: {e}")
+    return None
+
+
+def list_workflow_files(owner: str, repo: str, get: Callable[[str], object] = api_get) -> Optional[Dict[str, str]]:
+    """Blob SHA of every file under .github/workflows by path, or None when the tree cannot be read.
+
+    One trees call resolves "HEAD:.github/workflows" directly; if the API
+    rejects the path expression the tree is walked from the root instead.
+    A repo without the directory (or without commits) has no files.
     """
-    Check if a workflow file actually executes tests by inspecting its content.
-    
-    This looks for explicit test execution commands in the workflow steps,
-    rather than relying on workflow names which can be misleading.
+    base = f"{API}/repos/{owner}/{repo}/git/trees"
+    try:
+        try:
+            tree = get(f"{base}/HEAD:{WORKFLOWS_DIR}")
+        except HTTPStatusError as e:
+            if e.status_code != 404:
+                raise
+            tree = get(f"{base}/HEAD")
+            for name in WORKFLOWS_DIR.split("/"):
+                entry = next((t for t in tree.get("tree", []) if t.get("path") == name and t.get("type") == "tree"), None)
+                if entry is None:
+                    return {}
+                tree = get(f"{base}/{entry['sha']}")
+    except HTTPStatusError as e:
+        # 404: no such tree; 409: empty repository
+        if e.status_code in (404, 409):
+            return {}
+        print(f"Failed to list workflow files for {owner}/{repo}: {e}")
+        return None
+    except Exception as e:
+        print(f"Failed to list workflow files for {owner}/{repo}: {e}")
+        return None
+    return {f"{WORKFLOWS_DIR}/{t['path']}": t["sha"] for t in tree.get("tree", []) if t.get("type") == "blob"}
+
+
+def blob_analyses(
+    owner: str, repo: str, shas: List[str], get: Callable[[str], object] = api_get
+) -> Dict[str, Analysis]:
+    """Test detection results by blob SHA: from this process, then the blob cache, then downloaded."""
+    unknown = [sha for sha in dict.fromkeys(shas) if sha not in _analyses]
+    cached = _blob_cache.get_many(unknown, DETECTOR_VERSION) if _blob_cache else {}
+    fresh: Dict[str, Tuple[Optional[str], Analysis]] = {}
+    for sha in unknown:
+        content, analysis = cached.get(sha, (None, None))
+        if analysis is None:
+            if sha not in cached:
+                content = get_blob(owner, repo, sha, get)
+                if content is None:
+                    # Not cached, so a later run tries again
+                    _analyses[sha] = Analysis(False)
+                    continue
+            analysis = analyze(content)
+            fresh[sha] = (content, analysis)
+        _analyses[sha] = Analysis(*analysis)
+    if _blob_cache:
+        _blob_cache.put_many(fresh, DETECTOR_VERSION)
+    return {sha: _analyses[sha] for sha in shas}
+
+
+def workflow_test_verdicts(
+    owner: str, repo: str, paths: List[str], get: Callable[[str], object] = api_get
+) -> Dict[str, bool]:
+    """Whether each workflow file in `paths` executes tests, itself or through local reusable workflows.
+
+    Files are analysed by blob SHA (see blob_analyses); the local reusable
+    workflows they call are analysed too, round by round. Paths missing
+    from the tree (e.g. dynamic workflows) do not execute tests. Without a
+    readable tree every file is fetched through the contents API.
     """
-    if not workflow_content:
-        return False
-    
-    # Patterns that indicate actual test execution
-    # These are command patterns that actually run tests, not just documentation or deployment
-    test_execution_patterns = [
-        r'\bnpm\s+(run\s+)?test\b',           # npm test, npm run test
-        r'\bnpm\s+run\s+test:(unit|integration|e2e|coverage|all|watch|ci)\b',  # specific test commands
-        r'\byarn\s+(run\s+)?test\b',          # yarn test
-        r'\bpnpm\s+(run\s+)?test\b',          # pnpm test
-        r'\bpytest\b',                         # pytest
-        r'\bpython\s+-m\s+pytest\b',          # python -m pytest
-        r'\bpython\s+-m\s+unittest\b',        # python -m unittest
-        r'\bjest\b',                           # jest
-        r'\bvitest\b',                         # vitest
-        r'\bplaywright\s+test\b',             # playwright test
-        r'\bcypress\s+run\b',                 # cypress run
-        r'\bmvn\s+test\b',                    # mvn test
-        r'\bgradle\s+test\b',                 # gradle test
-        r'\bgo\s+test\b',                     # go test
-        r'\bcargo\s+test\b',                  # cargo test
-        r'\bdotnet\s+test\b',                 # dotnet test
-        r'\bphpunit\b',                       # phpunit
-        r'\brspec\s+(run|spec)\b',            # rspec run, rspec spec
-        r'\bruby\s+-s\s+rspec\b',             # ruby -S rspec (content is lowercased before matching)
-        r'\bcoverage\s+run\b',                # python coverage
-    ]
-    
-    # Look for test execution patterns in the content
-    content_lower = workflow_content.lower()
-    for pattern in test_execution_patterns:
-        if re.search(pattern, content_lower):
-            return True
-    
-    return False
+    files = list_workflow_files(owner, repo, get)
+    analyses: Dict[str, Analysis] = {}
+    pending = [path.lstrip("/") for path in paths]
+    while pending:
+        wanted = [path for path in dict.fromkeys(pending) if path not in analyses]
+        if files is None:
+            found = {path: analyze(get_workflow_content(owner, repo, path, get)) for path in wanted}
+        else:
+            wanted = [path for path in wanted if path in files]
+            by_sha = blob_analyses(owner, repo, [files[path] for path in wanted], get)
+            found = {path: by_sha[files[path]] for path in wanted}
+        analyses.update(found)
+        pending = [call for analysis in found.values() for call in analysis.calls]
+    return {path: workflow_runs_tests(path.lstrip("/"), analyses) for path in paths}
+
+
+def workflow_executes_tests(workflow_content: Optional[str]) -> bool:
+    """Whether a workflow's own steps execute tests (see test_detection.py); local reusable workflows are not followed."""
+    return analyze(workflow_content).runs_tests
+
+
+def created_at(item: Dict) -> Optional[datetime]:
+    created = item.get("created_at")
+    return datetime.fromisoformat(created.replace("Z", TZ_Z)) if created else None
 
 
 def list_runs_for_workflow(owner: str, repo: str, workflow_id: int, since: datetime) -> List[Dict]:
-    # Note: Created_at filter not directly supported; we will filter client-side
-    out: List[Dict] = []
-    page = 1
-    while True:
-        url = f"{API}/repos/{owner}/{repo}/actions/workflows/{workflow_id}/runs?per_page=100&page={page}"
-        data = api_get(url)
-        runs = data.get("workflow_runs", [])
-        if not runs:
-            break
-        for r in runs:
-            created = r.get("created_at")
-            if not created:
-                continue
-            created_dt = datetime.fromisoformat(created.replace("Z", TZ_Z))
-            if created_dt >= since:
-                out.append(r)
-        if len(runs) < 100:
-            break
-        page += 1
-    return out
-
-
-def list_issues(owner: str, repo: str, state: str, since: datetime) -> List[Dict]:
+    # The created filter is applied server-side; runs come newest first, so the
+    # walk stops at the first page that is entirely older than the window
+    url = (
+        f"{API}/repos/{owner}/{repo}/actions/workflows/{workflow_id}/runs"
+        f"?created=>={iso(since)}&per_page={PER_PAGE}"
+    )
+    runs = paginate(
+        lambda page: api_get_response(f"{url}&page={page}"),
+        "workflow_runs",
+        lambda r: bool(r.get("created_at")) and created_at(r) < since,
+    )
+    return [r for r in runs if r.get("created_at") and created_at(r) >= since]
+
+
+def list_issues(
+    owner: str,
+    repo: str,
+    state: str,
+    since: datetime,
+    get: Callable[[str], Tuple[object, Mapping[str, str]]] = api_get_response,
+) -> List[Dict]:
+    """Issues (not PRs) in `state` that were closed, or else updated, within the window.
+
+    `since=` limits the listing to issues updated since the window start and
+    sort=updated lists them newest first, so the walk ends at the first page
+    updated entirely before the window even if the server ignores `since`.
+    """
+    url = (
+        f"{API}/repos/{owner}/{repo}/issues"
+        f"?state={state}&since={iso(since)}&sort=updated&direction=desc&per_page={PER_PAGE}"
+    )
+
+    def updated_before(it: Dict) -> bool:
+        updated = it.get("updated_at")
+        return bool(updated) and datetime.fromisoformat(updated.replace("Z", TZ_Z)) < since
+
     # Using /issues includes PRs; we filter out pull requests by presence of 'pull_request'
     items: List[Dict] = []
-    page = 1
-    while True:
-        url = f"{API}/repos/{owner}/{repo}/issues?state={state}&per_page=100&page={page}"
-        data = api_get(url)
-        # GitHub returns a list of issues for this endpoint
-        if not data:
-            break
-        page_has_recent = False
-        for it in data:
-            if it.get("pull_request"):
-                continue
-            created = it.get("created_at")
-            updated = it.get("updated_at")
-            closed = it.get("closed_at")
-            # Use updated timestamps for windowing
-            ts = closed or updated or created
-            if not ts:
-                continue
-            dt = datetime.fromisoformat(ts.replace("Z", TZ_Z))
-            if dt >= since:
-                page_has_recent = True
-                items.append(it)
-        # Issues are returned in descending order of recency; once a page has no
-        # items in the window, subsequent pages will be older as well.
-        if not page_has_recent:
-            break
-        page += 1
+    for it in paginate(lambda page: get(f"{url}&page={page}"), outside=updated_before):
+        if it.get("pull_request"):
+            continue
+        created = it.get("created_at")
+        updated = it.get("updated_at")
+        closed = it.get("closed_at")
+        # Use updated timestamps for windowing
+        ts = closed or updated or created
+        if not ts:
+            continue
+        if datetime.fromisoformat(ts.replace("Z", TZ_Z)) >= since:
+            items.append(it)
     return items
 
 
-def compute_repo_testing(owner: str, repo: str, window_days: int) -> Dict:
-    since = datetime.now(tz=UTC) - timedelta(days=window_days)
-    workflows = list_workflows(owner, repo)
+def list_coverage_artifacts(
+    owner: str,
+    repo: str,
+    workflows: List[Dict],
+    runs: Mapping[int, List[Dict]],
+    executes_tests: Mapping[str, bool],
+    get: Callable[[str], Tuple[object, Mapping[str, str]]] = api_get_response,
+) -> List[Dict]:
+    """Unexpired coverage artifacts of the latest successful run of each test workflow.
 
+    One repo-wide artifact listing, newest first, read back only as far as
+    the oldest of those runs.
+    """
+    latest: List[Dict] = []
+    for wf in workflows:
+        if not executes_tests.get(wf.get("path")):
+            continue
+        succeeded = [r for r in runs.get(wf.get("id"), []) if r.get("conclusion") == "success" and r.get("created_at")]
+        if succeeded:
+            latest.append(max(succeeded, key=lambda r: r["created_at"]))
+    if not latest:
+        return []
+    run_ids = {r["id"] for r in latest}
+    oldest = min(created_at(r) for r in latest)
+    url = f"{API}/repos/{owner}/{repo}/actions/artifacts?per_page={PER_PAGE}"
+    try:
+        artifacts = paginate(
+            lambda page: get(f"{url}&page={page}"),
+            "artifacts",
+            lambda a: bool(a.get("created_at")) and created_at(a) < oldest,
+        )
+    except TransportError as e:
+        # Coverage is optional: the other metrics still stand without it
+        print(f"Failed to list artifacts for {owner}/{repo}: {e}")
+        return []
+    return [a for a in artifacts if (a.get("workflow_run") or {}).get("id") in run_ids and is_coverage_artifact(a)]
+
+
+def testing_metrics(
+    full: str,
+    workflows: List[Dict],
+    runs: Mapping[int, List[Dict]],
+    executes_tests: Mapping[str, bool],
+    opened: List[Dict],
+    closed: List[Dict],
+    window_days: int,
+) -> Dict:
+    """Testing metrics of one repo from its fetched workflows, runs (by workflow id), test verdicts (by path) and issues."""
     total_runs = 0
     test_runs = 0
     for wf in workflows:
@@ -201,18 +408,13 @@ def compute_repo_testing(owner: str, repo: str, window_days: int) -> Dict:
         wf_path = wf.get("path")
         if not wf_id or not wf_path:
             continue
-        
-        # Get all runs for this workflow
-        runs = list_runs_for_workflow(owner, repo, wf_id, since)
-        total_runs += len(runs)
-        
-        # Fetch workflow content and check if it actually executes tests
-        workflow_content = get_workflow_content(owner, repo, wf_path)
-        is_test_workflow = workflow_executes_tests(workflow_content)
-        
-        if is_test_workflow:
+        wf_runs = runs.get(wf_id, [])
+        total_runs += len(wf_runs)
+
+        # Check the workflow file itself, not the workflow name, for test execution
+        if executes_tests.get(wf_path):
             # Count runs from test workflows (success or failure are both valid test runs)
-            for r in runs:
+            for r in wf_runs:
                 conclusion = (r.get("conclusion") or "").lower()
                 if conclusion in ["success", "failure"]:
                     test_runs += 1
@@ -221,11 +423,9 @@ def compute_repo_testing(owner: str, repo: str, window_days: int) -> Dict:
 
     # Defect leakage: bugs found in production (opened recently) vs total closed features/fixes
     # A more accurate measure: bugs labeled as 'bug' opened in window / closed issues that were enhancements or features
-    all_opened = list_issues(owner, repo, state="open", since=since)
-    opened_bugs = [i for i in all_opened if any(l.get("name", "").lower() == "bug" for l in i.get("labels", []))]
-    closed_issues = list_issues(owner, repo, state="closed", since=since)
+    opened_bugs = [i for i in opened if any(l.get("name", "").lower() == "bug" for l in i.get("labels", []))]
     # Filter closed issues to exclude bugs (we want features/enhancements closed)
-    closed_non_bugs = [i for i in closed_issues if not any(l.get("name", "").lower() == "bug" for l in i.get("labels", []))]
+    closed_non_bugs = [i for i in closed if not any(l.get("name", "").lower() == "bug" for l in i.get("labels", []))]
     # Defect leakage = bugs found / work items delivered
     # Return None if no work was delivered in the window (can't calculate meaningful rate)
     defect_leakage_rate = (len(opened_bugs) / len(closed_non_bugs)) if len(closed_non_bugs) > 0 else None
@@ -239,13 +439,36 @@ def compute_repo_testing(owner: str, repo: str, window_days: int) -> Dict:
         "defect_leakage_rate": defect_leakage_rate,
         "window_days": window_days,
         "timestamp": datetime.now(tz=UTC).isoformat().replace("+00:00", "Z"),
-        "repo": f"{owner}/{repo}",
+        "repo": full,
         "source": "github_actions+issues",
     }
 
 
-def main():
-    window_days = WINDOW_DAYS_DEFAULT
+def compute_repo_testing(owner: str, repo: str, window_days: int) -> Tuple[Dict, List[Dict]]:
+    """Testing metrics of one repo, coverage still unset, and its coverage artifacts."""
+    since = datetime.now(tz=UTC) - timedelta(days=window_days)
+    with _phases.phase("workflows"):
+        workflows = list_workflows(owner, repo)
+
+    listed = [wf for wf in workflows if wf.get("id") and wf.get("path")]
+    runs: Dict[int, List[Dict]] = {}
+    for wf in listed:
+        with _phases.phase("runs"):
+            runs[wf["id"]] = list_runs_for_workflow(owner, repo, wf["id"], since)
+    with _phases.phase("workflow_files"):
+        executes_tests = workflow_test_verdicts(owner, repo, [wf["path"] for wf in listed])
+
+    with _phases.phase("issues"):
+        opened = list_issues(owner, repo, state="open", since=since)
+        closed = list_issues(owner, repo, state="closed", since=since)
+    with _phases.phase("artifacts"):
+        artifacts = list_coverage_artifacts(owner, repo, listed, runs, executes_tests)
+    metrics = testing_metrics(f"{owner}/{repo}", workflows, runs, executes_tests, opened, closed, window_days)
+    return metrics, artifacts
+
+
+def summarize_testing(repos_out: Dict[str, Dict], window_days: int) -> Dict:
+    """Assemble testing.json from the per-repo metrics."""
     overall = {
         "coverage_overall": None,
         "coverage_unit": None,
@@ -254,21 +477,21 @@ def main():
         "automation_rate": 0.0,
         "defect_leakage_rate": 0.0,  # Will be set to None if no repos have data
     }
-    repos_out: Dict[str, Dict] = {}
-
-    for owner, repo in REPOS:
-        metrics = compute_repo_testing(owner, repo, window_days)
-        repos_out[f"{owner}/{repo}"] = metrics
+    for metrics in repos_out.values():
         # Aggregate automation rate and defect leakage as simple mean
         overall["automation_rate"] += metrics["automation_rate"]
         # Only aggregate defect leakage if it's not None
         if metrics["defect_leakage_rate"] is not None:
             overall["defect_leakage_rate"] += metrics["defect_leakage_rate"]
 
-        # Coverage remains None until data sources are connected
+    # Coverage is averaged over the repos that report it
+    for field in COVERAGE_FIELDS:
+        values = [r[field] for r in repos_out.values() if r.get(field) is not None]
+        if values:
+            overall[field] = sum(values) / len(values)
 
-    if REPOS:
-        overall["automation_rate"] /= len(REPOS)
+    if repos_out:
+        overall["automation_rate"] /= len(repos_out)
         # Only average defect leakage if we have data
         repos_with_leakage = sum(1 for r in repos_out.values() if r["defect_leakage_rate"] is not None)
         if repos_with_leakage > 0:
@@ -276,20 +499,69 @@ def main():
         else:
             overall["defect_leakage_rate"] = None
 
-    out = {
+    return {
         "overall": overall,
         "repos": repos_out,
         "window_days": window_days,
         "timestamp": datetime.now(tz=UTC).isoformat().replace("+00:00", "Z"),
     }
 
+
+def configure_blob_cache(cache: Optional[BlobCache]) -> None:
+    """Keep workflow blobs and verdicts in `cache` across runs (None keeps them in memory only)."""
+    global _blob_cache
+    _blob_cache = cache
+
+
+def main():
+    global _http_cache, _scheduler
+    if HTTP_CACHE_PATH:
+        _http_cache = ResponseCache(HTTP_CACHE_PATH)
+    if BLOB_CACHE_PATH:
+        configure_blob_cache(BlobCache(BLOB_CACHE_PATH))
+    _scheduler = RequestScheduler(TokenPool(tokens_from_env()), retry_on=(TransportError,))
+
+    coverage_cache = CoverageCache(COVERAGE_CACHE_PATH) if COVERAGE_CACHE_PATH else None
+    coverage = CoverageCollector(download, coverage_cache)
+
+    window_days = WINDOW_DAYS_DEFAULT
+    repos_out: Dict[str, Dict] = {}
+    artifacts: Dict[str, List[Dict]] = {}
+    for owner, repo in list_repos():
+        full = f"{owner}/{repo}"
+        repos_out[full], artifacts[full] = compute_repo_testing(owner, repo, window_days)
+    # Artifacts are downloaded for every repo at once, in parallel
+    with _phases.phase("coverage"):
+        for full, fields in coverage.collect(artifacts).items():
+            repos_out[full].update(fields)
+    out = summarize_testing(repos_out, window_days)
+
     # Write to docs/data/testing.json (ensure directory exists)
-    target_path = os.path.join(os.path.dirname(os.path.dirname(__file__)), "docs", "data", "testing.json")
-    os.makedirs(os.path.dirname(target_path), exist_ok=True)
-    with open(target_path, "w") as f:
-        json.dump(out, f, indent=2)
+    target_path = OUTPUT_PATH
+    with _phases.phase("output"):
+        os.makedirs(os.path.dirname(os.path.abspath(target_path)), exist_ok=True)
+        with open(target_path, "w") as f:
+            json.dump(out, f, indent=2)
 
     print(f"Wrote testing metrics to {target_path}")
+    if _http_cache:
+        stats = _http_cache.stats()
+        print(f"HTTP cache: {stats['hits']} hits (304), {stats['misses']} misses, hit rate {stats['hit_rate']}")
+        _http_cache.close()
+    if _blob_cache:
+        print(f"Blob cache: {_blob_cache.hits} hits, {_blob_cache.misses} misses")
+        _blob_cache.close()
+    print(f"Coverage: {coverage.downloaded} artifacts downloaded, {coverage.failed} failed")
+    if coverage_cache:
+        print(f"Coverage cache: {coverage_cache.hits} hits, {coverage_cache.misses} misses")
+        coverage_cache.close()
+    pool_stats = _scheduler.pool.stats()
+    print(
+        f"Scheduler: {_scheduler.retries} retries, throttled {pool_stats['waited_seconds']}s (summed over threads) "
+        f"across {pool_stats['tokens']} token(s), requests per token {pool_stats['requests']}"
+    )
+    print(f"Transport: {shared_transport().summary()}")
+    print(f"Phases: {_phases.summary()}")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,301 @@
+#!/usr/bin/env python3
+"""
+Line coverage from the CI coverage artifacts of the latest successful test runs.
+
+Each artifact archive is streamed into a spooled temporary file (memory up
+to METRICS_HTTP_SPOOL_MB, a temporary file beyond; see http_transport.py)
+and its reports are decompressed member by member and parsed incrementally,
+never extracted, so memory stays flat for multi-hundred-MB reports:
+
+- Cobertura XML: the root's lines-covered/lines-valid, else the <line> hits,
+  with iterparse clearing elements as it goes (defusedxml when installed)
+- lcov: LF/LH (or DA) records, line by line
+- coverage.py JSON: the trailing "totals" object, read from a bounded tail
+
+A report counts as unit, integration or e2e when the artifact name or its
+path in the archive says so; other reports are overall coverage. Artifacts
+never change, so totals are cached by artifact id and each artifact is
+downloaded and parsed once. Downloads run in parallel across repos.
+
+The module is HTTP-client agnostic: `download(url)` returns the archive as
+a readable, seekable binary file.
+
+Usage:
+  collector = CoverageCollector(download, CoverageCache(".cache/metrics/coverage.sqlite"))
+  fields = collector.collect({"owner/repo": artifacts})["owner/repo"]
+
+Environment:
+  METRICS_COVERAGE_CONCURRENCY    parallel artifact downloads (default 4)
+"""
+
+import json
+import os
+import re
+import sqlite3
+import threading
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+from typing import IO, Callable, Dict, Iterable, List, Mapping, NamedTuple, Optional, Tuple
+from xml.etree.ElementTree import ParseError
+
+try:
+    from defusedxml.ElementTree import iterparse
+except ImportError:
+    from xml.etree.ElementTree import iterparse
+
+DEFAULT_CONCURRENCY = int(os.environ.get("METRICS_COVERAGE_CONCURRENCY", "4"))
+# coverage.py writes "totals" last; it is a few hundred bytes
+JSON_TAIL_BYTES = 64 * 1024
+CHUNK_BYTES = 1024 * 1024
+
+COVERAGE_ARTIFACT = re.compile(r"coverage|lcov|cobertura|codecov", re.IGNORECASE)
+KINDS = (
+    ("e2e", re.compile(r"e2e|end[-_ ]?to[-_ ]?end", re.IGNORECASE)),
+    ("integration", re.compile(r"integration", re.IGNORECASE)),
+    ("unit", re.compile(r"unit", re.IGNORECASE)),
+)
+OVERALL = "overall"
+
+
+class LineTotals(NamedTuple):
+    covered: int
+    total: int
+
+
+# Summed report totals of one artifact by kind ("overall", "unit", "integration", "e2e")
+ArtifactTotals = Dict[str, LineTotals]
+
+
+def parse_cobertura(stream: IO[bytes]) -> Optional[LineTotals]:
+    covered = total = 0
+    # Open elements; <method> elements repeat their class's lines
+    open_elements: List = []
+    in_method = 0
+    for event, elem in iterparse(stream, events=("start", "end")):
+        if event == "start":
+            if elem.tag == "coverage" and elem.get("lines-valid") is not None:
+                return LineTotals(int(elem.get("lines-covered") or 0), int(elem.get("lines-valid")))
+            open_elements.append(elem)
+            in_method += elem.tag == "method"
+            continue
+        open_elements.pop()
+        if elem.tag == "method":
+            in_method -= 1
+        elif elem.tag == "line" and not in_method:
+            total += 1
+            covered += int(elem.get("hits") or 0) > 0
+        elif elem.tag == "class" and open_elements:
+            # Detach the counted class so the tree never holds more than one
+            open_elements[-1].remove(elem)
+    return LineTotals(covered, total) if total else None
+
+
+def parse_lcov(stream: IO[bytes]) -> Optional[LineTotals]:
+    found = hit = 0
+    da_total = da_hit = 0
+    for raw in stream:
+        line = raw.strip()
+        try:
+            if line.startswith(b"LF:"):
+                found += int(line[3:])
+            elif line.startswith(b"LH:"):
+                hit += int(line[3:])
+            elif line.startswith(b"DA:"):
+                da_total += 1
+                da_hit += int(line[3:].split(b",")[1]) > 0
+        except (ValueError, IndexError):
+            continue
+    if found:
+        return LineTotals(hit, found)
+    return LineTotals(da_hit, da_total) if da_total else None
+
+
+def parse_coverage_json(stream: IO[bytes]) -> Optional[LineTotals]:
+    tail = b""
+    while True:
+        chunk = stream.read(CHUNK_BYTES)
+        if not chunk:
+            break
+        tail = (tail + chunk)[-JSON_TAIL_BYTES:]
+    text = tail.decode("utf-8", errors="replace")
+    at = text.rfind('"totals"')
+    start = text.find("{", at) if at >= 0 else -1
+    if start < 0:
+        return None
+    try:
+        totals, _ = json.JSONDecoder().raw_decode(text, start)
+    except ValueError:
+        return None
+    if not isinstance(totals, dict) or "num_statements" not in totals:
+        return None
+    return LineTotals(int(totals.get("covered_lines") or 0), int(totals["num_statements"]))
+
+
+def report_parser(path: str) -> Optional[Callable[[IO[bytes]], Optional[LineTotals]]]:
+    """Parser for an archive member that looks like a coverage report, by file name."""
+    name = path.rsplit("/", 1)[-1].lower()
+    if name.endswith(".info") or name.endswith(".lcov"):
+        return parse_lcov
+    if name.endswith(".xml") and ("coverage" in name or "cobertura" in name):
+        return parse_cobertura
+    if name.endswith(".json") and "coverage" in name:
+        return parse_coverage_json
+    return None
+
+
+def report_kind(text: str) -> str:
+    for kind, pattern in KINDS:
+        if pattern.search(text):
+            return kind
+    return OVERALL
+
+
+def read_archive(archive: IO[bytes], artifact_name: str) -> ArtifactTotals:
+    """Totals of the coverage reports in an artifact zip, by kind."""
+    totals: ArtifactTotals = {}
+    with zipfile.ZipFile(archive) as zf:
+        for info in zf.infolist():
+            parser = None if info.is_dir() else report_parser(info.filename)
+            if parser is None:
+                continue
+            try:
+                with zf.open(info) as member:
+                    found = parser(member)
+            except (ParseError, ValueError, zipfile.BadZipFile) as e:
+                print(f"Skipping coverage report {info.filename} in {artifact_name}: {e}")
+                continue
+            if found:
+                kind = report_kind(f"{artifact_name}/{info.filename}")
+                covered, total = totals.get(kind, LineTotals(0, 0))
+                totals[kind] = LineTotals(covered + found.covered, total + found.total)
+    return totals
+
+
+def percent(totals: Optional[LineTotals]) -> Optional[float]:
+    if not totals or not totals.total:
+        return None
+    return round(100.0 * totals.covered / totals.total, 2)
+
+
+def coverage_fields(artifacts: Iterable[ArtifactTotals]) -> Dict[str, Optional[float]]:
+    """coverage_* percentages from artifact totals.
+
+    Reports of one kind are summed. Overall coverage comes from the
+    unclassified reports when there are any, else from all classified ones.
+    """
+    summed: ArtifactTotals = {}
+    for totals in artifacts:
+        for kind, (covered, total) in totals.items():
+            c, t = summed.get(kind, LineTotals(0, 0))
+            summed[kind] = LineTotals(c + covered, t + total)
+    overall = summed.get(OVERALL)
+    if overall is None and summed:
+        overall = LineTotals(sum(t.covered for t in summed.values()), sum(t.total for t in summed.values()))
+    return {
+        "coverage_overall": percent(overall),
+        "coverage_unit": percent(summed.get("unit")),
+        "coverage_integration": percent(summed.get("integration")),
+        "coverage_e2e": percent(summed.get("e2e")),
+    }
+
+
+def is_coverage_artifact(artifact: Mapping) -> bool:
+    return not artifact.get("expired") and bool(COVERAGE_ARTIFACT.search(artifact.get("name") or ""))
+
+
+class CoverageCache:
+    def __init__(self, path: str):
+        self.path = path
+        self.hits = 0
+        self.misses = 0
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS artifacts ("
+            " id INTEGER PRIMARY KEY,"
+            " repo TEXT,"
+            " name TEXT,"
+            " totals TEXT"
+            ")"
+        )
+        self._conn.commit()
+
+    def get(self, artifact_id: int) -> Optional[ArtifactTotals]:
+        with self._lock:
+            row = self._conn.execute("SELECT totals FROM artifacts WHERE id = ?", (artifact_id,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+        return {kind: LineTotals(*pair) for kind, pair in json.loads(row[0]).items()}
+
+    def put(self, artifact_id: int, repo: str, name: str, totals: ArtifactTotals) -> None:
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO artifacts (id, repo, name, totals) VALUES (?, ?, ?, ?)",
+                (artifact_id, repo, name, json.dumps({kind: list(t) for kind, t in totals.items()})),
+            )
+            self._conn.commit()
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+class CoverageCollector:
+    """Coverage fields per repo from its artifacts, downloading uncached artifacts in parallel."""
+
+    def __init__(
+        self,
+        download: Callable[[str], IO[bytes]],
+        cache: Optional[CoverageCache] = None,
+        concurrency: int = DEFAULT_CONCURRENCY,
+    ):
+        self.download = download
+        self.cache = cache
+        self.concurrency = max(1, concurrency)
+        self.downloaded = 0
+        self.failed = 0
+        self._lock = threading.Lock()
+        # Totals by artifact id for this process, so repeated passes skip the cache too
+        self._totals: Dict[int, ArtifactTotals] = {}
+
+    def _fetch(self, job: Tuple[str, Mapping]) -> Optional[ArtifactTotals]:
+        full, artifact = job
+        try:
+            with self.download(artifact["archive_download_url"]) as archive:
+                totals = read_archive(archive, artifact.get("name") or "")
+        except (IOError, zipfile.BadZipFile) as e:
+            # IOError covers the transport's errors; a later run tries again
+            print(f"Warning: Failed to read coverage artifact {artifact.get('name')} of {full}: {e}")
+            with self._lock:
+                self.failed += 1
+            return None
+        with self._lock:
+            self.downloaded += 1
+        if self.cache:
+            self.cache.put(artifact["id"], full, artifact.get("name") or "", totals)
+        return totals
+
+    def collect(self, artifacts_by_repo: Mapping[str, List[Mapping]]) -> Dict[str, Dict[str, Optional[float]]]:
+        """coverage_* fields for every repo in `artifacts_by_repo` (all None without readable reports)."""
+        found: Dict[str, List[ArtifactTotals]] = {full: [] for full in artifacts_by_repo}
+        missing: List[Tuple[str, Mapping]] = []
+        for full, artifacts in artifacts_by_repo.items():
+            for artifact in artifacts:
+                totals = self._totals.get(artifact["id"])
+                if totals is None and self.cache:
+                    totals = self.cache.get(artifact["id"])
+                if totals is None:
+                    missing.append((full, artifact))
+                else:
+                    self._totals[artifact["id"]] = totals
+                    found[full].append(totals)
+        if missing:
+            with ThreadPoolExecutor(max_workers=min(self.concurrency, len(missing))) as pool:
+                for (full, artifact), totals in zip(missing, pool.map(self._fetch, missing)):
+                    if totals is not None:
+                        self._totals[artifact["id"]] = totals
+                        found[full].append(totals)
+        return {full: coverage_fields(totals) for full, totals in found.items()}
@@ -0,0 +1,245 @@
+#!/usr/bin/env python3
+"""
+Streaming DORA metric engine.
+
+Production runs are reduced to compact RunEvent tuples (each timestamp parsed
+once into epoch seconds) and fed in time order to a DoraAccumulator, which
+computes deployment count, change failure rate, lead time and time to restore
+in a single pass. Lead-time and time-to-restore distributions are kept as
+mergeable quantile sketches, so the accumulator only holds running totals,
+two sketches and the failures of the current unrestored streak.
+
+DoraSeries buckets the same stream by day or week into columnar arrays of
+deployments, failures, lead-time samples and restores for trend charts.
+
+Usage:
+  acc = DoraAccumulator()
+  for event, commit_times in with_commit_times(events, resolve):
+      acc.add(event, commit_times)
+  metrics = acc.result(window_days)
+"""
+
+from array import array
+from collections import Counter
+from datetime import datetime, timezone
+from typing import Callable, Dict, Iterable, Iterator, List, Mapping, NamedTuple, Optional, Tuple
+
+from quantile_sketch import QuantileSketch
+
+TZ_Z = "+00:00"
+FAILURE_CONCLUSIONS = {"failure", "cancelled", "timed_out"}
+SUCCESS, FAILURE, OTHER = 1, 2, 0
+# Lead-time commit lookups are resolved this many events at a time
+COMMIT_BATCH_SIZE = 500
+QUANTILES = (("p50", 0.5), ("p90", 0.9), ("p99", 0.99))
+DAY_SECONDS = 86400
+BUCKET_SECONDS = {"day": DAY_SECONDS, "week": 7 * DAY_SECONDS}
+# 1970-01-01 was a Thursday; weekly buckets start on Monday
+BUCKET_ORIGIN = {"day": 0, "week": 4 * DAY_SECONDS}
+
+
+class RunEvent(NamedTuple):
+    # created_at (or run_started_at) in epoch seconds; the stream is ordered by it
+    order_ts: float
+    # updated_at, falling back to created_at / run_started_at
+    done_ts: Optional[float]
+    outcome: int
+    head_sha: Optional[str]
+
+
+def epoch(ts: Optional[str]) -> Optional[float]:
+    """Parse a GitHub ISO-8601 timestamp to epoch seconds; None if absent or malformed."""
+    if not ts:
+        return None
+    try:
+        return datetime.fromisoformat(ts.replace("Z", TZ_Z)).timestamp()
+    except ValueError:
+        return None
+
+
+def to_event(run: Dict) -> RunEvent:
+    created = epoch(run.get("created_at")) if run.get("created_at") else epoch(run.get("run_started_at"))
+    done = epoch(run.get("updated_at") or run.get("created_at") or run.get("run_started_at"))
+    conclusion = (run.get("conclusion") or "").lower()
+    outcome = SUCCESS if conclusion == "success" else FAILURE if conclusion in FAILURE_CONCLUSIONS else OTHER
+    return RunEvent(created if created is not None else float("-inf"), done, outcome, run.get("head_sha"))
+
+
+def with_commit_times(
+    events: Iterable[RunEvent],
+    resolve: Callable[[List[str]], Mapping[str, Optional[float]]],
+    batch_size: int = COMMIT_BATCH_SIZE,
+) -> Iterator[Tuple[RunEvent, Mapping[str, Optional[float]]]]:
+    """Pair events with commit timestamps, resolving head SHAs one batch at a time.
+
+    `resolve` maps SHAs to commit epoch seconds (None when the commit carries no
+    date) and omits SHAs whose commit could not be fetched.
+    """
+    batch: List[RunEvent] = []
+
+    def flush() -> Iterator[Tuple[RunEvent, Mapping[str, Optional[float]]]]:
+        shas = list(dict.fromkeys(e.head_sha for e in batch if e.outcome == SUCCESS and e.head_sha and e.done_ts))
+        times = resolve(shas) if shas else {}
+        for e in batch:
+            yield e, times
+        batch.clear()
+
+    for event in events:
+        batch.append(event)
+        if len(batch) >= batch_size:
+            yield from flush()
+    yield from flush()
+
+
+def _round(value: Optional[float]) -> Optional[float]:
+    return round(value, 2) if value is not None else None
+
+
+def distribution_fields(lead_time: QuantileSketch, ttr: QuantileSketch) -> Dict:
+    """Quantile fields and serialized sketches for a lead-time / time-to-restore pair."""
+    fields: Dict = {}
+    for label, q in QUANTILES:
+        fields[f"lead_time_hours_{label}"] = _round(lead_time.quantile(q))
+    for label, q in QUANTILES:
+        fields[f"time_to_restore_hours_{label}"] = _round(ttr.quantile(q))
+    fields["sketches"] = {"lead_time_hours": lead_time.to_dict(), "time_to_restore_hours": ttr.to_dict()}
+    return fields
+
+
+class DoraAccumulator:
+    def __init__(self):
+        self.deployments = 0
+        self.failures = 0
+        self.successes = 0
+        self.skipped_commits = 0
+        self.lead_time = QuantileSketch()
+        self.ttr = QuantileSketch()
+        # Completion times of failures not yet followed by a success
+        self._pending_failures: List[float] = []
+
+    def add(self, event: RunEvent, commit_times: Mapping[str, Optional[float]]) -> Tuple[Optional[float], List[float]]:
+        """Consume the next production run; events must arrive in order_ts order.
+
+        Returns the lead-time sample and the time-to-restore samples this run produced.
+        """
+        self.deployments += 1
+        if event.outcome == FAILURE:
+            self.failures += 1
+            if event.done_ts is not None:
+                self._pending_failures.append(event.done_ts)
+            return None, []
+        if event.outcome != SUCCESS:
+            return None, []
+
+        self.successes += 1
+        restores: List[float] = []
+        # Every failure since the previous success is restored by this one
+        if self._pending_failures and event.done_ts is not None:
+            for failed_at in self._pending_failures:
+                delta_h = (event.done_ts - failed_at) / 3600.0
+                if delta_h >= 0:
+                    self.ttr.add(delta_h)
+                    restores.append(delta_h)
+        self._pending_failures.clear()
+
+        if not event.head_sha or event.done_ts is None:
+            return None, restores
+        if event.head_sha not in commit_times:
+            self.skipped_commits += 1
+            return None, restores
+        commit_ts = commit_times[event.head_sha]
+        if commit_ts is None:
+            return None, restores
+        hours = (event.done_ts - commit_ts) / 3600.0
+        if hours < 0:
+            return None, restores
+        self.lead_time.add(hours)
+        return hours, restores
+
+    def result(self, window_days: int) -> Dict:
+        if not self.deployments:
+            return {
+                "deployments": 0,
+                "deployment_frequency_per_day": 0,
+                "lead_time_hours_median": None,
+                "change_failure_rate": None,
+                "time_to_restore_hours_avg": None,
+                **distribution_fields(self.lead_time, self.ttr),
+            }
+        return {
+            "deployments": self.deployments,
+            "deployment_frequency_per_day": round(self.deployments / float(window_days), 3),
+            "lead_time_hours_median": _round(self.lead_time.quantile(0.5)),
+            "change_failure_rate": round(self.failures / self.deployments, 3),
+            "time_to_restore_hours_avg": _round(self.ttr.mean()),
+            **distribution_fields(self.lead_time, self.ttr),
+        }
+
+
+class DoraSeries:
+    """Per-bucket DORA time series kept as columnar arrays.
+
+    Each event appends its bucket index (and value, for lead times and
+    restores) to typed arrays; bucket totals are computed once at the end with
+    C-level counting instead of per-event dict updates. Series from several
+    repos merge by concatenating their columns.
+    """
+
+    def __init__(self, bucket: str = "day"):
+        if bucket not in BUCKET_SECONDS:
+            raise ValueError(f"Unknown bucket {bucket!r}; expected one of {sorted(BUCKET_SECONDS)}")
+        self.bucket = bucket
+        self._width = BUCKET_SECONDS[bucket]
+        self._origin = BUCKET_ORIGIN[bucket]
+        self.deployments = array("q")
+        self.failures = array("q")
+        self.lead_idx = array("q")
+        self.lead_hours = array("d")
+        self.restore_idx = array("q")
+        self.restore_hours = array("d")
+
+    def index(self, ts: float) -> int:
+        return int((ts - self._origin) // self._width)
+
+    def add(self, event: RunEvent, lead_hours: Optional[float], restores: List[float]) -> None:
+        if event.order_ts == float("-inf"):
+            return
+        i = self.index(event.order_ts)
+        self.deployments.append(i)
+        if event.outcome == FAILURE:
+            self.failures.append(i)
+        if lead_hours is not None:
+            self.lead_idx.append(i)
+            self.lead_hours.append(lead_hours)
+        if restores:
+            self.restore_idx.extend([i] * len(restores))
+            self.restore_hours.extend(restores)
+
+    def merge(self, other: "DoraSeries") -> "DoraSeries":
+        for name in ("deployments", "failures", "lead_idx", "lead_hours", "restore_idx", "restore_hours"):
+            getattr(self, name).extend(getattr(other, name))
+        return self
+
+    def labels(self, first: int, last: int) -> List[str]:
+        return [
+            datetime.fromtimestamp(self._origin + i * self._width, tz=timezone.utc).strftime("%Y-%m-%d")
+            for i in range(first, last + 1)
+        ]
+
+    def to_dict(self, first: int, last: int) -> Dict:
+        """Dense per-bucket lists for buckets first..last (inclusive)."""
+        span = range(first, last + 1)
+        deployments = Counter(self.deployments)
+        failures = Counter(self.failures)
+        restores = Counter(self.restore_idx)
+        lead = {i: QuantileSketch() for i in set(self.lead_idx)}
+        for i, hours in zip(self.lead_idx, self.lead_hours):
+            lead[i].add(hours)
+        out: Dict[str, List] = {
+            "deployments": [deployments.get(i, 0) for i in span],
+            "failures": [failures.get(i, 0) for i in span],
+            "restores": [restores.get(i, 0) for i in span],
+        }
+        for label, q in QUANTILES:
+            out[f"lead_time_hours_{label}"] = [_round(lead[i].quantile(q)) if i in lead else None for i in span]
+        return out
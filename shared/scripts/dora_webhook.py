@@ -0,0 +1,410 @@
+#!/usr/bin/env python3
+"""
+DORA webhook receiver
+- Accepts GitHub workflow_run deliveries (X-Hub-Signature-256 verified)
+- Classifies runs with compute_dora's production matcher
+- Keeps per-repo run state in memory and serves live metrics
+- Flushes docs/data/dora.json on a debounce timer
+
+On startup each repo is seeded from the run history and commit cache that
+compute_dora.py maintains, so the first snapshot covers the whole window;
+runs received by webhook are merged into the history on every flush. Lead
+times use the commit timestamp GitHub includes in the delivery, so nothing
+is fetched from the API.
+
+Usage:
+  GITHUB_WEBHOOK_SECRET=... python3 shared/scripts/dora_webhook.py serve --port 3003
+  GITHUB_WEBHOOK_SECRET=... python3 shared/scripts/dora_webhook.py fake --url http://localhost:3003/github/webhook --count 200
+
+Environment:
+  GITHUB_WEBHOOK_SECRET     shared secret configured on the GitHub webhook (required)
+  DORA_WINDOW_DAYS          window for the snapshot (default 30)
+  DORA_FLUSH_DEBOUNCE_SECONDS  quiet period before a snapshot is written (default 30)
+  DORA_FLUSH_MAX_DELAY_SECONDS upper bound on snapshot staleness under steady traffic (default 300)
+  DORA_WEBHOOK_OUTPUT       snapshot path (default docs/data/dora.json)
+"""
+
+import argparse
+import asyncio
+import hashlib
+import hmac
+import json
+import os
+import random
+import threading
+import time
+import urllib.request
+import uuid
+from collections import deque
+from contextlib import asynccontextmanager
+from datetime import datetime, timedelta, timezone
+from typing import Deque, Dict, List, Optional, Set, Tuple
+
+from fastapi import FastAPI, HTTPException, Request
+
+from commit_cache import CommitCache
+from compute_dora import CACHE_DIR, build_aggregate, iso, is_production_run
+from dora_engine import DAY_SECONDS, DoraAccumulator, DoraSeries, RunEvent, epoch, to_event
+from run_history import HistoryRow, RunHistory, history_row
+
+# ============================================================================
+# CONFIGURATION
+# ============================================================================
+
+WEBHOOK_SECRET = os.getenv("GITHUB_WEBHOOK_SECRET")
+WINDOW_DAYS = int(os.getenv("DORA_WINDOW_DAYS", "30"))
+FLUSH_DEBOUNCE_SECONDS = float(os.getenv("DORA_FLUSH_DEBOUNCE_SECONDS", "30"))
+FLUSH_MAX_DELAY_SECONDS = float(os.getenv("DORA_FLUSH_MAX_DELAY_SECONDS", "300"))
+OUTPUT_PATH = os.getenv(
+    "DORA_WEBHOOK_OUTPUT",
+    os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", "docs", "data", "dora.json")),
+)
+HISTORY_DIR = os.path.join(CACHE_DIR, "history")
+COMMIT_CACHE_PATH = os.path.join(CACHE_DIR, "commits.sqlite")
+BUCKET = "day"
+# GitHub redelivers on timeouts; remember this many delivery ids
+SEEN_DELIVERIES = 10000
+
+# ============================================================================
+# SIGNATURE VERIFICATION
+# ============================================================================
+
+
+def sign(body: bytes, secret: str) -> str:
+    return "sha256=" + hmac.new(secret.encode(), body, hashlib.sha256).hexdigest()
+
+
+def verify_github_signature(body: bytes, signature: Optional[str]) -> bool:
+    """Verify X-Hub-Signature-256 (HMAC-SHA256 of the raw body)"""
+    if not WEBHOOK_SECRET or not signature:
+        return False
+    return hmac.compare_digest(sign(body, WEBHOOK_SECRET), signature)
+
+
+# ============================================================================
+# PER-REPO STATE
+# ============================================================================
+
+
+class RepoState:
+    """Production runs of one repo within the window, keyed by run id.
+
+    A re-delivered or re-run run replaces its earlier copy. Metrics are
+    recomputed from the run set the next time they are read after a change
+    (at the latest on the next flush), which also drops the runs and commit
+    times that have left the window.
+    """
+
+    def __init__(self):
+        self.events: Dict[int, RunEvent] = {}
+        self.commit_times: Dict[str, Optional[float]] = {}
+        # Runs received since the last flush, to merge into the run history
+        self.pending_rows: Dict[int, HistoryRow] = {}
+        self.workflows: Dict[int, str] = {}
+        self._computed: Optional[Tuple[Dict, DoraSeries]] = None
+
+    def add(self, run_id: int, event: RunEvent) -> None:
+        self.events[run_id] = event
+        self._computed = None
+
+    def set_commit_times(self, times: Dict[str, Optional[float]]) -> None:
+        self.commit_times.update(times)
+        self._computed = None
+
+    def metrics(self, window_days: int) -> Tuple[Dict, DoraSeries]:
+        if self._computed is None:
+            cutoff = time.time() - window_days * DAY_SECONDS
+            self.events = {rid: e for rid, e in self.events.items() if e.order_ts >= cutoff}
+            # Forget commit times of runs that left the window, so a long-running server stays bounded
+            live = {e.head_sha for e in self.events.values()}
+            self.commit_times = {sha: ts for sha, ts in self.commit_times.items() if sha in live}
+            acc = DoraAccumulator()
+            series = DoraSeries(BUCKET)
+            for event in sorted(self.events.values(), key=lambda e: e.order_ts):
+                lead_hours, restores = acc.add(event, self.commit_times)
+                series.add(event, lead_hours, restores)
+            self._computed = (acc.result(window_days), series)
+        return self._computed
+
+
+class DoraState:
+    def __init__(self):
+        self.repos: Dict[str, RepoState] = {}
+        self.lock = threading.Lock()
+        self.deliveries = 0
+        self.seen: Deque[str] = deque(maxlen=SEEN_DELIVERIES)
+        self._seen_set: Set[str] = set()
+        self.first_change: Optional[float] = None
+        self.last_change: Optional[float] = None
+        self.last_flush: Optional[str] = None
+        self.flush_task: Optional[asyncio.Task] = None
+
+    def repo(self, full: str) -> RepoState:
+        return self.repos.setdefault(full, RepoState())
+
+    def is_duplicate(self, delivery: Optional[str]) -> bool:
+        if not delivery:
+            return False
+        if delivery in self._seen_set:
+            return True
+        if len(self.seen) == self.seen.maxlen:
+            self._seen_set.discard(self.seen[0])
+        self.seen.append(delivery)
+        self._seen_set.add(delivery)
+        return False
+
+    def snapshot(self) -> Dict:
+        with self.lock:
+            per_repo = {full: state.metrics(WINDOW_DAYS) for full, state in sorted(self.repos.items())}
+        aggregate = build_aggregate(
+            [WINDOW_DAYS],
+            {WINDOW_DAYS: {full: metrics for full, (metrics, _) in per_repo.items()}},
+            {full: series for full, (_, series) in per_repo.items()},
+            BUCKET,
+        )
+        aggregate["source"] = "webhook"
+        return aggregate
+
+
+state = DoraState()
+
+
+def seed_from_history() -> None:
+    """Load the window's production runs from the run history and commit cache."""
+    history = RunHistory(HISTORY_DIR)
+    repos = history.repos()
+    if not repos:
+        return
+    cache = CommitCache(COMMIT_CACHE_PATH) if os.path.exists(COMMIT_CACHE_PATH) else None
+    since = time.time() - WINDOW_DAYS * DAY_SECONDS
+    with state.lock:
+        for full in repos:
+            repo_state = state.repo(full)
+            cols = history.scan(full, since, production=True)
+            for i in range(len(cols.id)):
+                repo_state.add(cols.id[i], cols.event(i))
+            shas = [e.head_sha for e in repo_state.events.values() if e.head_sha]
+            dates = cache.get_many(full, shas) if cache else {}
+            repo_state.set_commit_times({sha: epoch(author or committer) for sha, (author, committer) in dates.items()})
+            repo_state.workflows = history.workflows(full)
+    if cache:
+        cache.close()
+    print(f"Seeded {sum(len(r.events) for r in state.repos.values())} production runs from the run history")
+
+
+def handle_workflow_run(payload: Dict) -> bool:
+    """Record a workflow_run delivery; returns True if it was a production run."""
+    run = payload.get("workflow_run") or {}
+    full = (payload.get("repository") or {}).get("full_name")
+    if not full or run.get("id") is None or "/" not in full:
+        return False
+    owner, repo = full.split("/", 1)
+    production = is_production_run(run, owner, repo)
+    event = to_event(run)
+    row = history_row(run, event, production)
+    with state.lock:
+        repo_state = state.repo(full)
+        if row is not None:
+            repo_state.pending_rows[row[0]] = row
+        if run.get("workflow_id") is not None:
+            repo_state.workflows[run["workflow_id"]] = (payload.get("workflow") or {}).get("name") or run.get("name")
+        if production:
+            repo_state.add(run["id"], event)
+            head_commit = run.get("head_commit") or {}
+            if event.head_sha and head_commit.get("timestamp"):
+                repo_state.set_commit_times({event.head_sha: epoch(head_commit["timestamp"])})
+    return production
+
+
+# ============================================================================
+# SNAPSHOT FLUSHING
+# ============================================================================
+
+
+def write_snapshot() -> None:
+    aggregate = state.snapshot()
+    os.makedirs(os.path.dirname(OUTPUT_PATH), exist_ok=True)
+    tmp = f"{OUTPUT_PATH}.tmp"
+    with open(tmp, "w") as f:
+        json.dump(aggregate, f, indent=2)
+    os.replace(tmp, OUTPUT_PATH)
+
+    with state.lock:
+        pending = {full: (r.pending_rows, dict(r.workflows)) for full, r in state.repos.items() if r.pending_rows}
+        for full in pending:
+            state.repos[full].pending_rows = {}
+    history = RunHistory(HISTORY_DIR)
+    for full, (rows, workflows) in pending.items():
+        history.merge(full, rows.values(), workflows)
+    state.last_flush = aggregate["generated_at"]
+
+
+async def debounced_flush() -> None:
+    """Write once deliveries pause for FLUSH_DEBOUNCE_SECONDS, or FLUSH_MAX_DELAY_SECONDS after the first change."""
+    while True:
+        due = min(state.last_change + FLUSH_DEBOUNCE_SECONDS, state.first_change + FLUSH_MAX_DELAY_SECONDS)
+        wait = due - time.monotonic()
+        if wait <= 0:
+            break
+        await asyncio.sleep(wait)
+    state.first_change = state.last_change = None
+    state.flush_task = None
+    await asyncio.to_thread(write_snapshot)
+
+
+def schedule_flush() -> None:
+    now = time.monotonic()
+    state.last_change = now
+    if state.first_change is None:
+        state.first_change = now
+    if state.flush_task is None:
+        state.flush_task = asyncio.create_task(debounced_flush())
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await asyncio.to_thread(seed_from_history)
+    yield
+    if state.flush_task is not None:
+        state.flush_task.cancel()
+        await asyncio.to_thread(write_snapshot)
+
+
+app = FastAPI(title="DORA Webhook Receiver", lifespan=lifespan)
+
+# ============================================================================
+# WEBHOOK HANDLER
+# ============================================================================
+
+
+@app.post("/github/webhook")
+async def github_webhook(request: Request):
+    """Handle GitHub webhook deliveries"""
+    body = await request.body()
+    if not verify_github_signature(body, request.headers.get("X-Hub-Signature-256")):
+        raise HTTPException(status_code=401, detail="Invalid signature")
+
+    event_type = request.headers.get("X-GitHub-Event")
+    if event_type == "ping":
+        return {"ok": True, "pong": True}
+    if event_type != "workflow_run":
+        return {"ok": True, "ignored": event_type}
+    if state.is_duplicate(request.headers.get("X-GitHub-Delivery")):
+        return {"ok": True, "duplicate": True}
+
+    try:
+        payload = json.loads(body)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid JSON")
+    production = handle_workflow_run(payload)
+    state.deliveries += 1
+    schedule_flush()
+    return {"ok": True, "production": production}
+
+
+@app.get("/dora")
+async def dora_snapshot():
+    """Current metrics, including deliveries not yet flushed"""
+    return await asyncio.to_thread(state.snapshot)
+
+
+# ============================================================================
+# HEALTH
+# ============================================================================
+
+
+@app.get("/dora/health")
+async def dora_health():
+    """Check receiver health"""
+    return {
+        "status": "ok",
+        "secret_configured": bool(WEBHOOK_SECRET),
+        "repos": len(state.repos),
+        "deliveries": state.deliveries,
+        "flush_pending": state.flush_task is not None,
+        "last_flush": state.last_flush,
+    }
+
+
+# ============================================================================
+# FAKE DELIVERIES (local testing)
+# ============================================================================
+
+
+FAKE_WORKFLOWS = {"Production Deploy": 101, "CI": 102, "Deploy to staging": 103}
+
+
+def fake_workflow_run(full: str, run_id: int, created: datetime, rng: random.Random) -> Dict:
+    name = rng.choice(["Production Deploy", "Production Deploy", "CI", "Deploy to staging"])
+    workflow_id = FAKE_WORKFLOWS[name]
+    path = f".github/workflows/{name.lower().replace(' ', '-')}.yml"
+    conclusion = rng.choice(["success"] * 7 + ["failure", "failure", "cancelled"])
+    updated = created + timedelta(minutes=rng.randint(2, 40))
+    committed = created - timedelta(minutes=rng.randint(10, 72 * 60))
+    sha = hashlib.sha1(f"{full}:{run_id}".encode()).hexdigest()
+    return {
+        "action": "completed",
+        "repository": {"full_name": full},
+        "workflow": {"id": workflow_id, "name": name, "path": path},
+        "workflow_run": {
+            "id": run_id,
+            "workflow_id": workflow_id,
+            "name": name,
+            "display_title": "Merge pull request from feature branch",
+            "path": path,
+            "head_branch": "main",
+            "head_sha": sha,
+            "status": "completed",
+            "conclusion": conclusion,
+            "created_at": iso(created),
+            "updated_at": iso(updated),
+            "run_started_at": iso(created),
+            "head_commit": {"id": sha, "timestamp": iso(committed)},
+        },
+    }
+
+
+def send_fake_deliveries(url: str, repos: List[str], count: int, days: int, seed: int) -> None:
+    """POST signed workflow_run deliveries spread over the last `days` days, in completion order."""
+    if not WEBHOOK_SECRET:
+        raise SystemExit("GITHUB_WEBHOOK_SECRET must be set to sign fake deliveries")
+    rng = random.Random(seed)
+    now = datetime.now(timezone.utc)
+    started = sorted(now - timedelta(minutes=rng.randint(0, days * 24 * 60)) for _ in range(count))
+    production = 0
+    for i, created in enumerate(started):
+        payload = fake_workflow_run(rng.choice(repos), 900_000_000 + seed * 100_000 + i, created, rng)
+        body = json.dumps(payload).encode()
+        req = urllib.request.Request(
+            url,
+            data=body,
+            headers={
+                "Content-Type": "application/json",
+                "X-GitHub-Event": "workflow_run",
+                "X-GitHub-Delivery": str(uuid.uuid4()),
+                "X-Hub-Signature-256": sign(body, WEBHOOK_SECRET),
+            },
+        )
+        with urllib.request.urlopen(req, timeout=10) as resp:
+            production += bool(json.loads(resp.read()).get("production"))
+    print(f"Sent {count} deliveries to {url} ({production} production runs)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="DORA webhook receiver")
+    parser.add_argument("command", nargs="?", choices=["serve", "fake"], default="serve")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=3003)
+    parser.add_argument("--url", default="http://localhost:3003/github/webhook", help="fake: receiver URL")
+    parser.add_argument("--repo", action="append", help="fake: repo to attribute runs to (repeatable)")
+    parser.add_argument("--count", type=int, default=100, help="fake: number of deliveries")
+    parser.add_argument("--days", type=int, default=WINDOW_DAYS, help="fake: spread runs over this many days")
+    parser.add_argument("--seed", type=int, default=1, help="fake: random seed")
+    args = parser.parse_args()
+
+    if args.command == "fake":
+        send_fake_deliveries(args.url, args.repo or ["Honey-Badger-Labs/sustainnet-observability"], args.count, args.days, args.seed)
+    else:
+        import uvicorn
+
+        uvicorn.run(app, host=args.host, port=args.port)
@@ -0,0 +1,352 @@
+#!/usr/bin/env python3
+"""
+Record and replay GitHub API traffic for the metrics collectors.
+
+A local stand-in server takes the place of api.github.com: the collectors are
+pointed at it through GITHUB_API_URL. In record mode every request is
+forwarded upstream and the response is captured into a gzip-compressed JSONL
+fixture archive; in replay mode responses are served from the archive, so the
+scripts can be run, profiled and regression-tested offline.
+
+Requests are keyed by path and sorted query string. Time-based filters
+(`created`, `since`) move with the clock, so a replayed request whose exact
+key was not recorded falls back to the recording of the same request without
+them. ETag validators are honoured in both modes (If-None-Match gets a 304).
+
+Upstream URLs in pagination links, redirects and JSON bodies (such as an
+artifact's archive_download_url) are served pointing back at the stand-in.
+Redirects out of the API (artifact archives to signed storage URLs) are
+followed while recording and replayed from the stand-in. A command run
+against the server gets the server as its HTTP(S) proxy, so a request that
+would leave it is refused and counted instead; any such request makes the
+run fail.
+
+Usage:
+  python3 shared/scripts/gh_fixtures.py record fixtures/dora.jsonl.gz -- python3 shared/scripts/compute_dora.py
+  python3 shared/scripts/gh_fixtures.py replay fixtures/dora.jsonl.gz -- python3 shared/scripts/compute_dora.py
+  python3 shared/scripts/gh_fixtures.py replay fixtures/dora.jsonl.gz --port 8765
+
+When a command is given it runs with GITHUB_API_URL pointing at the server and
+a fresh, temporary METRICS_CACHE_DIR, so the recording holds every response a
+cold run needs. Without a command the server runs until interrupted.
+
+Environment:
+  GITHUB_API_URL   upstream for record mode (default https://api.github.com)
+"""
+
+import argparse
+import base64
+import gzip
+import json
+import os
+import re
+import subprocess
+import sys
+import tempfile
+import threading
+import urllib.error
+import urllib.request
+from collections import Counter
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Mapping, NamedTuple, Optional
+from urllib.parse import parse_qsl, urlencode, urljoin, urlsplit
+
+from rate_limit import is_rate_limited
+
+DEFAULT_UPSTREAM = "https://api.github.com"
+ARCHIVE_FORMAT = "gh-fixtures/1"
+# Filters relative to "now"; ignored when a replayed key was not recorded verbatim
+VOLATILE_PARAMS = ("created", "since")
+# Response headers kept in the archive; rate-limit headers are deliberately dropped
+KEPT_HEADERS = ("Content-Type", "ETag", "Last-Modified", "Link", "Location")
+FORWARDED_HEADERS = ("Accept", "Authorization", "User-Agent")
+UPSTREAM_TIMEOUT_SECONDS = 30
+# Recorded targets of upstream redirects are served under this path prefix
+REDIRECTED_PREFIX = "/_fixtures/redirected"
+
+
+class Fixture(NamedTuple):
+    status: int
+    headers: Dict[str, str]
+    body: bytes
+
+
+def fixture_key(path: str, query: Mapping[str, str], drop: tuple = ()) -> str:
+    params = sorted((k, v) for k, v in query.items() if k not in drop)
+    return f"{path}?{urlencode(params)}" if params else path
+
+
+def route_of(path: str) -> str:
+    """Collapse owner/repo names, ids and SHAs so request counts group by endpoint."""
+    path = re.sub(r"^/repos/[^/]+/[^/]+", "/repos/:owner/:repo", path)
+    path = re.sub(r"^/orgs/[^/]+", "/orgs/:org", path)
+    path = re.sub(r"/contents/.*$", "/contents/:path", path)
+    path = re.sub(r"/git/trees/.*$", "/git/trees/:tree", path)
+    return re.sub(r"/(?:[0-9a-f]{40}|\d+)(?=/|$)", "/:id", path)
+
+
+def json_fixture(data, status: int = 200, headers: Optional[Dict[str, str]] = None) -> Fixture:
+    return Fixture(status, {"Content-Type": "application/json; charset=utf-8", **(headers or {})}, json.dumps(data).encode())
+
+
+def relink(fixture: Fixture, upstream: str, base_url: str) -> Fixture:
+    """Point pagination links, redirects and URLs in JSON bodies back at the stand-in instead of the upstream."""
+    headers = {
+        name: value.replace(upstream, base_url) if name in ("Link", "Location") else value
+        for name, value in fixture.headers.items()
+    }
+    body = fixture.body
+    if "json" in headers.get("Content-Type", ""):
+        body = body.replace(upstream.encode(), base_url.encode())
+    return fixture._replace(headers=headers, body=body)
+
+
+class _NoRedirect(urllib.request.HTTPRedirectHandler):
+    """Hand redirects back to the caller, which records them and follows them itself."""
+
+    def redirect_request(self, req, fp, code, msg, headers, newurl):
+        return None
+
+
+_no_redirect_opener = urllib.request.build_opener(_NoRedirect)
+
+
+class FixtureArchive:
+    def __init__(self, upstream: str = DEFAULT_UPSTREAM):
+        self.upstream = upstream.rstrip("/")
+        self.entries: Dict[str, Fixture] = {}
+        # Key without volatile params -> first recorded full key
+        self._loose: Dict[str, str] = {}
+        self._lock = threading.Lock()
+
+    def put(self, key: str, fixture: Fixture) -> None:
+        path, _, query = key.partition("?")
+        loose = fixture_key(path, dict(parse_qsl(query, keep_blank_values=True)), VOLATILE_PARAMS)
+        with self._lock:
+            self.entries[key] = fixture
+            self._loose.setdefault(loose, key)
+
+    def get(self, key: str) -> Optional[Fixture]:
+        with self._lock:
+            fixture = self.entries.get(key)
+            if fixture is not None:
+                return fixture
+            path, _, query = key.partition("?")
+            loose = fixture_key(path, dict(parse_qsl(query, keep_blank_values=True)), VOLATILE_PARAMS)
+            recorded = self._loose.get(loose)
+            return self.entries.get(recorded) if recorded else None
+
+    def save(self, path: str) -> None:
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with self._lock:
+            entries = sorted(self.entries.items())
+        with gzip.open(path, "wt", encoding="utf-8") as f:
+            meta = {"format": ARCHIVE_FORMAT, "upstream": self.upstream, "recorded_at": datetime.now(timezone.utc).isoformat()}
+            f.write(json.dumps(meta) + "\n")
+            for key, fx in entries:
+                record = {"key": key, "status": fx.status, "headers": fx.headers}
+                try:
+                    record["body"] = fx.body.decode("utf-8")
+                except UnicodeDecodeError:
+                    record["body_b64"] = base64.b64encode(fx.body).decode("ascii")
+                f.write(json.dumps(record) + "\n")
+
+    @classmethod
+    def load(cls, path: str) -> "FixtureArchive":
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            meta = json.loads(f.readline())
+            if meta.get("format") != ARCHIVE_FORMAT:
+                raise ValueError(f"{path} is not a {ARCHIVE_FORMAT} archive")
+            archive = cls(meta.get("upstream", DEFAULT_UPSTREAM))
+            for line in f:
+                record = json.loads(line)
+                body = record["body"].encode("utf-8") if "body" in record else base64.b64decode(record["body_b64"])
+                archive.put(record["key"], Fixture(record["status"], record["headers"], body))
+        return archive
+
+
+class ReplayBackend:
+    def __init__(self, archive: FixtureArchive):
+        self.archive = archive
+        self.misses = 0
+
+    def respond(self, path: str, query: Dict[str, str], headers: Mapping[str, str], base_url: str) -> Fixture:
+        fixture = self.archive.get(fixture_key(path, query))
+        if fixture is None:
+            self.misses += 1
+            return json_fixture({"message": "Not recorded", "path": path, "query": query}, status=404)
+        return relink(fixture, self.archive.upstream, base_url)
+
+
+class RecordingBackend(ReplayBackend):
+    """Forwards every request upstream (without validators, so bodies are always captured) and records it.
+
+    A redirect is followed here, without the Authorization header, and its
+    target recorded under REDIRECTED_PREFIX; the recorded redirect points
+    there, so replay never needs the (signed, expiring) original location.
+    """
+
+    def respond(self, path: str, query: Dict[str, str], headers: Mapping[str, str], base_url: str) -> Fixture:
+        if path.startswith(REDIRECTED_PREFIX):
+            # The client following a redirect recorded a moment ago
+            return super().respond(path, query, headers, base_url)
+        url = f"{self.archive.upstream}{path}"
+        if query:
+            url += f"?{urlencode(query)}"
+        forwarded = {h: headers[h] for h in FORWARDED_HEADERS if headers.get(h)}
+        status, resp_headers, body = self._fetch(url, forwarded)
+        if is_rate_limited(status, resp_headers):
+            # Not part of the API's answer: pass it on with its rate-limit headers so the client backs off
+            limits = {h: v for h, v in resp_headers.items() if h.lower().startswith("x-ratelimit-") or h == "Retry-After"}
+            return Fixture(status, limits, body)
+        fixture = Fixture(status, {h: resp_headers[h] for h in KEPT_HEADERS if resp_headers.get(h)}, body)
+        if 300 <= status < 400 and fixture.headers.get("Location"):
+            target = {h: v for h, v in forwarded.items() if h != "Authorization"}
+            t_status, t_headers, t_body = self._fetch(urljoin(url, fixture.headers["Location"]), target)
+            redirected = fixture_key(REDIRECTED_PREFIX + path, query)
+            kept = {h: t_headers[h] for h in KEPT_HEADERS if t_headers.get(h) and h != "Location"}
+            self.archive.put(redirected, Fixture(t_status, kept, t_body))
+            fixture = fixture._replace(headers={**fixture.headers, "Location": self.archive.upstream + redirected})
+        self.archive.put(fixture_key(path, query), fixture)
+        return relink(fixture, self.archive.upstream, base_url)
+
+    @staticmethod
+    def _fetch(url: str, headers: Mapping[str, str]):
+        try:
+            request = urllib.request.Request(url, headers=dict(headers))
+            with _no_redirect_opener.open(request, timeout=UPSTREAM_TIMEOUT_SECONDS) as resp:
+                return resp.status, resp.headers, resp.read()
+        except urllib.error.HTTPError as e:
+            return e.code, e.headers, e.read()
+
+
+class _Handler(BaseHTTPRequestHandler):
+    server: "StandInServer"
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        if not self.path.startswith("/"):
+            # Absolute-form request: a plain HTTP request sent to us as its proxy
+            return self._refuse(urlsplit(self.path).netloc)
+        parts = urlsplit(self.path)
+        query = dict(parse_qsl(parts.query, keep_blank_values=True))
+        self.server.count(parts.path)
+        try:
+            fixture = self.server.backend.respond(parts.path, query, self.headers, self.server.base_url)
+        except Exception as e:  # a broken backend must answer, not hang the client
+            fixture = json_fixture({"message": f"Stand-in error: {e}"}, status=502)
+        etag = fixture.headers.get("ETag")
+        if fixture.status == 200 and etag and self.headers.get("If-None-Match") == etag:
+            fixture = Fixture(304, {"ETag": etag}, b"")
+        self.send_response(fixture.status)
+        for name, value in fixture.headers.items():
+            self.send_header(name, value)
+        self.send_header("Content-Length", str(len(fixture.body)))
+        self.end_headers()
+        self.wfile.write(fixture.body)
+
+    def do_CONNECT(self):
+        # An HTTPS request sent to us as its proxy
+        self._refuse(self.path)
+
+    def _refuse(self, host: str) -> None:
+        self.server.escape(host)
+        self.send_response(403)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def log_message(self, format, *args):
+        pass
+
+
+class StandInServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, backend, host: str = "127.0.0.1", port: int = 0):
+        super().__init__((host, port), _Handler)
+        self.backend = backend
+        self.base_url = f"http://{host}:{self.server_address[1]}"
+        self.requests: Counter = Counter()
+        # Hosts of requests that tried to go past the stand-in (see proxy_env)
+        self.escaped: Counter = Counter()
+        self._count_lock = threading.Lock()
+
+    def count(self, path: str) -> None:
+        with self._count_lock:
+            self.requests[route_of(path)] += 1
+
+    def escape(self, host: str) -> None:
+        with self._count_lock:
+            self.escaped[host] += 1
+
+    def reset_counts(self) -> None:
+        with self._count_lock:
+            self.requests.clear()
+            self.escaped.clear()
+
+    def proxy_env(self) -> Dict[str, str]:
+        """Environment routing a client's other HTTP(S) traffic to this server, which refuses and counts it."""
+        host = self.server_address[0]
+        env = {}
+        for name in ("HTTP_PROXY", "HTTPS_PROXY", "ALL_PROXY"):
+            env[name] = env[name.lower()] = self.base_url
+        env["NO_PROXY"] = env["no_proxy"] = host
+        return env
+
+    def start(self) -> "StandInServer":
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+
+def run_command(server: StandInServer, command: List[str]) -> int:
+    env = dict(os.environ, GITHUB_API_URL=server.base_url, **server.proxy_env())
+    with tempfile.TemporaryDirectory(prefix="gh-fixtures-") as cache_dir:
+        env["METRICS_CACHE_DIR"] = cache_dir
+        return subprocess.call(command, env=env)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Record or replay GitHub API traffic through a local stand-in server")
+    parser.add_argument("mode", choices=["record", "replay"])
+    parser.add_argument("archive", help="Fixture archive (.jsonl.gz) to write in record mode or serve in replay mode")
+    parser.add_argument("--port", type=int, default=0, help="Port to listen on (default: any free port)")
+    parser.add_argument("--upstream", default=os.getenv("GITHUB_API_URL", DEFAULT_UPSTREAM), help="API to record from")
+    parser.add_argument("command", nargs=argparse.REMAINDER, help="Command to run against the server, after --")
+    args = parser.parse_args()
+    command = args.command[1:] if args.command[:1] == ["--"] else args.command
+
+    if args.mode == "record":
+        archive = FixtureArchive(args.upstream)
+        backend: ReplayBackend = RecordingBackend(archive)
+    else:
+        archive = FixtureArchive.load(args.archive)
+        backend = ReplayBackend(archive)
+    server = StandInServer(backend, port=args.port).start()
+    print(f"Stand-in GitHub API ({args.mode}) at {server.base_url}", file=sys.stderr)
+
+    code = 0
+    try:
+        if command:
+            code = run_command(server, command)
+        else:
+            threading.Event().wait()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.shutdown()
+        total = sum(server.requests.values())
+        if args.mode == "record":
+            archive.save(args.archive)
+            print(f"Recorded {len(archive.entries)} responses ({total} requests) to {args.archive}", file=sys.stderr)
+        else:
+            print(f"Replayed {total} requests, {backend.misses} not recorded", file=sys.stderr)
+        if server.escaped:
+            hosts = ", ".join(f"{host} ({n})" for host, n in server.escaped.most_common())
+            print(f"Error: requests bypassed the stand-in server: {hosts}", file=sys.stderr)
+            code = code or 1
+    sys.exit(code)
+
+
+if __name__ == "__main__":
+    main()
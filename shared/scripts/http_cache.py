@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+"""
+Conditional-request cache shared by the GitHub metrics collectors.
+
+Stores the ETag / Last-Modified validators and body of every cacheable GET
+response per URL. The next request for the same URL sends If-None-Match /
+If-Modified-Since; a 304 reply is answered from the cache and does not count
+against GitHub's primary rate limit.
+
+Responses to queries with a time filter (`created=`, `since=`, ...) are not
+kept: the filter moves with every run, so their keys would never be asked
+for again. Entries unused for METRICS_HTTP_CACHE_MAX_AGE_DAYS are pruned when
+the cache is opened, and the least recently used ones beyond
+METRICS_HTTP_CACHE_MAX_ENTRIES with them, so the file (persisted between CI
+runs) stays bounded.
+
+The cache is HTTP-client agnostic: callers ask for validator headers, then
+either store a fresh response or take the cached body after a 304.
+
+Usage:
+  cache = ResponseCache(".cache/metrics/http.sqlite")
+  key = cache_key(url, params)
+  headers.update(cache.validators(key))
+  ...
+  body = cache.revalidated(key) if status == 304 else cache.store(key, resp_headers, resp_body)
+
+Environment:
+  METRICS_HTTP_CACHE_MAX_AGE_DAYS   drop entries unused for this many days (default 30)
+  METRICS_HTTP_CACHE_MAX_ENTRIES    keep at most this many entries (default 50000)
+"""
+
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from typing import Dict, Mapping, Optional
+from urllib.parse import parse_qsl, urlencode, urlsplit
+
+MAX_AGE_DAYS = float(os.environ.get("METRICS_HTTP_CACHE_MAX_AGE_DAYS", "30"))
+MAX_ENTRIES = int(os.environ.get("METRICS_HTTP_CACHE_MAX_ENTRIES", "50000"))
+
+# Query parameters that bound a listing by time; they change with every run
+TIME_FILTERS = frozenset(("created", "since", "until", "updated", "before", "after"))
+
+
+def cache_key(url: str, params: Optional[Mapping] = None) -> str:
+    """Normalise a URL and its query params into a stable cache key.
+
+    Params embedded in the URL and passed separately are merged and sorted,
+    so `url?a=1&b=2` and `(url, {"b": 2, "a": 1})` share one entry.
+    """
+    base, _, query = url.partition("?")
+    pairs = parse_qsl(query, keep_blank_values=True)
+    pairs.extend((str(k), str(v)) for k, v in (params or {}).items())
+    if not pairs:
+        return base
+    return f"{base}?{urlencode(sorted(pairs))}"
+
+
+def time_filtered(key: str) -> bool:
+    """Whether a cache key's query carries a time-based filter."""
+    return any(name in TIME_FILTERS for name, _ in parse_qsl(urlsplit(key).query))
+
+
+class ResponseCache:
+    def __init__(self, path: str, max_age_days: float = MAX_AGE_DAYS, max_entries: int = MAX_ENTRIES):
+        self.path = path
+        self.hits = 0
+        self.misses = 0
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            " key TEXT PRIMARY KEY,"
+            " etag TEXT,"
+            " last_modified TEXT,"
+            " body BLOB NOT NULL,"
+            " stored_at REAL NOT NULL"
+            ")"
+        )
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(responses)")}
+        if "used_at" not in columns:
+            # Caches written before pruning existed: treat every entry as last used when stored
+            self._conn.execute("ALTER TABLE responses ADD COLUMN used_at REAL")
+            self._conn.execute("UPDATE responses SET used_at = stored_at")
+        self._prune(max_age_days, max_entries)
+        self._conn.commit()
+
+    def _prune(self, max_age_days: float, max_entries: int) -> None:
+        """Drop entries unused for `max_age_days`, then the least recently used beyond `max_entries`."""
+        self._conn.execute("DELETE FROM responses WHERE used_at < ?", (time.time() - max_age_days * 86400,))
+        self._conn.execute(
+            "DELETE FROM responses WHERE key IN ("
+            " SELECT key FROM responses ORDER BY used_at DESC LIMIT -1 OFFSET ?"
+            ")",
+            (max(0, max_entries),),
+        )
+
+    def validators(self, key: str) -> Dict[str, str]:
+        """Conditional request headers for a cached response, or {} if none is cached."""
+        with self._lock:
+            row = self._conn.execute("SELECT etag, last_modified FROM responses WHERE key = ?", (key,)).fetchone()
+        if not row:
+            return {}
+        headers = {}
+        if row[0]:
+            headers["If-None-Match"] = row[0]
+        if row[1]:
+            headers["If-Modified-Since"] = row[1]
+        return headers
+
+    def revalidated(self, key: str) -> Optional[bytes]:
+        """Return the cached body after the server answered 304 Not Modified."""
+        with self._lock:
+            row = self._conn.execute("SELECT body FROM responses WHERE key = ?", (key,)).fetchone()
+            if not row:
+                return None
+            self.hits += 1
+            self._conn.execute("UPDATE responses SET used_at = ? WHERE key = ?", (time.time(), key))
+            self._conn.commit()
+        return zlib.decompress(row[0])
+
+    def store(self, key: str, headers: Mapping[str, str], body: bytes) -> bytes:
+        """Record a fresh 200 response; responses without validators or with a time filter are not kept."""
+        etag = headers.get("ETag")
+        last_modified = headers.get("Last-Modified")
+        with self._lock:
+            self.misses += 1
+            if (etag or last_modified) and not time_filtered(key):
+                now = time.time()
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO responses (key, etag, last_modified, body, stored_at, used_at)"
+                    " VALUES (?, ?, ?, ?, ?, ?)",
+                    (key, etag, last_modified, zlib.compress(body), now, now),
+                )
+                self._conn.commit()
+        return body
+
+    def stats(self) -> Dict[str, float]:
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 3) if total else 0.0,
+        }
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,231 @@
+#!/usr/bin/env python3
+"""
+Pooled, compressed HTTP transport shared by the GitHub metrics scripts.
+
+One Transport keeps connections alive across requests and threads instead
+of paying a TCP and TLS handshake per call, asks for compressed responses
+and decodes them, and counts requests, latency and bytes per host. Large
+binary bodies (artifact archives) are streamed into a spooled temporary
+file by download() instead of being held in memory.
+
+Backends:
+- httpx with HTTP/2, when httpx and h2 are installed (METRICS_HTTP2=0 opts out)
+- a requests Session with a sized urllib3 connection pool otherwise
+
+brotli is requested only when a brotli decoder is installed; gzip always.
+Network failures raise TransportError and HTTP statuses are returned, not
+raised, so a rate-limit scheduler can inspect and retry them;
+Reply.raise_for_status() raises HTTPStatusError.
+
+Usage:
+  transport = shared_transport()
+  reply = transport.get(url, headers={"Accept": "application/vnd.github+json"})
+  reply.raise_for_status()
+  data = reply.json()
+  reply, body = transport.download(archive_url, headers)
+  print(transport.summary())
+
+Environment:
+  METRICS_HTTP_TIMEOUT      per-request timeout in seconds (default 30)
+  METRICS_HTTP_POOL_SIZE    connections kept per host (default 16)
+  METRICS_HTTP2             "0" disables HTTP/2 even when httpx and h2 are installed
+  METRICS_HTTP_SPOOL_MB     downloaded bodies larger than this spill from memory to a temporary file (default 32)
+"""
+
+import json
+import os
+import tempfile
+import threading
+import time
+from typing import IO, Dict, List, Mapping, NamedTuple, Optional, Tuple
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+try:
+    import httpx
+    import h2  # noqa: F401  (httpx needs it for http2=True)
+except ImportError:
+    httpx = None
+
+try:
+    import brotli  # noqa: F401
+except ImportError:
+    try:
+        import brotlicffi as brotli  # noqa: F401
+    except ImportError:
+        brotli = None
+
+DEFAULT_TIMEOUT_SECONDS = float(os.environ.get("METRICS_HTTP_TIMEOUT", "30"))
+DEFAULT_POOL_SIZE = int(os.environ.get("METRICS_HTTP_POOL_SIZE", "16"))
+HTTP2_ENABLED = os.environ.get("METRICS_HTTP2", "1") != "0"
+SPOOL_BYTES = int(float(os.environ.get("METRICS_HTTP_SPOOL_MB", "32")) * 1024 * 1024)
+CHUNK_BYTES = 1024 * 1024
+ACCEPT_ENCODING = "gzip, br" if brotli else "gzip"
+
+
+class TransportError(IOError):
+    """The request did not produce a response (connect, TLS, timeout or protocol failure)."""
+
+
+class HTTPStatusError(TransportError):
+    def __init__(self, status_code: int, url: str, headers: Mapping[str, str]):
+        super().__init__(f"HTTP {status_code} for {url}")
+        self.status_code = status_code
+        self.url = url
+        self.headers = headers
+
+
+class Reply(NamedTuple):
+    status_code: int
+    headers: Mapping[str, str]
+    # Decoded body
+    content: bytes
+    url: str
+
+    def json(self) -> object:
+        return json.loads(self.content)
+
+    def raise_for_status(self) -> None:
+        if self.status_code >= 400:
+            raise HTTPStatusError(self.status_code, self.url, self.headers)
+
+
+class HostStats:
+    def __init__(self):
+        self.requests = 0
+        self.errors = 0
+        self.seconds = 0.0
+        # Bytes as received (compressed) and after decoding
+        self.wire_bytes = 0
+        self.body_bytes = 0
+
+    def to_dict(self) -> Dict:
+        return {
+            "requests": self.requests,
+            "errors": self.errors,
+            "avg_ms": round(1000 * self.seconds / self.requests, 1) if self.requests else None,
+            "wire_bytes": self.wire_bytes,
+            "body_bytes": self.body_bytes,
+        }
+
+
+class Transport:
+    def __init__(
+        self,
+        timeout: float = DEFAULT_TIMEOUT_SECONDS,
+        pool_size: int = DEFAULT_POOL_SIZE,
+        http2: bool = HTTP2_ENABLED,
+    ):
+        self.timeout = timeout
+        self.pool_size = pool_size
+        self._lock = threading.Lock()
+        self._stats: Dict[str, HostStats] = {}
+        if http2 and httpx is not None:
+            self.backend = "httpx/http2"
+            self._client = httpx.Client(
+                http2=True,
+                timeout=timeout,
+                limits=httpx.Limits(max_connections=pool_size, max_keepalive_connections=pool_size),
+            )
+        else:
+            self.backend = "requests"
+            self._client = requests.Session()
+            adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=0)
+            self._client.mount("https://", adapter)
+            self._client.mount("http://", adapter)
+
+    def get(self, url: str, headers: Optional[Mapping[str, str]] = None, params: Optional[Mapping] = None) -> Reply:
+        headers = {"Accept-Encoding": ACCEPT_ENCODING, **(headers or {})}
+        start = time.perf_counter()
+        try:
+            if self.backend == "requests":
+                r = self._client.get(url, headers=headers, params=params, timeout=self.timeout)
+                content = r.content
+                # urllib3 counts the bytes read off the socket, before decoding
+                wire = r.raw.tell() if r.raw is not None else len(content)
+            else:
+                r = self._client.get(url, headers=headers, params=params)
+                content = r.content
+                wire = r.num_bytes_downloaded
+        except (requests.RequestException, *((httpx.HTTPError,) if httpx else ())) as e:
+            self._record(url, time.perf_counter() - start, 0, 0, error=True)
+            raise TransportError(f"{type(e).__name__} for {url}: {e}") from e
+        self._record(url, time.perf_counter() - start, wire, len(content), error=r.status_code >= 400)
+        return Reply(r.status_code, r.headers, content, str(r.url))
+
+    def download(
+        self, url: str, headers: Optional[Mapping[str, str]] = None, spool_bytes: int = SPOOL_BYTES
+    ) -> Tuple[Reply, IO[bytes]]:
+        """Stream a body, following redirects, into a spooled temporary file rewound to the start.
+
+        The Reply carries no content; for an error status the file is empty.
+        Authorization is dropped when a redirect leaves the original host.
+        """
+        headers = {"Accept-Encoding": ACCEPT_ENCODING, **(headers or {})}
+        body = tempfile.SpooledTemporaryFile(max_size=spool_bytes)
+        size = 0
+        start = time.perf_counter()
+        try:
+            if self.backend == "requests":
+                with self._client.get(url, headers=headers, timeout=self.timeout, stream=True) as r:
+                    if r.status_code < 400:
+                        for chunk in r.iter_content(CHUNK_BYTES):
+                            body.write(chunk)
+                            size += len(chunk)
+                    wire = r.raw.tell() if r.raw is not None else size
+            else:
+                with self._client.stream("GET", url, headers=headers, follow_redirects=True) as r:
+                    if r.status_code < 400:
+                        for chunk in r.iter_bytes(CHUNK_BYTES):
+                            body.write(chunk)
+                            size += len(chunk)
+                    wire = r.num_bytes_downloaded
+        except (requests.RequestException, *((httpx.HTTPError,) if httpx else ())) as e:
+            body.close()
+            self._record(url, time.perf_counter() - start, 0, 0, error=True)
+            raise TransportError(f"{type(e).__name__} for {url}: {e}") from e
+        self._record(url, time.perf_counter() - start, wire, size, error=r.status_code >= 400)
+        body.seek(0)
+        # The original URL: a redirect target may be a signed storage URL
+        return Reply(r.status_code, r.headers, b"", url), body
+
+    def _record(self, url: str, seconds: float, wire: int, body: int, error: bool) -> None:
+        host = urlsplit(url).netloc
+        with self._lock:
+            stats = self._stats.setdefault(host, HostStats())
+            stats.requests += 1
+            stats.errors += error
+            stats.seconds += seconds
+            stats.wire_bytes += wire
+            stats.body_bytes += body
+
+    def stats(self) -> Dict[str, Dict]:
+        with self._lock:
+            return {host: s.to_dict() for host, s in self._stats.items()}
+
+    def summary(self) -> str:
+        parts: List[str] = []
+        for host, s in sorted(self.stats().items()):
+            parts.append(
+                f"{host} {s['requests']} requests ({s['errors']} errors), avg {s['avg_ms']} ms, "
+                f"{s['wire_bytes'] / 1e6:.2f} MB received ({s['body_bytes'] / 1e6:.2f} MB decoded)"
+            )
+        return f"{self.backend}, pool {self.pool_size}: " + ("; ".join(parts) or "no requests")
+
+    def close(self) -> None:
+        self._client.close()
+
+
+_shared: Optional[Transport] = None
+_shared_lock = threading.Lock()
+
+
+def shared_transport() -> Transport:
+    """The process-wide transport with default settings, created on first use."""
+    global _shared
+    with _shared_lock:
+        if _shared is None:
+            _shared = Transport()
+        return _shared
@@ -0,0 +1,383 @@
+#!/usr/bin/env python3
+"""
+Prometheus exporter for the DORA and testing metrics.
+
+Serves the numbers in dora.json and testing.json as labeled gauges and
+summaries on /metrics. A background thread refreshes them every --interval
+seconds, either by running collect_metrics.py (the default; one pass over
+the API writes both files) or, with --from-files, by re-reading JSON that
+something else publishes (the scheduled workflows, dora_webhook.py). Each
+refresh renders the exposition text once; a scrape only returns those
+cached bytes and never reaches the GitHub API.
+
+Metrics (repo="" is the org-wide value; window_days is the metric window):
+  dora_deployment_frequency_per_day{repo,window_days}     gauge
+  dora_change_failure_rate{repo,window_days}              gauge
+  dora_deployments{repo,window_days}                      gauge
+  dora_lead_time_hours{repo,window_days,quantile}         summary (+ _sum, _count)
+  dora_time_to_restore_hours{repo,window_days,quantile}   summary (+ _sum, _count)
+  testing_automation_rate{repo,window_days}               gauge
+  testing_defect_leakage_rate{repo,window_days}           gauge
+  testing_coverage_percent{repo,window_days,scope}        gauge (scope overall, unit, integration, e2e)
+  metrics_exporter_*                                      refresh status per source (success, failures, timeouts)
+
+Usage:
+  python3 shared/scripts/metrics_exporter.py --port 9184 --interval 900
+  python3 shared/scripts/metrics_exporter.py --from-files --interval 60
+  python3 shared/scripts/metrics_exporter.py --once          # print one rendering and exit
+
+Environment:
+  METRICS_EXPORTER_PORT     listen port (default 9184)
+  METRICS_EXPORTER_INTERVAL seconds between refreshes (default 900)
+  METRICS_EXPORTER_COLLECT_TIMEOUT  seconds before a hung collect_metrics.py is killed (default 1800)
+  METRICS_CACHE_DIR         collector caches; collected JSON goes to <dir>/exporter
+  GITHUB_TOKEN / GH_TOKEN   passed through to collect_metrics.py
+"""
+
+import argparse
+import json
+import os
+import shlex
+import subprocess
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Iterable, List, Optional, Tuple
+
+SCRIPTS_DIR = os.path.dirname(os.path.abspath(__file__))
+DOCS_DATA = os.path.abspath(os.path.join(SCRIPTS_DIR, "..", "..", "docs", "data"))
+CACHE_DIR = os.environ.get(
+    "METRICS_CACHE_DIR",
+    os.path.abspath(os.path.join(SCRIPTS_DIR, "..", "..", ".cache", "metrics")),
+)
+DEFAULT_PORT = int(os.environ.get("METRICS_EXPORTER_PORT", "9184"))
+DEFAULT_INTERVAL = float(os.environ.get("METRICS_EXPORTER_INTERVAL", "900"))
+DEFAULT_COLLECT_TIMEOUT = float(os.environ.get("METRICS_EXPORTER_COLLECT_TIMEOUT", "1800"))
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+QUANTILES = (("0.5", "p50"), ("0.9", "p90"), ("0.99", "p99"))
+
+Labels = Tuple[Tuple[str, str], ...]
+
+
+# ============================================================================
+# RENDERING
+# ============================================================================
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(labels: Labels) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in labels) + "}"
+
+
+def _format_value(value: float) -> str:
+    return repr(float(value))
+
+
+class Exposition:
+    """Collects samples per metric family and renders the text format."""
+
+    def __init__(self):
+        self.families: Dict[str, Tuple[str, str, List[Tuple[str, Labels, float]]]] = {}
+
+    def add(self, name: str, kind: str, help_text: str, labels: Labels, value: Optional[float], suffix: str = "") -> None:
+        if value is None:
+            return
+        family = self.families.setdefault(name, (kind, help_text, []))
+        family[2].append((name + suffix, labels, value))
+
+    def render(self) -> bytes:
+        lines: List[str] = []
+        for name, (kind, help_text, samples) in self.families.items():
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            for sample, labels, value in samples:
+                lines.append(f"{sample}{_format_labels(labels)} {_format_value(value)}")
+        return ("\n".join(lines) + "\n").encode()
+
+
+def _windows(data: Dict) -> Iterable[Tuple[str, Dict]]:
+    """(window_days, {"overall", "repos"}) for every window in a metrics JSON."""
+    if data.get("windows"):
+        return sorted(data["windows"].items(), key=lambda kv: int(kv[0]))
+    return [(str(data.get("window_days", "")), data)]
+
+
+def _scopes(window: Dict) -> Iterable[Tuple[str, Dict]]:
+    yield "", window.get("overall") or {}
+    for repo, metrics in sorted((window.get("repos") or {}).items()):
+        yield repo, metrics
+
+
+def _add_summary(out: Exposition, name: str, help_text: str, labels: Labels, metrics: Dict, key: str) -> None:
+    for quantile, field in QUANTILES:
+        out.add(name, "summary", help_text, labels + (("quantile", quantile),), metrics.get(f"{key}_{field}"))
+    sketch = (metrics.get("sketches") or {}).get(key)
+    if sketch and sketch.get("count"):
+        out.add(name, "summary", help_text, labels, sketch.get("sum"), "_sum")
+        out.add(name, "summary", help_text, labels, sketch["count"], "_count")
+
+
+def add_dora(out: Exposition, data: Dict) -> None:
+    for window_days, window in _windows(data):
+        for repo, metrics in _scopes(window):
+            labels: Labels = (("repo", repo), ("window_days", window_days))
+            out.add(
+                "dora_deployment_frequency_per_day", "gauge", "Production deployments per day over the window.",
+                labels, metrics.get("deployment_frequency_per_day"),
+            )
+            out.add(
+                "dora_change_failure_rate", "gauge", "Fraction of production deployments that failed (0..1).",
+                labels, metrics.get("change_failure_rate"),
+            )
+            out.add("dora_deployments", "gauge", "Production deployments in the window.", labels, metrics.get("deployments"))
+            _add_summary(
+                out, "dora_lead_time_hours", "Commit-to-deploy lead time in hours.", labels, metrics, "lead_time_hours"
+            )
+            _add_summary(
+                out, "dora_time_to_restore_hours", "Hours from a failed deployment to the next successful one.",
+                labels, metrics, "time_to_restore_hours",
+            )
+
+
+def add_testing(out: Exposition, data: Dict) -> None:
+    for window_days, window in _windows(data):
+        for repo, metrics in _scopes(window):
+            labels: Labels = (("repo", repo), ("window_days", window_days))
+            out.add(
+                "testing_automation_rate", "gauge", "Fraction of workflow runs that execute tests (0..1).",
+                labels, metrics.get("automation_rate"),
+            )
+            out.add(
+                "testing_defect_leakage_rate", "gauge", "Bugs opened per non-bug issue closed in the window.",
+                labels, metrics.get("defect_leakage_rate"),
+            )
+            for scope in ("overall", "unit", "integration", "e2e"):
+                out.add(
+                    "testing_coverage_percent", "gauge", "Line coverage from the latest CI coverage reports.",
+                    labels + (("scope", scope),), metrics.get(f"coverage_{scope}"),
+                )
+
+
+RENDERERS = {"dora": add_dora, "testing": add_testing}
+
+
+# ============================================================================
+# SOURCES
+# ============================================================================
+
+
+class Source:
+    """One metrics JSON, re-read when its mtime changes."""
+
+    def __init__(self, name: str, path: str):
+        self.name = name
+        self.path = path
+        self.data: Optional[Dict] = None
+        self.mtime: Optional[float] = None
+        self.last_success: Optional[float] = None
+        self.ok = False
+        self.duration = 0.0
+        self.failures = 0
+        self.timeouts = 0
+
+    def load(self, collect_error: Optional[str] = None, collect_seconds: float = 0.0) -> None:
+        """Reload the file; a failed collection counts as a failure but keeps the last data."""
+        start = time.perf_counter()
+        try:
+            if collect_error:
+                raise RuntimeError(collect_error)
+            mtime = os.path.getmtime(self.path)
+            if mtime != self.mtime:
+                with open(self.path) as f:
+                    self.data = json.load(f)
+                self.mtime = mtime
+            self.last_success = time.time()
+            self.ok = True
+        except (OSError, ValueError, RuntimeError) as e:
+            self.ok = False
+            self.failures += 1
+            print(f"Refresh of {self.name} failed: {e}", file=sys.stderr)
+        finally:
+            self.duration = collect_seconds + time.perf_counter() - start
+
+
+def build_collect(from_files: bool, collect_args: List[str]) -> Tuple[List[Source], Optional[List[str]]]:
+    """The sources to read and, unless reading published files, the command that writes them."""
+    if from_files:
+        return [
+            Source("dora", os.path.join(DOCS_DATA, "dora.json")),
+            Source("testing", os.path.join(DOCS_DATA, "testing.json")),
+        ], None
+    out_dir = os.path.join(CACHE_DIR, "exporter")
+    os.makedirs(out_dir, exist_ok=True)
+    sources = [Source("dora", os.path.join(out_dir, "dora.json")), Source("testing", os.path.join(out_dir, "testing.json"))]
+    command = [
+        sys.executable,
+        os.path.join(SCRIPTS_DIR, "collect_metrics.py"),
+        *collect_args,
+        "--dora-output",
+        sources[0].path,
+        "--testing-output",
+        sources[1].path,
+    ]
+    return sources, command
+
+
+def render(sources: List[Source]) -> bytes:
+    out = Exposition()
+    for source in sources:
+        if source.data is not None:
+            RENDERERS[source.name](out, source.data)
+    for source in sources:
+        labels: Labels = (("source", source.name),)
+        out.add(
+            "metrics_exporter_last_success_timestamp_seconds", "gauge",
+            "Unix time of the last successful refresh.", labels, source.last_success,
+        )
+        out.add(
+            "metrics_exporter_refresh_duration_seconds", "gauge",
+            "Duration of the most recent refresh.", labels, source.duration,
+        )
+        out.add(
+            "metrics_exporter_last_refresh_success", "gauge",
+            "1 if the most recent refresh succeeded, 0 if the served data is stale.", labels, int(source.ok),
+        )
+        out.add(
+            "metrics_exporter_refresh_failures_total", "counter",
+            "Refreshes that failed since the exporter started.", labels, source.failures,
+        )
+        out.add(
+            "metrics_exporter_collect_timeouts_total", "counter",
+            "Collector runs killed for exceeding the collect timeout.", labels, source.timeouts,
+        )
+    return out.render()
+
+
+# ============================================================================
+# REFRESHER AND HTTP SERVER
+# ============================================================================
+
+
+class Exporter:
+    def __init__(
+        self,
+        sources: List[Source],
+        interval: float,
+        collect: Optional[List[str]] = None,
+        collect_timeout: float = DEFAULT_COLLECT_TIMEOUT,
+    ):
+        self.sources = sources
+        self.interval = interval
+        self.collect = collect
+        self.collect_timeout = collect_timeout
+        # Swapped whole by the refresher; handlers only read the reference
+        self.body = render(sources)
+        self._stop = threading.Event()
+
+    def refresh(self) -> None:
+        error = None
+        start = time.perf_counter()
+        if self.collect:
+            try:
+                proc = subprocess.run(self.collect, capture_output=True, text=True, timeout=self.collect_timeout)
+            except subprocess.TimeoutExpired:
+                # run() has killed the collector; keep serving the last data, flagged as stale
+                error = f"collector timed out after {self.collect_timeout:g}s"
+                for source in self.sources:
+                    source.timeouts += 1
+            else:
+                if proc.returncode:
+                    error = f"collector exit {proc.returncode}: {proc.stdout[-500:]}{proc.stderr[-1500:]}"
+        elapsed = time.perf_counter() - start
+        for source in self.sources:
+            source.load(error, elapsed)
+        self.body = render(self.sources)
+
+    def _loop(self) -> None:
+        while not self._stop.is_set():
+            self.refresh()
+            self._stop.wait(self.interval)
+
+    def start(self) -> threading.Thread:
+        thread = threading.Thread(target=self._loop, name="metrics-refresher", daemon=True)
+        thread.start()
+        return thread
+
+    def stop(self) -> None:
+        self._stop.set()
+
+
+def make_handler(exporter: Exporter):
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            path = self.path.split("?", 1)[0]
+            if path == "/metrics":
+                body, content_type = exporter.body, CONTENT_TYPE
+            elif path == "/healthz":
+                body, content_type = b"ok\n", "text/plain; charset=utf-8"
+            else:
+                self.send_error(404)
+                return
+            self.send_response(200)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    return Handler
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Prometheus exporter for DORA and testing metrics")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--interval", type=float, default=DEFAULT_INTERVAL, help="Seconds between refreshes")
+    parser.add_argument(
+        "--from-files",
+        action="store_true",
+        help="Re-read docs/data/*.json instead of running collect_metrics.py",
+    )
+    parser.add_argument(
+        "--collect-args",
+        default="--window-days 30 7 90",
+        help="Extra collect_metrics.py arguments (quoted string) when collecting",
+    )
+    parser.add_argument(
+        "--collect-timeout",
+        type=float,
+        default=DEFAULT_COLLECT_TIMEOUT,
+        help="Seconds before a collect_metrics.py run is killed and counted as a failed refresh",
+    )
+    parser.add_argument("--once", action="store_true", help="Refresh once, print the exposition and exit")
+    args = parser.parse_args()
+
+    sources, collect = build_collect(args.from_files, shlex.split(args.collect_args))
+    exporter = Exporter(sources, args.interval, collect, args.collect_timeout)
+    if args.once:
+        exporter.refresh()
+        sys.stdout.write(exporter.body.decode())
+        return
+
+    exporter.start()
+    server = ThreadingHTTPServer((args.host, args.port), make_handler(exporter))
+    print(f"Serving /metrics on {args.host}:{args.port} (refresh every {args.interval:g}s)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        exporter.stop()
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""
+Shared paginator for the GitHub list endpoints used by the metrics collectors.
+
+Page 1 is fetched first. When its Link header (or a `total_count` in the
+body) gives the last page, the following pages are prefetched concurrently,
+`concurrency` pages at a time; otherwise rel="next" links are followed, and
+responses without a Link header (e.g. a 304 answered from a cache) are
+walked until a short page.
+
+Endpoints that list newest first can pass `outside(item)`: the first page
+whose items are all outside the window ends the listing, and no page after
+it is fetched. Pair it with the endpoint's server-side filter (`created=>=`
+for workflow runs, `since=` for issues) so GitHub only returns the window in
+the first place; `outside` then guards against servers and caches that
+ignore the filter. Pages that are partly in the window are returned whole,
+so callers still filter items.
+
+The module is HTTP-client agnostic: `get_page(page)` returns a page's
+decoded JSON body and response headers.
+
+Usage:
+  runs = paginate(get_page, key="workflow_runs", outside=lambda run: run["created_at"] < since)
+"""
+
+import math
+import re
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Iterable, List, Mapping, Optional, Tuple
+
+PER_PAGE = 100
+DEFAULT_CONCURRENCY = 8
+
+Page = Tuple[object, Mapping[str, str]]
+
+
+def link_relations(link: Optional[str]) -> Dict[str, str]:
+    """URL per relation ("next", "last", ...) of a GitHub Link header."""
+    rels: Dict[str, str] = {}
+    for part in (link or "").split(","):
+        m = re.match(r'\s*<([^>]*)>\s*;\s*rel="([^"]+)"', part)
+        if m:
+            rels[m.group(2)] = m.group(1)
+    return rels
+
+
+def last_page(link: Optional[str]) -> Optional[int]:
+    """Page number of the rel="last" link in a GitHub Link header."""
+    m = re.search(r"[?&]page=(\d+)", link_relations(link).get("last", ""))
+    return int(m.group(1)) if m else None
+
+
+def page_items(body: object, key: Optional[str]) -> List:
+    """Items of a page: the body itself for list endpoints, body[key] for wrapped ones."""
+    if key is None:
+        return list(body or [])
+    return list((body or {}).get(key) or [])
+
+
+def _known_last(body: object, headers: Mapping[str, str], per_page: int) -> Optional[int]:
+    last = last_page(headers.get("Link"))
+    if last is None and isinstance(body, dict) and body.get("total_count"):
+        last = math.ceil(body["total_count"] / per_page)
+    return last
+
+
+def _fetch(get_page: Callable[[int], Page], pages: Iterable[int], concurrency: int) -> List[Page]:
+    pages = list(pages)
+    if concurrency <= 1 or len(pages) <= 1:
+        return [get_page(p) for p in pages]
+    with ThreadPoolExecutor(max_workers=min(concurrency, len(pages))) as pool:
+        return list(pool.map(get_page, pages))
+
+
+def paginate(
+    get_page: Callable[[int], Page],
+    key: Optional[str] = None,
+    outside: Optional[Callable[[Dict], bool]] = None,
+    concurrency: int = DEFAULT_CONCURRENCY,
+    per_page: int = PER_PAGE,
+) -> List:
+    """Items of every page in page order, stopping early at a page wholly outside the window."""
+    out: List = []
+
+    def keep(items: List) -> bool:
+        """Add a page's items; False when no later page is needed."""
+        if outside is not None and items and all(outside(item) for item in items):
+            return False
+        out.extend(items)
+        return len(items) >= per_page
+
+    body, headers = get_page(1)
+    if not keep(page_items(body, key)):
+        return out
+
+    page = 2
+    last = _known_last(body, headers, per_page)
+    if last is not None:
+        # Prefetch a batch at a time so an early stop wastes at most one batch
+        batch = max(1, concurrency)
+        while page <= last:
+            pages = range(page, min(last, page + batch - 1) + 1)
+            for body, headers in _fetch(get_page, pages, concurrency):
+                if not keep(page_items(body, key)):
+                    return out
+            page = pages[-1] + 1
+
+    # Sequential tail: no page count was given, or items arrived after page 1 was read
+    while True:
+        link = headers.get("Link")
+        if link and "next" not in link_relations(link):
+            return out
+        body, headers = get_page(page)
+        if not keep(page_items(body, key)):
+            return out
+        page += 1
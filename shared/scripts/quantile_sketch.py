@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""
+Mergeable quantile sketch for DORA duration distributions.
+
+A relative-error sketch in the DDSketch family: non-negative values are
+counted in logarithmically spaced buckets, so every sample is known to
+within `relative_accuracy` and so is every quantile interpolated from them. Merging two sketches adds
+their bucket counts, which is exact and independent of insertion order, so
+per-repo sketches can be combined into org-wide rollups and across windows
+in O(sketch size) without keeping raw samples.
+
+Usage:
+  s = QuantileSketch()
+  s.add(3.5)
+  s.merge(QuantileSketch.from_dict(other_json))
+  p90 = s.quantile(0.9)
+"""
+
+import math
+from typing import Dict, List, Optional, Sequence
+
+DEFAULT_RELATIVE_ACCURACY = 0.01
+# Values below this (in the caller's unit) are counted as zero
+MIN_INDEXABLE = 1e-6
+
+
+class QuantileSketch:
+    def __init__(self, relative_accuracy: float = DEFAULT_RELATIVE_ACCURACY):
+        if not 0 < relative_accuracy < 1:
+            raise ValueError("relative_accuracy must be in (0, 1)")
+        self.relative_accuracy = relative_accuracy
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._log_gamma = math.log(self.gamma)
+        self.bins: Dict[int, int] = {}
+        self.zero_count = 0
+        self.count = 0
+        self.sum = 0.0
+        self.min: Optional[float] = None
+        self.max: Optional[float] = None
+
+    def _index(self, value: float) -> int:
+        return math.ceil(math.log(value) / self._log_gamma)
+
+    def _value(self, index: int) -> float:
+        # Midpoint (in relative terms) of bucket (gamma^(i-1), gamma^i]
+        return 2 * self.gamma ** index / (self.gamma + 1)
+
+    def add(self, value: float, weight: int = 1) -> None:
+        if value < 0:
+            raise ValueError("QuantileSketch only accepts non-negative values")
+        if value < MIN_INDEXABLE:
+            self.zero_count += weight
+        else:
+            i = self._index(value)
+            self.bins[i] = self.bins.get(i, 0) + weight
+        self.count += weight
+        self.sum += value * weight
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = value if self.max is None else max(self.max, value)
+
+    def merge(self, other: "QuantileSketch") -> "QuantileSketch":
+        if not math.isclose(other.relative_accuracy, self.relative_accuracy):
+            raise ValueError("Cannot merge sketches with different relative accuracy")
+        for i, c in other.bins.items():
+            self.bins[i] = self.bins.get(i, 0) + c
+        self.zero_count += other.zero_count
+        self.count += other.count
+        self.sum += other.sum
+        if other.min is not None:
+            self.min = other.min if self.min is None else min(self.min, other.min)
+        if other.max is not None:
+            self.max = other.max if self.max is None else max(self.max, other.max)
+        return self
+
+    def _ranked(self, ranks: Sequence[int]) -> List[float]:
+        """Estimated values of the samples at the given (ascending, 0-based) ranks."""
+        values: List[float] = []
+        ranks = list(ranks)
+        seen = self.zero_count
+        while ranks and ranks[0] < seen:
+            values.append(0.0)
+            ranks.pop(0)
+        for i in sorted(self.bins):
+            seen += self.bins[i]
+            while ranks and ranks[0] < seen:
+                values.append(min(max(self._value(i), self.min), self.max))
+                ranks.pop(0)
+            if not ranks:
+                break
+        return values + [self.max] * len(ranks)
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Value at quantile q in [0, 1]; None when empty.
+
+        Interpolates linearly between the samples around rank q * (count - 1),
+        like statistics.median and statistics.quantiles(method="inclusive"), so
+        the estimate is within relative_accuracy of their exact result.
+        """
+        if not self.count:
+            return None
+        rank = q * (self.count - 1)
+        lower = math.floor(rank)
+        low, high = self._ranked((lower, min(lower + 1, self.count - 1)))
+        return low + (rank - lower) * (high - low)
+
+    def mean(self) -> Optional[float]:
+        return self.sum / self.count if self.count else None
+
+    def to_dict(self) -> Dict:
+        """Compact JSON form; buckets are one "index:count,..." string so they stay on one line."""
+        return {
+            "relative_accuracy": self.relative_accuracy,
+            "count": self.count,
+            "sum": round(self.sum, 6),
+            "min": round(self.min, 6) if self.min is not None else None,
+            "max": round(self.max, 6) if self.max is not None else None,
+            "zero_count": self.zero_count,
+            "bins": ",".join(f"{i}:{self.bins[i]}" for i in sorted(self.bins)),
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> "QuantileSketch":
+        sketch = cls(data.get("relative_accuracy", DEFAULT_RELATIVE_ACCURACY))
+        for pair in filter(None, data.get("bins", "").split(",")):
+            i, c = pair.split(":")
+            sketch.bins[int(i)] = int(c)
+        sketch.zero_count = data.get("zero_count", 0)
+        sketch.count = data.get("count", 0)
+        sketch.sum = data.get("sum", 0.0)
+        sketch.min = data.get("min")
+        sketch.max = data.get("max")
+        return sketch
@@ -0,0 +1,192 @@
+#!/usr/bin/env python3
+"""
+Rate-limit-aware request scheduling for the GitHub metrics collectors.
+
+A TokenPool spreads requests across every configured GitHub token. Each token
+is paced by its own token bucket, tracks X-RateLimit-Remaining/Reset from the
+responses it receives, and is parked until its reset (or Retry-After) when it
+runs dry. RequestScheduler wraps a single HTTP call, retrying rate-limited and
+transient failures with jittered exponential backoff instead of failing the
+whole job.
+
+The scheduler is HTTP-client agnostic: `send(token)` performs the request and
+`meta(response)` returns its status code and headers.
+
+Environment:
+  GITHUB_TOKEN, GH_TOKEN   tokens added to the pool
+  GITHUB_TOKENS            extra comma-separated tokens
+  GITHUB_MAX_RPS           per-token request rate ceiling (default 15/s)
+  GITHUB_MAX_RETRIES       attempts after the first one (default 6)
+"""
+
+import os
+import random
+import threading
+import time
+from typing import Callable, Dict, List, Mapping, Optional, Sequence, Tuple, Type, TypeVar
+
+T = TypeVar("T")
+
+# GitHub's secondary limit for REST is 900 points per minute; a GET costs one point
+DEFAULT_MAX_RPS = float(os.environ.get("GITHUB_MAX_RPS", "15"))
+DEFAULT_MAX_RETRIES = int(os.environ.get("GITHUB_MAX_RETRIES", "6"))
+BACKOFF_BASE_SECONDS = 1.0
+BACKOFF_CAP_SECONDS = 60.0
+# Secondary limits without Retry-After: GitHub asks clients to wait at least a minute
+SECONDARY_LIMIT_WAIT_SECONDS = 60.0
+RETRYABLE_STATUS = {429, 500, 502, 503, 504}
+
+
+def tokens_from_env() -> List[Optional[str]]:
+    """GITHUB_TOKEN, GH_TOKEN and GITHUB_TOKENS, de-duplicated; [None] when unauthenticated."""
+    tokens = [os.environ.get("GITHUB_TOKEN"), os.environ.get("GH_TOKEN")]
+    tokens.extend(t.strip() for t in os.environ.get("GITHUB_TOKENS", "").split(","))
+    unique = list(dict.fromkeys(t for t in tokens if t))
+    return unique or [None]
+
+
+class TokenBucket:
+    def __init__(self, rate: float, burst: Optional[float] = None):
+        self.rate = rate
+        self.capacity = burst if burst is not None else max(1.0, rate)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float) -> None:
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def delay(self, now: float) -> float:
+        """Seconds until one request may be sent."""
+        self._refill(now)
+        return 0.0 if self.tokens >= 1 else (1 - self.tokens) / self.rate
+
+    def take(self, now: float) -> None:
+        self._refill(now)
+        self.tokens -= 1
+
+
+class _Credential:
+    def __init__(self, token: Optional[str], max_rps: float):
+        self.token = token
+        self.bucket = TokenBucket(max_rps)
+        self.remaining: Optional[int] = None
+        # time.monotonic() before which the token must not be used
+        self.blocked_until = 0.0
+        self.requests = 0
+
+
+class TokenPool:
+    def __init__(self, tokens: Sequence[Optional[str]], max_rps: float = DEFAULT_MAX_RPS):
+        self._creds = [_Credential(t, max_rps) for t in (tokens or [None])]
+        self._by_token = {c.token: c for c in self._creds}
+        self._lock = threading.Lock()
+        self.waited_seconds = 0.0
+
+    def acquire(self) -> Optional[str]:
+        """Block until some token may send a request, then return it."""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                ready_at, cred = min(
+                    ((max(c.blocked_until, now + c.bucket.delay(now)), c) for c in self._creds),
+                    key=lambda item: (item[0], -(item[1].remaining if item[1].remaining is not None else 1 << 30)),
+                )
+                if ready_at <= now:
+                    cred.bucket.take(now)
+                    cred.requests += 1
+                    return cred.token
+                wait = ready_at - now
+                self.waited_seconds += wait
+            time.sleep(wait)
+
+    def observe(self, token: Optional[str], status: int, headers: Mapping[str, str]) -> Optional[float]:
+        """Record rate-limit headers for a response; return the enforced wait in seconds, if any."""
+        remaining = headers.get("X-RateLimit-Remaining")
+        reset = headers.get("X-RateLimit-Reset")
+        retry_after = headers.get("Retry-After")
+        wait: Optional[float] = None
+        if retry_after:
+            try:
+                wait = max(0.0, float(retry_after))
+            except ValueError:
+                wait = SECONDARY_LIMIT_WAIT_SECONDS
+        elif remaining == "0" and reset:
+            try:
+                wait = max(0.0, float(reset) - time.time()) + 1.0
+            except ValueError:
+                # Malformed reset time: back off as for an unguided limit
+                wait = SECONDARY_LIMIT_WAIT_SECONDS
+        elif status == 429:
+            # Secondary limit without guidance
+            wait = SECONDARY_LIMIT_WAIT_SECONDS
+        with self._lock:
+            cred = self._by_token.get(token)
+            if cred is None:
+                return wait
+            if remaining is not None:
+                try:
+                    cred.remaining = int(remaining)
+                except ValueError:
+                    pass
+            if wait is not None:
+                cred.blocked_until = max(cred.blocked_until, time.monotonic() + wait)
+        return wait
+
+    def stats(self) -> Dict[str, object]:
+        with self._lock:
+            return {
+                "tokens": len(self._creds),
+                "requests": [c.requests for c in self._creds],
+                "remaining": [c.remaining for c in self._creds],
+                "waited_seconds": round(self.waited_seconds, 1),
+            }
+
+
+def is_rate_limited(status: int, headers: Mapping[str, str]) -> bool:
+    if status == 429:
+        return True
+    return status == 403 and (headers.get("X-RateLimit-Remaining") == "0" or bool(headers.get("Retry-After")))
+
+
+class RequestScheduler:
+    def __init__(
+        self,
+        pool: TokenPool,
+        max_retries: int = DEFAULT_MAX_RETRIES,
+        retry_on: Tuple[Type[BaseException], ...] = (),
+    ):
+        self.pool = pool
+        self.max_retries = max_retries
+        self.retry_on = retry_on
+        self.retries = 0
+
+    def backoff(self, attempt: int) -> float:
+        """Full-jitter exponential backoff."""
+        return random.uniform(0, min(BACKOFF_CAP_SECONDS, BACKOFF_BASE_SECONDS * 2 ** attempt))
+
+    def call(self, send: Callable[[Optional[str]], T], meta: Callable[[T], Tuple[int, Mapping[str, str]]]) -> T:
+        """Send a request, retrying rate limits and transient errors; return the final response."""
+        attempt = 0
+        while True:
+            token = self.pool.acquire()
+            try:
+                resp = send(token)
+            except self.retry_on:
+                if attempt >= self.max_retries:
+                    raise
+                self.retries += 1
+                time.sleep(self.backoff(attempt))
+                attempt += 1
+                continue
+
+            status, headers = meta(resp)
+            wait = self.pool.observe(token, status, headers)
+            limited = is_rate_limited(status, headers)
+            if not (limited or status in RETRYABLE_STATUS) or attempt >= self.max_retries:
+                return resp
+            self.retries += 1
+            if wait is None:
+                # The pool parks rate-limited tokens itself; only back off on server errors
+                time.sleep(self.backoff(attempt))
+            attempt += 1
@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+Organisation-wide repository discovery for the metrics collectors.
+
+Lists every repository of a GitHub organisation and keeps the ones worth
+collecting: not archived, not disabled, not a fork, and pushed to within the
+activity window. The listing is paged by paginate.py, which prefetches the
+pages after the first concurrently. The filtered list is cached as JSON with
+a TTL so repeated runs skip the listing.
+
+The module is HTTP-client agnostic: `get_page(page)` returns a page's items
+and response headers.
+
+Usage:
+  repos = discover_repos("Honey-Badger-Labs", get_page, cache_dir=".cache/metrics")
+
+Environment:
+  METRICS_ORG                  organisation to discover repos in (collectors fall back to their lists)
+  METRICS_ACTIVE_DAYS          skip repos not pushed to within this many days (default 90)
+  METRICS_REPOS_TTL_HOURS      how long a discovered list is reused (default 24)
+"""
+
+import json
+import os
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Dict, List, Optional
+
+from paginate import DEFAULT_CONCURRENCY, Page, paginate
+
+UTC = timezone.utc
+DEFAULT_ACTIVE_DAYS = int(os.environ.get("METRICS_ACTIVE_DAYS", "90"))
+DEFAULT_TTL_SECONDS = float(os.environ.get("METRICS_REPOS_TTL_HOURS", "24")) * 3600
+
+
+def list_org_repos(get_page: Callable[[int], Page], concurrency: int = DEFAULT_CONCURRENCY) -> List[Dict]:
+    """Every repository in the listing, in page order."""
+    return paginate(get_page, concurrency=concurrency)
+
+
+def skip_reason(repo: Dict, cutoff: datetime) -> Optional[str]:
+    if repo.get("archived"):
+        return "archived"
+    if repo.get("disabled"):
+        return "disabled"
+    if repo.get("fork"):
+        return "fork"
+    pushed = repo.get("pushed_at")
+    if not pushed or datetime.fromisoformat(pushed.replace("Z", "+00:00")) < cutoff:
+        return "inactive"
+    return None
+
+
+def _cache_path(cache_dir: str, org: str, active_days: int) -> str:
+    return os.path.join(cache_dir, f"repos-{org.lower()}-{active_days}d.json")
+
+
+def discover_repos(
+    org: str,
+    get_page: Callable[[int], Page],
+    cache_dir: Optional[str] = None,
+    active_days: int = DEFAULT_ACTIVE_DAYS,
+    ttl_seconds: float = DEFAULT_TTL_SECONDS,
+    concurrency: int = DEFAULT_CONCURRENCY,
+) -> List[str]:
+    """Active, non-fork, non-archived "owner/name" repos of an org, sorted; cached for ttl_seconds."""
+    path = _cache_path(cache_dir, org, active_days) if cache_dir else None
+    if path and ttl_seconds > 0:
+        try:
+            with open(path) as f:
+                cached = json.load(f)
+            if time.time() - cached["fetched_at"] < ttl_seconds:
+                print(f"Discovery: {len(cached['repos'])} repos in {org} (cached)")
+                return cached["repos"]
+        except (OSError, ValueError, KeyError):
+            pass
+
+    cutoff = datetime.now(UTC) - timedelta(days=active_days)
+    skipped: Dict[str, int] = {}
+    repos: List[str] = []
+    listing = list_org_repos(get_page, concurrency)
+    for repo in listing:
+        reason = skip_reason(repo, cutoff)
+        if reason:
+            skipped[reason] = skipped.get(reason, 0) + 1
+        else:
+            repos.append(repo["full_name"])
+    repos.sort(key=str.lower)
+    detail = ", ".join(f"{count} {reason}" for reason, count in sorted(skipped.items()))
+    print(f"Discovery: {len(repos)} of {len(listing)} repos in {org} selected" + (f" (skipped {detail})" if detail else ""))
+
+    if path:
+        os.makedirs(cache_dir, exist_ok=True)
+        tmp = f"{path}.tmp"
+        with open(tmp, "w") as f:
+            json.dump({"org": org, "active_days": active_days, "fetched_at": time.time(), "repos": repos}, f, indent=2)
+        os.replace(tmp, path)
+    return repos
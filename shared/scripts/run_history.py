@@ -0,0 +1,334 @@
+#!/usr/bin/env python3
+"""
+Columnar workflow-run history for offline DORA queries.
+
+Every run compute_dora.py fetches is kept as a row of fixed-width columns:
+run id, workflow id, created and updated epoch seconds, a conclusion code,
+the production flag computed at collection time and the 20-byte head SHA.
+Rows are partitioned by repo and by month of creation; each partition stores
+one typed-array file per column, sorted by (created, id), so a time range is
+found by binary search rather than by scanning.
+
+Each repo directory has a manifest (index.json) listing its partitions with
+their row counts and time bounds, plus workflow names. Partitions are
+rewritten into a new generation directory and the manifest is swapped
+atomically, so readers never see a half-written partition.
+
+Layout:
+  <root>/<owner>/<repo>/index.json
+  <root>/<owner>/<repo>/<YYYY-MM>.g<N>/{id,workflow_id,created,updated,conclusion,production,head_sha}.col
+
+Usage:
+  python3 shared/scripts/run_history.py repos
+  python3 shared/scripts/run_history.py dora Honey-Badger-Labs/Family-Meal-Planner --from 2026-04-01 --to 2026-07-01
+  python3 shared/scripts/run_history.py dora Honey-Badger-Labs/Family-Meal-Planner --by workflow
+
+Lead times use commit dates from the commit cache only; nothing is fetched.
+"""
+
+import argparse
+import json
+import os
+import shutil
+import sys
+import threading
+import time
+from array import array
+from bisect import bisect_left
+from datetime import datetime, timezone
+from typing import Dict, Iterable, Iterator, List, NamedTuple, Optional, Sequence, Tuple
+
+from commit_cache import CommitCache
+from dora_engine import FAILURE, FAILURE_CONCLUSIONS, OTHER, SUCCESS, DoraAccumulator, RunEvent, epoch, with_commit_times
+
+UTC = timezone.utc
+CACHE_DIR = os.getenv(
+    "METRICS_CACHE_DIR",
+    os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", ".cache", "metrics")),
+)
+MANIFEST = "index.json"
+SHA_BYTES = 20
+NO_SHA = bytes(SHA_BYTES)
+# Conclusion codes; 0 is "not concluded yet", anything unlisted is OTHER_CONCLUSION
+CONCLUSIONS = ("", "success", "failure", "cancelled", "timed_out", "skipped", "neutral", "action_required", "stale")
+CONCLUSION_CODES = {name: code for code, name in enumerate(CONCLUSIONS)}
+OTHER_CONCLUSION = 255
+ARRAY_COLUMNS = (
+    ("id", "q"),
+    ("workflow_id", "q"),
+    ("created", "q"),
+    ("updated", "q"),
+    ("conclusion", "B"),
+    ("production", "B"),
+)
+
+# (id, workflow_id, created, updated, conclusion code, production flag, head sha bytes)
+HistoryRow = Tuple[int, int, int, int, int, int, bytes]
+
+
+class RunColumns(NamedTuple):
+    id: array
+    workflow_id: array
+    created: array
+    updated: array
+    conclusion: array
+    production: array
+    head_sha: bytes
+
+    def sha(self, i: int) -> Optional[str]:
+        raw = self.head_sha[i * SHA_BYTES : (i + 1) * SHA_BYTES]
+        return raw.hex() if raw != NO_SHA else None
+
+    def outcome(self, i: int) -> int:
+        code = self.conclusion[i]
+        name = CONCLUSIONS[code] if code < len(CONCLUSIONS) else None
+        return SUCCESS if name == "success" else FAILURE if name in FAILURE_CONCLUSIONS else OTHER
+
+    def event(self, i: int) -> RunEvent:
+        return RunEvent(float(self.created[i]), float(self.updated[i]), self.outcome(i), self.sha(i))
+
+
+def empty_columns() -> RunColumns:
+    return RunColumns(*(array(code) for _, code in ARRAY_COLUMNS), b"")
+
+
+def history_row(run: Dict, event: RunEvent, production: bool, workflow_id: int = 0) -> Optional[HistoryRow]:
+    """Column values for a run and its engine event; None if the run has no id or creation time.
+
+    `workflow_id` is used when the run itself does not carry one.
+    """
+    if run.get("id") is None or event.order_ts == float("-inf"):
+        return None
+    sha = run.get("head_sha") or ""
+    try:
+        sha_bytes = bytes.fromhex(sha) if len(sha) == 2 * SHA_BYTES else NO_SHA
+    except ValueError:
+        sha_bytes = NO_SHA
+    conclusion = (run.get("conclusion") or "").lower()
+    return (
+        int(run["id"]),
+        int(run.get("workflow_id") or workflow_id),
+        int(event.order_ts),
+        int(event.done_ts if event.done_ts is not None else event.order_ts),
+        CONCLUSION_CODES.get(conclusion, OTHER_CONCLUSION),
+        1 if production else 0,
+        sha_bytes,
+    )
+
+
+def month_of(ts: float) -> str:
+    return datetime.fromtimestamp(ts, tz=UTC).strftime("%Y-%m")
+
+
+class RunHistory:
+    def __init__(self, root: str):
+        self.root = root
+        self._lock = threading.Lock()
+
+    def _repo_dir(self, repo: str) -> str:
+        owner, name = repo.split("/", 1)
+        return os.path.join(self.root, owner, name)
+
+    def _manifest(self, repo: str) -> Dict:
+        try:
+            with open(os.path.join(self._repo_dir(repo), MANIFEST)) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {"partitions": {}, "workflows": {}}
+
+    def repos(self) -> List[str]:
+        if not os.path.isdir(self.root):
+            return []
+        return sorted(
+            f"{owner}/{name}"
+            for owner in os.listdir(self.root)
+            if os.path.isdir(os.path.join(self.root, owner))
+            for name in os.listdir(os.path.join(self.root, owner))
+            if os.path.exists(os.path.join(self.root, owner, name, MANIFEST))
+        )
+
+    def partitions(self, repo: str) -> Dict[str, Dict]:
+        """Month -> partition metadata (rows, min_created, max_created, dir)."""
+        return self._manifest(repo)["partitions"]
+
+    def workflows(self, repo: str) -> Dict[int, str]:
+        return {int(k): v for k, v in self._manifest(repo).get("workflows", {}).items()}
+
+    def _read_partition(self, path: str, rows: int) -> RunColumns:
+        columns = []
+        for name, code in ARRAY_COLUMNS:
+            col = array(code)
+            with open(os.path.join(path, f"{name}.col"), "rb") as f:
+                col.fromfile(f, rows)
+            columns.append(col)
+        with open(os.path.join(path, "head_sha.col"), "rb") as f:
+            columns.append(f.read())
+        return RunColumns(*columns)
+
+    def _write_partition(self, path: str, rows: Sequence[HistoryRow]) -> None:
+        # A leftover from an interrupted write is not referenced by the manifest
+        shutil.rmtree(path, ignore_errors=True)
+        os.makedirs(path)
+        for index, (name, code) in enumerate(ARRAY_COLUMNS):
+            with open(os.path.join(path, f"{name}.col"), "wb") as f:
+                array(code, (row[index] for row in rows)).tofile(f)
+        with open(os.path.join(path, "head_sha.col"), "wb") as f:
+            f.write(b"".join(row[6] for row in rows))
+
+    def merge(self, repo: str, rows: Iterable[Optional[HistoryRow]], workflows: Optional[Dict[int, str]] = None) -> int:
+        """Insert or replace rows by run id (the latest copy of a run wins); return the number of rows written."""
+        by_month: Dict[str, Dict[int, HistoryRow]] = {}
+        for row in rows:
+            if row is not None:
+                by_month.setdefault(month_of(row[2]), {})[row[0]] = row
+        if not by_month and not workflows:
+            return 0
+
+        repo_dir = self._repo_dir(repo)
+        with self._lock:
+            manifest = self._manifest(repo)
+            partitions = manifest["partitions"]
+            stale = []
+            for month, fresh in by_month.items():
+                meta = partitions.get(month)
+                merged: Dict[int, HistoryRow] = {}
+                if meta:
+                    old_path = os.path.join(repo_dir, meta["dir"])
+                    cols = self._read_partition(old_path, meta["rows"])
+                    for i in range(meta["rows"]):
+                        sha = cols.head_sha[i * SHA_BYTES : (i + 1) * SHA_BYTES]
+                        merged[cols.id[i]] = (*(cols[c][i] for c in range(len(ARRAY_COLUMNS))), sha)
+                    stale.append(old_path)
+                merged.update(fresh)
+                ordered = sorted(merged.values(), key=lambda row: (row[2], row[0]))
+                generation = meta["generation"] + 1 if meta else 1
+                dirname = f"{month}.g{generation}"
+                self._write_partition(os.path.join(repo_dir, dirname), ordered)
+                partitions[month] = {
+                    "dir": dirname,
+                    "generation": generation,
+                    "rows": len(ordered),
+                    "min_created": ordered[0][2],
+                    "max_created": ordered[-1][2],
+                }
+            if workflows:
+                manifest["workflows"].update({str(k): v for k, v in workflows.items()})
+            os.makedirs(repo_dir, exist_ok=True)
+            tmp = os.path.join(repo_dir, f"{MANIFEST}.tmp")
+            with open(tmp, "w") as f:
+                json.dump(manifest, f, indent=2, sort_keys=True)
+            os.replace(tmp, os.path.join(repo_dir, MANIFEST))
+            for path in stale:
+                shutil.rmtree(path, ignore_errors=True)
+        return sum(len(fresh) for fresh in by_month.values())
+
+    def scan(
+        self,
+        repo: str,
+        since: Optional[float] = None,
+        until: Optional[float] = None,
+        workflow_ids: Optional[Iterable[int]] = None,
+        production: Optional[bool] = None,
+    ) -> RunColumns:
+        """Runs created in [since, until), ordered by (created, id), optionally filtered by workflow and production flag."""
+        manifest = self._manifest(repo)
+        wanted = set(workflow_ids) if workflow_ids is not None else None
+        out = empty_columns()
+        head_sha = bytearray()
+        for month in sorted(manifest["partitions"]):
+            meta = manifest["partitions"][month]
+            if (since is not None and meta["max_created"] < since) or (until is not None and meta["min_created"] >= until):
+                continue
+            cols = self._read_partition(os.path.join(self._repo_dir(repo), meta["dir"]), meta["rows"])
+            lo = bisect_left(cols.created, since) if since is not None else 0
+            hi = bisect_left(cols.created, until) if until is not None else meta["rows"]
+            if wanted is None and production is None:
+                for c in range(len(ARRAY_COLUMNS)):
+                    out[c].extend(cols[c][lo:hi])
+                head_sha += cols.head_sha[lo * SHA_BYTES : hi * SHA_BYTES]
+                continue
+            for i in range(lo, hi):
+                if wanted is not None and cols.workflow_id[i] not in wanted:
+                    continue
+                if production is not None and cols.production[i] != production:
+                    continue
+                for c in range(len(ARRAY_COLUMNS)):
+                    out[c].append(cols[c][i])
+                head_sha += cols.head_sha[i * SHA_BYTES : (i + 1) * SHA_BYTES]
+        return out._replace(head_sha=bytes(head_sha))
+
+    def events(
+        self, repo: str, since: Optional[float] = None, until: Optional[float] = None, workflow_ids: Optional[Iterable[int]] = None
+    ) -> Iterator[RunEvent]:
+        """Production runs as DORA engine events, in time order."""
+        cols = self.scan(repo, since, until, workflow_ids, production=True)
+        return (cols.event(i) for i in range(len(cols.id)))
+
+
+def _day(text: Optional[str]) -> Optional[float]:
+    return datetime.fromisoformat(text).replace(tzinfo=UTC).timestamp() if text else None
+
+
+def _commit_resolver(cache: Optional[CommitCache], repo: str):
+    def resolve(shas: List[str]) -> Dict[str, Optional[float]]:
+        if cache is None:
+            return {}
+        return {sha: epoch(author or committer) for sha, (author, committer) in cache.get_many(repo, shas).items()}
+
+    return resolve
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Query the local workflow-run history")
+    parser.add_argument("--history", default=os.path.join(CACHE_DIR, "history"), help="History root directory")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("repos", help="List repos with history and their row counts")
+    dora = sub.add_parser("dora", help="DORA metrics for a repo over a date range")
+    dora.add_argument("repo")
+    dora.add_argument("--from", dest="since", help="Start date (YYYY-MM-DD, inclusive)")
+    dora.add_argument("--to", dest="until", help="End date (YYYY-MM-DD, exclusive)")
+    dora.add_argument("--by", choices=["workflow"], help="Break the metrics down per workflow")
+    dora.add_argument("--commit-cache", default=os.path.join(CACHE_DIR, "commits.sqlite"), help="Commit dates for lead time")
+    args = parser.parse_args()
+    history = RunHistory(args.history)
+
+    if args.command == "repos":
+        for repo in history.repos():
+            partitions = history.partitions(repo)
+            rows = sum(p["rows"] for p in partitions.values())
+            print(f"{repo}: {rows} runs in {len(partitions)} month partition(s), {', '.join(sorted(partitions))}")
+        return
+
+    start = time.perf_counter()
+    since, until = _day(args.since), _day(args.until)
+    cols = history.scan(args.repo, since, until, production=True)
+    commit_cache = CommitCache(args.commit_cache) if os.path.exists(args.commit_cache) else None
+    resolve = _commit_resolver(commit_cache, args.repo)
+    names = history.workflows(args.repo)
+
+    groups: Dict[str, List[RunEvent]] = {}
+    for i in range(len(cols.id)):
+        key = names.get(cols.workflow_id[i], str(cols.workflow_id[i])) if args.by else args.repo
+        groups.setdefault(key, []).append(cols.event(i))
+    if since is not None:
+        window_start = since
+    else:
+        window_start = cols.created[0] if len(cols.created) else time.time()
+    window_days = max(1.0, ((until if until is not None else time.time()) - window_start) / 86400)
+
+    results = {}
+    for key, events in groups.items():
+        acc = DoraAccumulator()
+        for event, commit_times in with_commit_times(events, resolve):
+            acc.add(event, commit_times)
+        results[key] = acc.result(window_days)
+        results[key].pop("sketches")
+    if commit_cache:
+        commit_cache.close()
+    elapsed_ms = (time.perf_counter() - start) * 1000
+    print(json.dumps(results, indent=2))
+    print(f"Scanned {len(cols.id)} production runs in {elapsed_ms:.1f} ms", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+"""
+Local workflow-run store for incremental DORA computation.
+
+Keeps every workflow run compute_dora.py has seen, plus a per-repo,
+per-workflow high-water mark (latest created_at / run id) and the earliest
+created_at the store is complete from. A nightly run only needs to fetch runs
+newer than the watermark, plus the recent runs that may still change.
+
+Usage:
+  store = RunStore(".cache/metrics/runs.sqlite")
+  store.upsert_runs("owner/repo", workflow_id, runs, covered_from)
+  runs = store.runs("owner/repo", since)
+"""
+
+import os
+import sqlite3
+import threading
+from typing import Dict, Iterator, List, NamedTuple, Optional
+
+RUN_FIELDS = (
+    "id",
+    "workflow_id",
+    "name",
+    "display_title",
+    "path",
+    "status",
+    "conclusion",
+    "head_sha",
+    "created_at",
+    "updated_at",
+    "run_started_at",
+)
+
+
+class Watermark(NamedTuple):
+    created_at: Optional[str]
+    run_id: Optional[int]
+    # Earliest created_at from which the store holds every run of the workflow
+    covered_from: Optional[str]
+    # Earliest created_at of a stored run that has not completed yet
+    open_from: Optional[str]
+
+
+class RunStore:
+    def __init__(self, path: str):
+        self.path = path
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS runs (
+                repo TEXT NOT NULL,
+                id INTEGER NOT NULL,
+                workflow_id INTEGER,
+                name TEXT,
+                display_title TEXT,
+                path TEXT,
+                status TEXT,
+                conclusion TEXT,
+                head_sha TEXT,
+                created_at TEXT,
+                updated_at TEXT,
+                run_started_at TEXT,
+                PRIMARY KEY (repo, id)
+            );
+            CREATE INDEX IF NOT EXISTS runs_repo_created ON runs (repo, created_at);
+            CREATE TABLE IF NOT EXISTS watermarks (
+                repo TEXT NOT NULL,
+                workflow_id INTEGER NOT NULL,
+                created_at TEXT,
+                run_id INTEGER,
+                covered_from TEXT,
+                PRIMARY KEY (repo, workflow_id)
+            );
+            """
+        )
+        self._conn.commit()
+
+    def watermark(self, repo: str, workflow_id: int) -> Optional[Watermark]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT created_at, run_id, covered_from FROM watermarks WHERE repo = ? AND workflow_id = ?",
+                (repo, workflow_id),
+            ).fetchone()
+            if not row:
+                return None
+            open_from = self._conn.execute(
+                "SELECT MIN(created_at) FROM runs WHERE repo = ? AND workflow_id = ? AND status IS NOT 'completed'",
+                (repo, workflow_id),
+            ).fetchone()[0]
+        return Watermark(row[0], row[1], row[2], open_from)
+
+    def upsert_runs(self, repo: str, workflow_id: int, runs: List[Dict], covered_from: str) -> None:
+        """Insert or refresh runs and advance the workflow's watermark."""
+        rows = [
+            (repo, *(r.get("workflow_id", workflow_id) if f == "workflow_id" else r.get(f) for f in RUN_FIELDS))
+            for r in runs
+            if r.get("id") is not None
+        ]
+        with self._lock:
+            self._conn.executemany(
+                f"INSERT OR REPLACE INTO runs (repo, {', '.join(RUN_FIELDS)}) VALUES ({', '.join('?' * (len(RUN_FIELDS) + 1))})",
+                rows,
+            )
+            latest = self._conn.execute(
+                "SELECT created_at, id FROM runs WHERE repo = ? AND workflow_id = ? ORDER BY created_at DESC, id DESC LIMIT 1",
+                (repo, workflow_id),
+            ).fetchone() or (None, None)
+            self._conn.execute(
+                "INSERT INTO watermarks (repo, workflow_id, created_at, run_id, covered_from) VALUES (?, ?, ?, ?, ?) "
+                "ON CONFLICT (repo, workflow_id) DO UPDATE SET created_at = excluded.created_at, run_id = excluded.run_id, "
+                "covered_from = MIN(COALESCE(watermarks.covered_from, excluded.covered_from), excluded.covered_from)",
+                (repo, workflow_id, latest[0], latest[1], covered_from),
+            )
+            self._conn.commit()
+
+    def _runs_query(self, repo: str, since: str, workflow_ids: Optional[List[int]]):
+        query = f"SELECT {', '.join(RUN_FIELDS)} FROM runs WHERE repo = ? AND created_at >= ?"
+        params: List = [repo, since]
+        if workflow_ids is not None:
+            query += f" AND workflow_id IN ({', '.join('?' * len(workflow_ids))})"
+            params.extend(workflow_ids)
+        return query + " ORDER BY created_at, id", params
+
+    def runs(self, repo: str, since: str, workflow_ids: Optional[List[int]] = None) -> List[Dict]:
+        """Return stored runs created at or after `since`, oldest first."""
+        query, params = self._runs_query(repo, since, workflow_ids)
+        with self._lock:
+            rows = self._conn.execute(query, params).fetchall()
+        return [dict(zip(RUN_FIELDS, row)) for row in rows]
+
+    def iter_runs(self, repo: str, since: str, workflow_ids: Optional[List[int]] = None) -> Iterator[Dict]:
+        """Stream stored runs created at or after `since`, oldest first, without loading them all.
+
+        Uses its own read connection so other threads can keep writing meanwhile.
+        """
+        query, params = self._runs_query(repo, since, workflow_ids)
+        conn = sqlite3.connect(self.path)
+        try:
+            for row in conn.execute(query, params):
+                yield dict(zip(RUN_FIELDS, row))
+        finally:
+            conn.close()
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+"""
+Decide whether a GitHub Actions workflow executes tests.
+
+A workflow is parsed once (with PyYAML when installed, otherwise with a
+small line-based reader) and only what actually executes is inspected: the
+`run:` scripts of its steps, without their shell comment lines, and the
+actions named by `uses:`. Workflow names, YAML comments and docs do not
+count. Scripts are matched against a single compiled alternation of test
+runner commands, so each script is scanned once.
+
+A job that calls a local reusable workflow (`uses: ./.github/workflows/x.yml`)
+executes tests when that workflow does. analyze() only reports such calls,
+so an analysis depends on the file's own content and can be cached by blob
+SHA; workflow_runs_tests() follows the calls across a repo's analyses.
+
+Usage:
+  analyses = {path: analyze(content) for path, content in files.items()}
+  workflow_runs_tests(".github/workflows/ci.yml", analyses)
+"""
+
+import re
+from functools import lru_cache
+from typing import List, Mapping, NamedTuple, Optional, Tuple
+
+try:
+    import yaml
+
+    _Loader = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+except ImportError:
+    yaml = None
+
+# Bump when the extraction or the patterns change so cached verdicts are recomputed
+DETECTOR_VERSION = "2"
+
+# Commands that run tests, not ones that merely mention or install a test tool
+TEST_COMMANDS = (
+    r"\b(?:npm|yarn|pnpm)\s+(?:run\s+)?test\b",  # npm test, yarn run test, pnpm test:unit
+    r"\bpytest\b",  # pytest, python -m pytest
+    r"\bpython\s+-m\s+unittest\b",
+    r"\bjest\b",
+    r"\bvitest\b",
+    r"\bplaywright\s+test\b",
+    r"\bcypress\s+run\b",
+    r"\bmvn\s+test\b",
+    r"\bgradle\s+test\b",
+    r"\bgo\s+test\b",
+    r"\bcargo\s+test\b",
+    r"\bdotnet\s+test\b",
+    r"\bphpunit\b",
+    r"\brspec\s+(?:run|spec)\b",
+    r"\bruby\s+-S\s+rspec\b",
+    r"\bcoverage\s+run\b",
+)
+TEST_COMMAND_PATTERN = re.compile("|".join(f"(?:{p})" for p in TEST_COMMANDS), re.IGNORECASE)
+
+# Actions that run a test suite by default
+TEST_ACTIONS = ("cypress-io/github-action",)
+
+_KEY_LINE = re.compile(r"^(\s*(?:-\s+)?)(run|uses)\s*:(?:\s+(.*))?$")
+
+
+class Analysis(NamedTuple):
+    # A step of the workflow itself runs tests
+    runs_tests: bool
+    # Local reusable workflows its jobs call, as repo paths
+    calls: Tuple[str, ...] = ()
+
+
+def _unquote(value: str) -> str:
+    value = re.sub(r"\s+#.*$", "", value.strip())
+    if len(value) >= 2 and value[0] == value[-1] and value[0] in "'\"":
+        return value[1:-1]
+    return "" if value.startswith("#") else value
+
+
+def _scan_lines(content: str) -> Tuple[List[str], List[str]]:
+    """`run:` scripts and `uses:` values found line by line, for files PyYAML is missing for or rejects."""
+    scripts: List[str] = []
+    uses: List[str] = []
+    lines = content.splitlines()
+    i = 0
+    while i < len(lines):
+        m = _KEY_LINE.match(lines[i])
+        i += 1
+        if not m:
+            continue
+        key, value = m.group(2), (m.group(3) or "").strip()
+        if key == "uses":
+            uses.append(_unquote(value))
+        elif value[:1] in ("|", ">"):
+            # Block scalar: every following line indented past the key
+            column = len(m.group(1))
+            block: List[str] = []
+            while i < len(lines) and (not lines[i].strip() or len(lines[i]) - len(lines[i].lstrip()) > column):
+                block.append(lines[i].strip())
+                i += 1
+            scripts.append("\n".join(block))
+        else:
+            scripts.append(_unquote(value))
+    return scripts, uses
+
+
+def _walk_document(doc: object) -> Tuple[List[str], List[str]]:
+    """`run:` scripts and `uses:` values of the jobs in a parsed workflow."""
+    scripts: List[str] = []
+    uses: List[str] = []
+    jobs = doc.get("jobs") if isinstance(doc, dict) else None
+    for job in jobs.values() if isinstance(jobs, dict) else ():
+        if not isinstance(job, dict):
+            continue
+        if isinstance(job.get("uses"), str):
+            uses.append(job["uses"])
+        steps = job.get("steps")
+        for step in steps if isinstance(steps, list) else ():
+            if not isinstance(step, dict):
+                continue
+            if isinstance(step.get("run"), str):
+                scripts.append(step["run"])
+            if isinstance(step.get("uses"), str):
+                uses.append(step["uses"])
+    return scripts, uses
+
+
+def extract(content: str) -> Tuple[List[str], List[str]]:
+    """The `run:` scripts and `uses:` references of a workflow file."""
+    if yaml is not None:
+        try:
+            return _walk_document(yaml.load(content, Loader=_Loader))
+        except yaml.YAMLError:
+            pass
+    return _scan_lines(content)
+
+
+def script_runs_tests(script: str) -> bool:
+    code = "\n".join(line for line in script.splitlines() if not line.lstrip().startswith("#"))
+    return TEST_COMMAND_PATTERN.search(code) is not None
+
+
+def local_workflow(ref: str) -> Optional[str]:
+    """Repo path of a local reusable workflow reference ("./.github/workflows/x.yml")."""
+    if ref.startswith("./") and ref.endswith((".yml", ".yaml")):
+        return ref[2:]
+    return None
+
+
+@lru_cache(maxsize=4096)
+def analyze(content: Optional[str]) -> Analysis:
+    """Whether a workflow's own steps run tests, and the local reusable workflows it calls."""
+    if not content:
+        return Analysis(False)
+    scripts, uses = extract(content)
+    runs_tests = any(script_runs_tests(s) for s in scripts) or any(
+        u.split("@", 1)[0].lower() in TEST_ACTIONS for u in uses
+    )
+    calls = tuple(dict.fromkeys(p for p in map(local_workflow, uses) if p))
+    return Analysis(runs_tests, calls)
+
+
+def workflow_runs_tests(path: str, analyses: Mapping[str, Analysis]) -> bool:
+    """Whether the workflow at `path` runs tests itself or through the local workflows it calls."""
+    seen = set()
+    pending = [path]
+    while pending:
+        current = pending.pop()
+        if current in seen:
+            continue
+        seen.add(current)
+        analysis = analyses.get(current)
+        if analysis is None:
+            continue
+        if analysis.runs_tests:
+            return True
+        pending.extend(analysis.calls)
+    return False
+
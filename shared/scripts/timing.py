@@ -0,0 +1,47 @@
+#!/usr/bin/env python3
+"""
+Per-phase wall-clock timings for the metrics collectors.
+
+Phases are exclusive: time spent in a phase nested inside another (on the same
+thread) is charged to the inner phase only. Phases entered on worker threads
+are summed, so with concurrency the totals can exceed the elapsed time.
+
+Usage:
+  phases = PhaseTimer()
+  with phases.phase("runs"):
+      ...
+  print(f"Phases: {phases.summary()}")
+"""
+
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, List
+
+
+class PhaseTimer:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self.seconds: Dict[str, float] = {}
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        stack: List[float] = self._local.__dict__.setdefault("stack", [])
+        # Each frame accumulates the time of its nested phases so it can exclude it
+        stack.append(0.0)
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            nested = stack.pop()
+            if stack:
+                stack[-1] += elapsed
+            with self._lock:
+                self.seconds[name] = self.seconds.get(name, 0.0) + elapsed - nested
+
+    def summary(self) -> str:
+        """One line, "name 1.234s, ...", in the order phases were first entered."""
+        with self._lock:
+            return ", ".join(f"{name} {seconds:.3f}s" for name, seconds in self.seconds.items())